@@ -0,0 +1,244 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tilemap import factory
+from tilemap.constants import ARRAY_STORAGE, CHUNKED_STORAGE, LIST_STORAGE
+from tilemap.storage import numpy
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = [10, 100, 1000, 4000]
+QUICK_SIZES = [10, 100]
+GEOMETRIES = {'line': [LIST_STORAGE, ARRAY_STORAGE],
+              'rect': [LIST_STORAGE, ARRAY_STORAGE, CHUNKED_STORAGE],
+              'hex': [LIST_STORAGE, ARRAY_STORAGE, CHUNKED_STORAGE]}
+OPERATIONS = 2000
+MAPS = 1000
+WALL = 'wall'
+MEMORY_METRICS = ('peak_memory', 'map_memory')
+
+def create(geometry, storage, size):
+  # a line map holds as many tiles as the square maps of the same size
+  if geometry == 'line':
+    return factory.create_line_map(size * size, storage)
+  if geometry == 'rect':
+    return factory.create_rectangle_map(size, size, storage)
+  return factory.create_rectangle_hex_map(size, size, storage)
+
+def sample_coors(tile_map, count, generator):
+  tile_count = tile_map._tile_count()
+  return [tile_map._coor(generator.randrange(tile_count)) for _ in range(count)]
+
+def throughput(run, count, repeat):
+  # operations per second over the best of several runs
+  best = None
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return count / best if best else float('inf')
+
+def peak_memory(geometry, storage, size):
+  gc.collect()
+  tracemalloc.start()
+  tile_map = create(geometry, storage, size)
+  for coor in sample_coors(tile_map, OPERATIONS, random.Random(1)):
+    tile_map.set(coor, WALL)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return peak
+
+def map_memory(geometry, storage, size):
+  # bytes per map while many maps of the same size are alive at once, as on a server with one map per match
+  gc.collect()
+  tracemalloc.start()
+  maps = [create(geometry, storage, size) for _ in range(MAPS)]
+  current, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return current / len(maps)
+
+def bench_operations(tile_map, repeat, full_scans):
+  generator = random.Random(2)
+  coors = sample_coors(tile_map, OPERATIONS, generator)
+  targets = sample_coors(tile_map, OPERATIONS, generator)
+  results = {}
+  def run_get():
+    for coor in coors:
+      tile_map.get(coor)
+  def run_set():
+    for coor in coors:
+      tile_map.set(coor, WALL)
+  def run_set_many():
+    tile_map.set_many(coors, [WALL] * len(coors))
+  def run_move():
+    for coor, target in zip(coors, targets):
+      tile_map.move(coor, target)
+  def run_swap():
+    for coor, target in zip(coors, targets):
+      tile_map.swap(coor, target)
+  def run_adjacent():
+    for coor in coors:
+      for _ in tile_map.adjacent(coor):
+        pass
+  def run_exists():
+    for coor in coors:
+      tile_map.exists(coor)
+  def run_track():
+    for number, coor in enumerate(coors):
+      tile_map.track(coor, number)
+  results['get'] = throughput(run_get, OPERATIONS, repeat)
+  results['set'] = throughput(run_set, OPERATIONS, repeat)
+  results['set_many'] = throughput(run_set_many, OPERATIONS, repeat)
+  results['exists'] = throughput(run_exists, OPERATIONS, repeat)
+  results['adjacent'] = throughput(run_adjacent, OPERATIONS, repeat)
+  results['move'] = throughput(run_move, OPERATIONS, repeat)
+  results['swap'] = throughput(run_swap, OPERATIONS, repeat)
+  results['track'] = throughput(run_track, OPERATIONS, repeat)
+  tile_map.tracking.clear()
+  tile_map.properties.clear()
+  if full_scans:
+    tile_count = tile_map._tile_count()
+    results['tiles'] = throughput(lambda: sum(1 for _ in tile_map.tiles()), tile_count, repeat)
+    side_count = sum(1 for _ in tile_map.side_coors())
+    results['sides'] = throughput(lambda: sum(1 for _ in tile_map.sides()), side_count, repeat)
+  return results
+
+def flood_fill(tile_map, start):
+  # breadth-first over Map.adjacent, stopping at walls
+  seen = {start}
+  pending = deque((start,))
+  while pending:
+    for coor, content in tile_map.adjacent(pending.popleft()):
+      if coor not in seen and content != WALL:
+        seen.add(coor)
+        pending.append(coor)
+  return len(seen)
+
+def random_walk(tile_map, pieces, steps, generator):
+  coors = sample_coors(tile_map, pieces, generator)
+  for number, coor in enumerate(coors):
+    tile_map.set(coor, 'piece')
+    tile_map.track(coor, number)
+  shifts = list(tile_map.direction_map.values())
+  for _ in range(steps):
+    for number in range(pieces):
+      coor = tile_map.properties[number]
+      if coor is None:
+        continue
+      target = tile_map._shift_coor(coor, generator.choice(shifts))
+      if tile_map.exists(target) and tile_map.get(target) is None:
+        tile_map.move(coor, target)
+
+def full_board_scan(tile_map):
+  return sum(1 for _, content in tile_map.tiles() if content == WALL)
+
+def bench_workloads(geometry, storage, size, repeat):
+  results = {}
+  walled = create(geometry, storage, size)
+  generator = random.Random(3)
+  for coor in sample_coors(walled, walled._tile_count() // 4, generator):
+    walled.set(coor, WALL)
+  start = walled._coor(0)
+  walled.set(start, None)
+  visited = flood_fill(walled, start)
+  results['flood_fill'] = throughput(lambda: flood_fill(walled, start), visited, repeat)
+  results['full_scan'] = throughput(lambda: full_board_scan(walled), walled._tile_count(), repeat)
+  walk_map = create(geometry, storage, size)
+  pieces, steps = 50, 40
+  results['random_walk'] = throughput(lambda: random_walk(walk_map, pieces, steps, random.Random(4)), pieces * steps, 1)
+  return results
+
+def run(sizes, repeat, geometries, storages, quiet=False):
+  results = {}
+  for size in sizes:
+    for geometry in geometries:
+      for storage in GEOMETRIES[geometry]:
+        if storage not in storages or (storage == ARRAY_STORAGE and numpy is None):
+          continue
+        name = '{}/{}/{}x{}'.format(geometry, storage, size, size)
+        if not quiet:
+          print('running {}'.format(name), file=sys.stderr)
+        start = time.perf_counter()
+        tile_map = create(geometry, storage, size)
+        case = {'create': 1 / (time.perf_counter() - start)}
+        case.update(bench_operations(tile_map, repeat, full_scans=True))
+        # the workloads walk whole boards tile by tile, keep them to sizes that finish in seconds
+        if size <= 1000:
+          case.update(bench_workloads(geometry, storage, size, repeat))
+        case['peak_memory'] = peak_memory(geometry, storage, size)
+        if size <= 100:
+          case['map_memory'] = map_memory(geometry, storage, size)
+        results[name] = case
+  return {'meta': {'python': platform.python_version(), 'numpy': None if numpy is None else numpy.__version__,
+                   'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+          'results': results}
+
+def compare(current, baseline, tolerance):
+  """Lists the measurements that got worse than the baseline by more than the tolerance.
+  Throughputs regress when they drop, memory when it grows.
+
+  Args:
+    current (dict): results of this run
+    baseline (dict): stored results to compare with
+    tolerance (float): allowed relative change, 0.25 allows 25%
+
+  Returns:
+    list of (case, metric, baseline value, current value) tuples
+  """
+  regressions = []
+  for case, metrics in sorted(current['results'].items()):
+    stored = baseline['results'].get(case)
+    if stored is None:
+      continue
+    for metric, value in sorted(metrics.items()):
+      before = stored.get(metric)
+      if before is None:
+        continue
+      if metric in MEMORY_METRICS:
+        worse = value > before * (1 + tolerance)
+      else:
+        worse = value < before * (1 - tolerance)
+      if worse:
+        regressions.append((case, metric, before, value))
+  return regressions
+
+def main(arguments=None):
+  parser = argparse.ArgumentParser(description='Benchmark tilemap operations')
+  parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='map sizes, each a size x size board')
+  parser.add_argument('--quick', action='store_true', help='only the smallest sizes')
+  parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the best is kept')
+  parser.add_argument('--geometry', nargs='+', default=list(GEOMETRIES), choices=list(GEOMETRIES))
+  parser.add_argument('--storage', nargs='+', default=[LIST_STORAGE, ARRAY_STORAGE, CHUNKED_STORAGE])
+  parser.add_argument('--output', help='file to write the JSON results to, stdout by default')
+  parser.add_argument('--baseline', nargs='?', const=BASELINE, help='results to compare with, the stored baseline by default')
+  parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+  options = parser.parse_args(arguments)
+  sizes = QUICK_SIZES if options.quick else options.sizes
+  current = run(sizes, options.repeat, options.geometry, options.storage)
+  text = json.dumps(current, indent=2, sort_keys=True)
+  if options.output:
+    with open(options.output, 'w') as stream:
+      stream.write(text + '\n')
+  else:
+    print(text)
+  if options.baseline:
+    with open(options.baseline) as stream:
+      regressions = compare(current, json.load(stream), options.tolerance)
+    for case, metric, before, value in regressions:
+      print('regression {} {}: {:.4g} -> {:.4g}'.format(case, metric, before, value), file=sys.stderr)
+    return 1 if regressions else 0
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -9,3 +9,20 @@ class GamePiece:
             and hasattr(other, 'color') and self.color == other.color)
   def __hash__(self):
     return hash((self.name, self.color))
+
+def shift_coor(coor, step):
+  # one step of a direction map, line coordinates are plain ints
+  if isinstance(coor, int):
+    return coor + step
+  return (coor[0] + step[0], coor[1] + step[1])
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+import pytest
+from tilemap.constants import LIST_STORAGE, ARRAY_STORAGE
+
+STORAGES = [LIST_STORAGE,
+            pytest.param(ARRAY_STORAGE, marks=pytest.mark.skipif(numpy is None, reason='numpy not installed'))]
@@ -0,0 +1,14 @@
+from .context import tilemap
+from tilemap.constants import CHUNKED_STORAGE
+from .common import STORAGES
+import pytest
+
+# every storage of rect and hex maps, chunked maps bounded to the given size
+@pytest.fixture(params=STORAGES + [CHUNKED_STORAGE])
+def storage(request):
+  return request.param
+
+# line maps have no chunked storage
+@pytest.fixture(params=STORAGES)
+def line_storage(request):
+  return request.param
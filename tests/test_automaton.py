@@ -0,0 +1,116 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.automaton import table_rule
+from .common import GamePiece
+import random
+
+TREE = GamePiece('tree', 'green')
+FIRE = GamePiece('fire', 'red')
+ASH = GamePiece('ash', 'grey')
+LIVE = GamePiece('cell', 'white')
+
+FIRE_RULE = {TREE: {count: FIRE for count in range(1, 7)}, FIRE: [ASH] * 7}
+
+def burning(content):
+  return content == FIRE
+
+def life(content, count):
+  if content == LIVE:
+    return LIVE if count in (1, 2) else None
+  return LIVE if count == 2 else content
+
+def reference_step(tile_map, rule, counted):
+  new_contents = {}
+  for coor, content in tile_map.tiles():
+    count = sum(1 for _, neighbor in tile_map.adjacent(coor) if counted(neighbor))
+    new_contents[coor] = rule(content, count)
+  return new_contents
+
+def random_map(create, storage, seed):
+  tile_map = create(9, 8, storage)
+  generator = random.Random(seed)
+  for coor in tile_map.tile_coors():
+    if generator.random() < 0.4:
+      tile_map.set(coor, LIVE)
+  return tile_map
+
+def test_fire_spreads_one_tile_per_tick(storage):
+  tile_map = factory.create_rectangle_map(5, 1, storage)
+  tile_map.fill(((0, 0), (4, 0)), TREE)
+  tile_map.set((0, 0), FIRE)
+  assert [(0, 0), (1, 0)] == tile_map.step(FIRE_RULE, burning)
+  assert [ASH, FIRE, TREE, TREE, TREE] == [content for _, content in tile_map.tiles()]
+  tile_map.step(FIRE_RULE, burning)
+  assert [ASH, ASH, FIRE, TREE, TREE] == [content for _, content in tile_map.tiles()]
+
+def test_hex_neighborhood(storage):
+  tile_map = factory.create_rectangle_hex_map(5, 5, storage)
+  tile_map.fill(((0, 0), (2, 4)), TREE)
+  tile_map.set((0, 2), FIRE)
+  tile_map.step(FIRE_RULE, burning)
+  assert {(0, 2)} | {coor for coor, content in tile_map.adjacent((0, 2))} == {coor for coor, content in tile_map.tiles()
+                                                                             if content in (FIRE, ASH)}
+
+def test_matches_reference(storage):
+  for create in (factory.create_rectangle_map, factory.create_rectangle_hex_map):
+    tile_map = random_map(create, storage, 3)
+    for _ in range(4):
+      expected = reference_step(tile_map, life, lambda content: content == LIVE)
+      tile_map.step(life, lambda content: content == LIVE)
+      assert expected == dict(tile_map.tiles())
+
+def test_table_rule():
+  rule = table_rule({TREE: [TREE, FIRE], FIRE: {0: ASH}})
+  assert FIRE == rule(TREE, 1)
+  assert TREE == rule(TREE, 3)
+  assert ASH == rule(FIRE, 0)
+  assert FIRE == rule(FIRE, 2)
+  assert None == rule(None, 2)
+
+def test_active(storage):
+  for create in (factory.create_rectangle_map, factory.create_rectangle_hex_map):
+    tile_map = random_map(create, storage, 5)
+    other = random_map(create, storage, 5)
+    automaton = tile_map.automaton(life, lambda content: content == LIVE, active=True)
+    for tick in range(6):
+      if tick == 3:
+        # outside writes are picked up too
+        tile_map.set((2, 2), LIVE)
+        other.set((2, 2), LIVE)
+      assert other.step(life, lambda content: content == LIVE) == automaton.step()
+      assert dict(other.tiles()) == dict(tile_map.tiles())
+    automaton.close()
+    tile_map.set((3, 3), LIVE)
+    other.set((3, 3), LIVE)
+    assert other.step(life, lambda content: content == LIVE) == automaton.step()
+    assert dict(other.tiles()) == dict(tile_map.tiles())
+
+def test_active_only_evaluates_near_changes(storage):
+  tile_map = factory.create_rectangle_map(6, 6, storage)
+  calls = []
+  def rule(content, count):
+    calls.append(content)
+    return content
+  automaton = tile_map.automaton(rule, active=True)
+  automaton.step()
+  del calls[:]
+  automaton.step()
+  if storage == 'list':
+    assert [] == calls
+  tile_map.set((3, 3), TREE)
+  del calls[:]
+  assert [] == automaton.step()
+  if storage == 'list':
+    assert 5 == len(calls)
+
+def test_step_with_tracking_and_journal(storage):
+  tile_map = factory.create_rectangle_map(3, 1, storage)
+  tile_map.set((0, 0), FIRE)
+  tile_map.set((1, 0), TREE)
+  tile_map.track((1, 0), 'grove')
+  before = tile_map.checkpoint()
+  tile_map.step(FIRE_RULE, burning)
+  assert None == tile_map.properties['grove']
+  tile_map.undo(before)
+  assert [FIRE, TREE, None] == [content for _, content in tile_map.tiles()]
+  assert (1, 0) == tile_map.properties['grove']
@@ -0,0 +1,19 @@
+from .context import tilemap
+from benchmarks import bench
+
+def test_run_small_case():
+  current = bench.run([3], 1, ['hex'], ['list'], quiet=True)
+  case = current['results']['hex/list/3x3']
+  for metric in ('get', 'set', 'set_many', 'move', 'swap', 'adjacent', 'tiles', 'sides', 'track',
+                 'flood_fill', 'random_walk', 'full_scan', 'peak_memory', 'map_memory'):
+    assert case[metric] > 0
+
+def test_compare():
+  baseline = {'results': {'rect/list/10x10': {'get': 100.0, 'set': 100.0, 'peak_memory': 1000, 'map_memory': 500},
+                          'rect/array/10x10': {'get': 100.0}}}
+  current = {'results': {'rect/list/10x10': {'get': 80.0, 'set': 50.0, 'peak_memory': 1500, 'map_memory': 400,
+                                             'move': 1.0},
+                         'hex/list/10x10': {'get': 1.0}}}
+  assert [('rect/list/10x10', 'peak_memory', 1000, 1500), ('rect/list/10x10', 'set', 100.0, 50.0)] == \
+      bench.compare(current, baseline, 0.25)
+  assert [] == bench.compare(current, baseline, 0.6)
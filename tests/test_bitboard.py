@@ -0,0 +1,125 @@
+from .context import tilemap
+from tilemap import bitboard, factory, geometry
+from tilemap.bitboard import Bitboard, bits_from_flags, bits_from_indices
+from tilemap.constants import *
+from .common import shift_coor
+import random
+import pytest
+
+CREATORS = [lambda storage: factory.create_line_map(13, storage),
+            lambda storage: factory.create_rectangle_map(5, 4, storage),
+            lambda storage: factory.create_rectangle_hex_map(5, 4, storage),
+            lambda storage: factory.create_rectangle_hex_map(4, 5, storage)]
+IDS = ['line', 'rect', 'hex', 'hex-odd']
+
+def scattered(create, storage, seed):
+  tile_map = create(storage)
+  rng = random.Random(seed)
+  for coor in list(tile_map.tile_coors()):
+    if rng.random() < 0.4:
+      tile_map.set(coor, rng.choice(['wall', 'grass']))
+  return tile_map
+
+def test_packing():
+  assert 0 == bits_from_flags(b'')
+  assert 0b1101 == bits_from_flags(bytes([1, 0, 1, 1]))
+  assert 0b100101 == bits_from_indices([0, 2, 5], 8)
+
+@pytest.mark.parametrize('create', CREATORS, ids=IDS)
+def test_from_tiles(create, storage):
+  if storage == CHUNKED_STORAGE and create is CREATORS[0]:
+    pytest.skip('line maps have no chunked storage')
+  tile_map = scattered(create, storage, 1)
+  walls = tile_map.bitboard(lambda content: content == 'wall')
+  assert [coor for coor, content in tile_map.tiles() if content == 'wall'] == list(walls)
+  # chunked storage skips empty tiles chunk by chunk, not in flat index order
+  assert sorted(tile_map.index_of(coor) for coor, _ in tile_map.tiles(skip_empty=True)) == \
+      list(tile_map.bitboard().indices())
+  assert len(list(walls)) == walls.count() == len(walls)
+  assert all(coor in walls for coor in walls)
+  assert (-5 if create is CREATORS[0] else (-5, -5)) not in walls
+
+@pytest.mark.parametrize('storage', [BYTE_STORAGE, BIT_STORAGE])
+def test_packed_storages(storage):
+  tile_map = factory.create_rectangle_hex_map(5, 4, storage)
+  coors = list(tile_map.tile_coors())
+  for coor in coors[::3]:
+    tile_map.set(coor, 2)
+  assert coors[::3] == list(tile_map.bitboard())
+  assert [coor for index, coor in enumerate(coors) if index % 3] == list(tile_map.bitboard(lambda content: content is None))
+  assert coors == list(tile_map.bitboard(lambda content: True))
+
+@pytest.mark.parametrize('create', CREATORS, ids=IDS)
+def test_shift_and_neighbors(create):
+  tile_map = scattered(create, LIST_STORAGE, 2)
+  board = tile_map.bitboard()
+  for direction, step in tile_map.direction_map.items():
+    expected = {shift_coor(coor, step) for coor in board}
+    assert {coor for coor in expected if tile_map.exists(coor)} == set(board.shift(direction))
+  assert {adjacent for coor in board for adjacent, _ in tile_map.adjacent(coor)} == set(board.neighbors())
+  assert set(board) | set(board.neighbors()) == set(board.expand())
+
+@pytest.mark.parametrize('create', CREATORS, ids=IDS)
+def test_flood_fill(create):
+  tile_map = scattered(create, LIST_STORAGE, 3)
+  start = next(coor for coor, content in tile_map.tiles() if content is None)
+  seen = {start}
+  pending = [start]
+  while pending:
+    for coor, content in tile_map.adjacent(pending.pop()):
+      if content is None and coor not in seen:
+        seen.add(coor)
+        pending.append(coor)
+  open_tiles = tile_map.bitboard(lambda content: content is None)
+  region = Bitboard(tile_map)
+  region.add(start)
+  while True:
+    grown = region.expand() & open_tiles
+    if grown == region:
+      break
+    region = grown
+  assert seen == set(region)
+
+def test_operations():
+  tile_map = factory.create_rectangle_map(3, 3)
+  first = Bitboard(tile_map)
+  second = Bitboard(tile_map)
+  for coor in [(0, 0), (1, 1), (2, 2)]:
+    first.add(coor)
+  for coor in [(1, 1), (2, 1)]:
+    second.add(coor)
+  assert [(1, 1)] == list(first & second)
+  assert [(0, 0), (1, 1), (2, 1), (2, 2)] == list(first | second)
+  assert [(0, 0), (2, 1), (2, 2)] == list(first ^ second)
+  assert [(0, 0), (2, 2)] == list(first - second)
+  assert 6 == (~first).count()
+  assert [0, 4, 8] == list(first.indices())
+  first.discard((1, 1))
+  assert [(0, 0), (2, 2)] == list(first)
+  assert not Bitboard(tile_map)
+  assert first == tile_map.bitboard(lambda content: False) | first
+
+def test_errors():
+  tile_map = factory.create_rectangle_map(3, 3)
+  board = Bitboard(tile_map)
+  with pytest.raises(IndexError):
+    board.add((3, 0))
+  with pytest.raises(ValueError):
+    board.shift(NE)
+  with pytest.raises(ValueError):
+    board | factory.create_rectangle_map(3, 4).bitboard()
+  with pytest.raises(ValueError):
+    board | factory.create_rectangle_hex_map(3, 3).bitboard()
+  assert board == factory.create_rectangle_map(3, 3, CHUNKED_STORAGE).bitboard()
+  with pytest.raises(ValueError):
+    factory.create_sparse_rectangle_map().bitboard()
+
+@pytest.mark.parametrize('create', CREATORS, ids=IDS)
+def test_pure_python_masks(create, monkeypatch):
+  board = scattered(create, LIST_STORAGE, 4).bitboard()
+  shifted = [set(board.shift(direction)) for direction in board.tile_map.direction_map]
+  # a fresh layout cache, so the masks are worked out again without numpy
+  monkeypatch.setattr(geometry, '_GEOMETRIES', {})
+  monkeypatch.setattr(bitboard, 'numpy', None)
+  board = scattered(create, LIST_STORAGE, 4).bitboard()
+  assert shifted == [set(board.shift(direction)) for direction in board.tile_map.direction_map]
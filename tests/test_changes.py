@@ -0,0 +1,142 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.changes import TileChange
+from tilemap.constants import *
+from tilemap.observer import MISSING, MapObserver
+from .common import GamePiece
+import pytest
+
+KING = GamePiece('king', 'white')
+PAWN = GamePiece('pawn', 'black')
+
+@pytest.fixture
+def tile_map(storage):
+  tile_map = factory.create_rectangle_map(4, 4, storage)
+  tile_map.enable_changes()
+  return tile_map
+
+def test_set(tile_map):
+  tile_map.set((0, 0), KING)
+  tile_map.set((1, 2), PAWN)
+  assert [TileChange((0, 0), None, KING, None, None), TileChange((1, 2), None, PAWN, None, None)] == \
+      list(tile_map.drain_changes())
+  assert not tile_map.drain_changes()
+
+def test_coalesced(tile_map):
+  tile_map.set((0, 0), KING)
+  tile_map.set((0, 0), PAWN)
+  tile_map.set((1, 1), KING)
+  tile_map.set((1, 1), None)
+  batch = tile_map.drain_changes()
+  assert [TileChange((0, 0), None, PAWN, None, None)] == batch.tiles
+  assert [(0, 0)] == batch.coors()
+  tile_map.set((0, 0), KING)
+  tile_map.set((0, 0), PAWN)
+  assert 0 == len(tile_map.drain_changes())
+
+def test_tracking_side_effects(tile_map):
+  tile_map.set((0, 0), KING)
+  tile_map.set((3, 3), PAWN)
+  tile_map.track((0, 0), 'king')
+  tile_map.track((3, 3), 'pawn')
+  tile_map.drain_changes()
+  tile_map.move((0, 0), (1, 0))
+  tile_map.set((3, 3), KING)
+  batch = tile_map.drain_changes()
+  assert [TileChange((0, 0), KING, None, 'king', None), TileChange((1, 0), None, KING, None, 'king'),
+          TileChange((3, 3), PAWN, KING, 'pawn', None)] == batch.tiles
+  assert {'king': ((0, 0), (1, 0)), 'pawn': ((3, 3), None)} == batch.properties
+
+def test_swap_and_track(tile_map):
+  tile_map.set((0, 0), KING)
+  tile_map.set((0, 1), PAWN)
+  tile_map.drain_changes()
+  tile_map.track((0, 0), 'king')
+  tile_map.swap((0, 0), (0, 1))
+  batch = tile_map.drain_changes()
+  assert [TileChange((0, 0), KING, PAWN, None, None), TileChange((0, 1), PAWN, KING, None, 'king')] == batch.tiles
+  assert {'king': (MISSING, (0, 1))} == batch.properties
+
+def test_bulk_writes(tile_map):
+  tile_map.set_many([(0, 0), (2, 2)], [KING, PAWN])
+  tile_map.fill(((1, 0), (1, 3)), PAWN)
+  assert 6 == len(tile_map.drain_changes())
+  tile_map.clear()
+  assert {(0, 0), (2, 2), (1, 0), (1, 1), (1, 2), (1, 3)} == set(tile_map.drain_changes().coors())
+
+def test_undo(tile_map):
+  before = tile_map.checkpoint()
+  tile_map.set((0, 0), KING)
+  tile_map.track((0, 0), 'king')
+  tile_map.drain_changes()
+  tile_map.undo(before)
+  batch = tile_map.drain_changes()
+  assert [TileChange((0, 0), KING, None, 'king', None)] == batch.tiles
+  assert {'king': ((0, 0), MISSING)} == batch.properties
+
+def test_dirty(tile_map):
+  tile_map.set((0, 0), KING)
+  tile_map.set((2, 3), PAWN)
+  dirty = tile_map.drain_changes().dirty()
+  assert [(0, 0), (2, 3)] == list(dirty)
+  big = factory.create_rectangle_hex_map(30, 30)
+  big.enable_changes()
+  coors = list(big.tile_coors())[::2]
+  big.set_many(coors, [KING] * len(coors))
+  assert coors == list(big.drain_changes().dirty())
+
+def test_streams():
+  tile_map = factory.create_rectangle_hex_map(3, 3)
+  renderer = tile_map.change_stream()
+  network = tile_map.change_stream()
+  tile_map.set((0, 0), KING)
+  assert [(0, 0)] == renderer.drain().coors()
+  tile_map.set((1, 1), PAWN)
+  assert [(1, 1)] == renderer.drain().coors()
+  assert [(0, 0), (1, 1)] == network.drain().coors()
+  renderer.close()
+  tile_map.set((2, 0), PAWN)
+  assert not renderer.drain()
+  assert [(2, 0)] == network.drain().coors()
+  network.close()
+  tile_map.set((1, 1), KING)
+  assert not network.drain()
+
+def test_subscribe():
+  class Recorder(MapObserver):
+    def __init__(self):
+      self.events = []
+    def tile_changed(self, coor, previous_content, content):
+      self.events.append((coor, previous_content, content))
+  tile_map = factory.create_line_map(5)
+  recorder = Recorder()
+  tile_map.subscribe(recorder)
+  tile_map.set(1, KING)
+  tile_map.move(1, 3)
+  tile_map.unsubscribe(recorder)
+  tile_map.set(0, PAWN)
+  assert [(1, None, KING), (1, KING, None), (3, None, KING)] == recorder.events
+
+def test_enable_and_disable():
+  tile_map = factory.create_rectangle_map(3, 3)
+  with pytest.raises(ValueError):
+    tile_map.drain_changes()
+  tile_map.enable_changes()
+  tile_map.set((0, 0), KING)
+  fork = tile_map.fork()
+  with pytest.raises(ValueError):
+    fork.drain_changes()
+  tile_map.disable_changes()
+  with pytest.raises(ValueError):
+    tile_map.drain_changes()
+  tile_map.enable_changes()
+  assert not tile_map.drain_changes()
+
+def test_unbounded():
+  tile_map = factory.create_sparse_rectangle_map()
+  tile_map.enable_changes()
+  tile_map.set((-100, 7), KING)
+  batch = tile_map.drain_changes()
+  assert [(-100, 7)] == batch.coors()
+  with pytest.raises(ValueError):
+    batch.dirty()
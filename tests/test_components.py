@@ -0,0 +1,121 @@
+from .context import tilemap
+from tilemap import factory
+from .common import GamePiece
+import random
+
+BLACK = GamePiece('stone', 'black')
+WHITE = GamePiece('stone', 'white')
+
+def color(content):
+  return None if content is None else content.color
+
+def territory(content):
+  return 'empty' if content is None else content.color
+
+def reference(tile_map, key):
+  # plain flood fill over adjacent
+  groups = []
+  seen = set()
+  for coor, content in tile_map.tiles():
+    if coor in seen or key(content) is None:
+      continue
+    group = {coor}
+    pending = [coor]
+    while pending:
+      for neighbor, neighbor_content in tile_map.adjacent(pending.pop()):
+        if neighbor not in group and key(neighbor_content) == key(content):
+          group.add(neighbor)
+          pending.append(neighbor)
+    seen |= group
+    groups.append(frozenset(group))
+  return set(groups)
+
+def groups_of(components):
+  return {frozenset(components.coors(label)) for label in components.sizes}
+
+def check(components, tile_map, key):
+  expected = reference(tile_map, key)
+  assert expected == groups_of(components)
+  for label, size in components.sizes.items():
+    coors = components.coors(label)
+    assert size == len(coors)
+    assert all(label == components.label(coor) for coor in coors)
+    borders = {key(content) for coor in coors for neighbor, content in tile_map.adjacent(coor)
+               if components.label(neighbor) != label}
+    assert borders == components.borders(label)
+    sides = {coor for coor in tile_map.side_coors()}
+    assert bool(sides & set(coors)) == components.touches_side(label)
+
+def test_labels(storage):
+  tile_map = factory.create_rectangle_map(5, 4, storage)
+  tile_map.fill(((0, 0), (1, 3)), BLACK)
+  tile_map.set((3, 1), WHITE)
+  tile_map.set((4, 3), BLACK)
+  components = tile_map.label_components(color)
+  assert {0: 8, 1: 1, 2: 1} == components.sizes
+  assert 0 == components.label((1, 2))
+  assert None == components.label((2, 2))
+  assert 'black' == components.key_of(2)
+  assert [(4, 3)] == components.coors(2)
+  labels = components.labels
+  if storage == 'array':
+    assert (5, 4) == labels.shape
+    assert -1 == labels[3, 0]
+    assert 1 == labels[3, 1]
+  else:
+    assert [0] * 8 + [-1] * 5 + [1] + [-1] * 5 + [2] == labels
+  assert {None} == components.borders(1)
+  assert components.touches_side(0)
+  assert not components.touches_side(1)
+
+def test_territory(storage):
+  # a white eye surrounded by black stones belongs to black
+  tile_map = factory.create_rectangle_hex_map(5, 5, storage)
+  for coor, _ in tile_map.adjacent((1, 2)):
+    tile_map.set(coor, BLACK)
+  components = tile_map.label_components(territory)
+  eye = components.label((1, 2))
+  assert 1 == components.sizes[eye]
+  assert {'black'} == components.borders(eye)
+  assert not components.touches_side(eye)
+  check(components, tile_map, territory)
+
+def test_random_maps(storage):
+  for create in (factory.create_rectangle_map, factory.create_rectangle_hex_map):
+    tile_map = create(8, 7, storage)
+    generator = random.Random(11)
+    for coor in tile_map.tile_coors():
+      tile_map.set(coor, generator.choice([None, BLACK, WHITE]))
+    check(tile_map.label_components(color), tile_map, color)
+    check(tile_map.label_components(territory), tile_map, territory)
+
+def test_incremental(storage):
+  for create in (factory.create_rectangle_map, factory.create_rectangle_hex_map):
+    tile_map = create(8, 7, storage)
+    generator = random.Random(7)
+    for coor in tile_map.tile_coors():
+      tile_map.set(coor, generator.choice([None, BLACK, BLACK]))
+    components = tile_map.label_components(color, incremental=True)
+    coors = list(tile_map.tile_coors())
+    for _ in range(150):
+      tile_map.set(generator.choice(coors), generator.choice([None, BLACK, WHITE]))
+      assert reference(tile_map, color) == groups_of(components)
+    check(components, tile_map, color)
+    components.close()
+    groups = groups_of(components)
+    for coor in coors:
+      tile_map.set(coor, BLACK)
+    assert groups == groups_of(components)
+
+def test_incremental_split_and_merge(storage):
+  tile_map = factory.create_rectangle_map(5, 3, storage)
+  tile_map.fill(((0, 1), (4, 1)), BLACK)
+  components = tile_map.label_components(color, incremental=True)
+  assert 1 == len(components.sizes)
+  tile_map.set((2, 1), None)
+  assert 2 == len(components.sizes)
+  assert components.label((0, 1)) != components.label((4, 1))
+  assert [2, 2] == sorted(components.sizes.values())
+  tile_map.move((4, 1), (2, 1))
+  assert {frozenset({(0, 1), (1, 1), (2, 1), (3, 1)})} == groups_of(components)
+  check(components, tile_map, color)
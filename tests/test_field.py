@@ -0,0 +1,94 @@
+from .context import tilemap
+from tilemap import factory, path
+from tilemap.constants import *
+from .common import GamePiece
+import random
+import pytest
+
+WALL = GamePiece('wall', 'grey')
+MUD = GamePiece('mud', 'brown')
+
+def open_tile(content):
+  return content != WALL
+
+def mud_cost(content):
+  return 3 if content == MUD else 1
+
+def flat(values):
+  return [float(value) for value in (values.ravel() if hasattr(values, 'ravel') else values)]
+
+def test_distances(storage):
+  # . # .
+  # . # .
+  # . . .
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.set((1, 0), WALL)
+  tile_map.set((1, 1), WALL)
+  field = tile_map.distance_field([(0, 0)], passable=open_tile)
+  assert 0 == field.distance((0, 0))
+  assert 6 == field.distance((2, 0))
+  assert float('inf') == field.distance((1, 0))
+  assert None == field.direction((0, 0))
+  assert NORTH == field.direction((0, 2))
+  assert WEST == field.direction((1, 2))
+  assert SOUTH == field.direction((2, 0))
+  with pytest.raises(IndexError):
+    field.distance((3, 0))
+
+def test_multiple_sources(line_storage):
+  tile_map = factory.create_line_map(6, line_storage)
+  field = tile_map.distance_field([0, 5])
+  assert [0, 1, 2, 2, 1, 0] == flat(field.distances)
+  assert [-1, LEFT, LEFT, RIGHT, RIGHT, -1] == [int(direction) for direction in flat(tile_map.flow_field([0, 5]))]
+
+def test_costs(storage):
+  tile_map = factory.create_rectangle_hex_map(3, 4, storage)
+  tile_map.set((0, 1), MUD)
+  field = tile_map.distance_field([(0, 0)], cost=mud_cost)
+  assert 1 == field.distance((0, 1))
+  # stepping into the mud would cost 1 + 3
+  assert 3 == field.distance((0, 2))
+  assert NW != field.direction((0, 2))
+
+def test_array_results():
+  pytest.importorskip('numpy')
+  tile_map = factory.create_rectangle_map(4, 3, ARRAY_STORAGE)
+  field = tile_map.distance_field([(0, 0)])
+  assert (4, 3) == field.distances.shape
+  assert 5 == field.distances[3, 2]
+  assert WEST == tile_map.flow_field([(0, 0)])[3, 2]
+
+@pytest.mark.parametrize('cost', [None, mud_cost])
+@pytest.mark.parametrize('create', [factory.create_rectangle_map, factory.create_rectangle_hex_map])
+def test_incremental_matches_full(storage, create, cost):
+  rng = random.Random(7)
+  tile_map = create(8, 7, storage)
+  coors = list(tile_map.tile_coors())
+  for coor in rng.sample(coors, 14):
+    tile_map.set(coor, rng.choice([WALL, MUD]))
+  sources = rng.sample(coors, 2)
+  field = tile_map.distance_field(sources, passable=open_tile, cost=cost, incremental=True)
+  for step in range(40):
+    coor = rng.choice(coors)
+    if step % 2:
+      tile_map.set(coor, rng.choice([WALL, MUD, None]))
+    else:
+      tile_map.move(coor, rng.choice(coors))
+    expected = tile_map.distance_field(sources, passable=open_tile, cost=cost)
+    assert flat(expected.distances) == flat(field.distances)
+  field.close()
+  distances = flat(field.distances)
+  for coor in coors:
+    tile_map.set(coor, WALL)
+  assert distances == flat(field.distances)
+
+def test_matches_path_length(storage):
+  tile_map = factory.create_rectangle_hex_map(6, 6, storage)
+  for coor in [(0, 2), (-1, 2), (1, 2), (2, 2)]:
+    tile_map.set(coor, WALL)
+  field = tile_map.distance_field([(0, 0)], passable=open_tile)
+  for coor in tile_map.tile_coors():
+    found = path.bfs(tile_map, coor, (0, 0), passable=open_tile)
+    if tile_map.get(coor) == WALL:
+      continue
+    assert len(found) - 1 == field.distance(coor)
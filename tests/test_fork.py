@@ -0,0 +1,82 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import CHUNKED_STORAGE
+from .common import GamePiece
+import pytest
+
+def create_maps(storage):
+  return [factory.create_line_map(6, storage), factory.create_rectangle_map(4, 5, storage),
+          factory.create_rectangle_hex_map(4, 5, storage)]
+
+@pytest.fixture
+def tile_maps(storage):
+  if storage == CHUNKED_STORAGE:
+    return [factory.create_rectangle_map(4, 5, CHUNKED_STORAGE), factory.create_rectangle_hex_map(4, 5, CHUNKED_STORAGE)]
+  return create_maps(storage)
+
+def contents(tile_map):
+  return list(tile_map.tiles())
+
+def test_fork_is_independent(tile_maps):
+  for tile_map in tile_maps:
+    coors = list(tile_map.tile_coors())
+    first, second, third = coors[0], coors[2], coors[-1]
+    tile_map.set(first, GamePiece('pawn', 'black'))
+    tile_map.track(first, 'pawn')
+    before = contents(tile_map)
+    fork = tile_map.fork()
+    assert before == contents(fork)
+    fork.move(first, second)
+    fork.set(third, GamePiece('king', 'white'))
+    assert before == contents(tile_map)
+    assert first == tile_map.properties['pawn']
+    assert second == fork.properties['pawn']
+    # writes to the parent stay out of the fork
+    tile_map.set(second, GamePiece('rook', 'white'))
+    assert GamePiece('pawn', 'black') == fork.get(second)
+    assert GamePiece('rook', 'white') == tile_map.get(second)
+    assert GamePiece('pawn', 'black') == tile_map.get(first)
+    assert None == fork.get(first)
+
+def test_many_forks(tile_maps):
+  for tile_map in tile_maps:
+    coors = list(tile_map.tile_coors())
+    forks = [tile_map.fork() for _ in coors]
+    for fork, coor in zip(forks, coors):
+      fork.set(coor, GamePiece('meeple', 'blue'))
+    for fork, coor in zip(forks, coors):
+      assert [coor] == [occupied for occupied, _ in fork.occupied_tiles()]
+    assert [] == list(tile_map.occupied_tiles())
+    grandchild = forks[0].fork()
+    grandchild.clear()
+    assert GamePiece('meeple', 'blue') == forks[0].get(coors[0])
+
+def test_bulk_writes_copy(tile_maps):
+  for tile_map in tile_maps:
+    coors = list(tile_map.tile_coors())
+    fork = tile_map.fork()
+    fork.fill((coors[0], coors[-1]), GamePiece('wall', 'grey'))
+    fork.set_many(coors[:2], [None, None])
+    assert [] == list(tile_map.occupied_tiles())
+
+def test_fork_leaves_observers(tile_maps):
+  tile_map = tile_maps[0]
+  coor = next(tile_map.tile_coors())
+  tile_map.index_by(lambda piece: piece.name)
+  tile_map.checkpoint()
+  fork = tile_map.fork()
+  fork.set(coor, GamePiece('pawn', 'black'))
+  assert [] == tile_map.coors_of('pawn')
+  with pytest.raises(ValueError):
+    fork.find('pawn')
+
+def test_unbounded_fork():
+  tile_map = factory.create_sparse_rectangle_map(chunk_size=2)
+  tile_map.set((0, 0), GamePiece('pawn', 'black'))
+  tile_map.set((1, 1), GamePiece('pawn', 'white'))
+  fork = tile_map.fork()
+  fork.set((0, 0), None)
+  fork.set((-5, -5), GamePiece('rook', 'black'))
+  assert 1 == len(tile_map.chunks)
+  assert {(0, 0), (1, 1)} == {coor for coor, _ in tile_map.occupied_tiles()}
+  assert {(1, 1), (-5, -5)} == {coor for coor, _ in fork.occupied_tiles()}
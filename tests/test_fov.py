@@ -0,0 +1,111 @@
+from .context import tilemap
+from tilemap import factory, fov
+from tilemap.constants import CHEBYSHEV
+from .common import GamePiece
+import pytest
+
+WALL = GamePiece('wall', 'grey')
+
+def opaque(content):
+  return content == WALL
+
+def walled(tile_map, walls):
+  for coor in walls:
+    tile_map.set(coor, WALL)
+  return tile_map
+
+def test_open_rect(storage):
+  tile_map = factory.create_rectangle_map(9, 7, storage)
+  assert set(tile_map.tile_coors()) == fov.field_of_view(tile_map, (4, 3))
+  assert {(4, 3), (3, 3), (5, 3), (4, 2), (4, 4)} == fov.field_of_view(tile_map, (4, 3), radius=1)
+  assert 13 == len(fov.field_of_view(tile_map, (4, 3), radius=2))
+
+def test_rect_metric(storage):
+  tile_map = factory.create_rectangle_map(11, 11, storage)
+  visible = fov.field_of_view(tile_map, (5, 5), radius=3)
+  assert {coor for coor in tile_map.tile_coors() if tile_map.distance((5, 5), coor) <= 3} == visible
+  assert (7, 7) not in visible
+  tile_map.metric = CHEBYSHEV
+  visible = fov.field_of_view(tile_map, (5, 5), radius=3)
+  assert 49 == len(visible)
+  assert (8, 8) in visible
+
+def test_rect_shadow(storage):
+  tile_map = walled(factory.create_rectangle_map(9, 7, storage), [(3, 3)])
+  visible = fov.field_of_view(tile_map, (1, 3), opaque)
+  # the wall itself is seen, the tiles straight behind it are not
+  assert (3, 3) in visible
+  assert {(4, 3), (5, 3), (6, 3), (7, 3), (8, 3)}.isdisjoint(visible)
+  assert {(4, 2), (4, 4), (8, 0), (8, 6)} <= visible
+
+def test_rect_corridor(storage):
+  tile_map = factory.create_rectangle_map(7, 5, storage)
+  tile_map.fill(((0, 0), (6, 0)), WALL)
+  tile_map.fill(((0, 2), (6, 4)), WALL)
+  visible = fov.field_of_view(tile_map, (0, 1), opaque)
+  assert {(x, y) for x in range(7) for y in range(3)} == visible
+
+def test_symmetry(storage):
+  for tile_map in (factory.create_rectangle_map(8, 8, storage), factory.create_rectangle_hex_map(8, 8, storage)):
+    coors = list(tile_map.tile_coors())
+    walled(tile_map, coors[5::7])
+    open_coors = [coor for coor in coors if tile_map.get(coor) is None]
+    visible = {coor: fov.field_of_view(tile_map, coor, opaque) for coor in open_coors}
+    for first in open_coors:
+      for second in open_coors:
+        assert (second in visible[first]) == (first in visible[second])
+
+def test_open_hex(storage):
+  tile_map = factory.create_rectangle_hex_map(9, 9, storage)
+  assert set(tile_map.tile_coors()) == fov.field_of_view(tile_map, (2, 4))
+  visible = fov.field_of_view(tile_map, (2, 4), radius=2)
+  assert 19 == len(visible)
+  assert {(2, 4)} | {coor for coor, _ in tile_map.adjacent((2, 4))} == fov.field_of_view(tile_map, (2, 4), radius=1)
+
+def test_hex_shadow(storage):
+  tile_map = walled(factory.create_rectangle_hex_map(9, 7, storage), [(2, 3)])
+  visible = fov.field_of_view(tile_map, (0, 3), opaque)
+  assert (2, 3) in visible
+  assert {(3, 3), (4, 3), (5, 3), (6, 3)}.isdisjoint(visible)
+  assert {(3, 2), (2, 4), (0, 0)} <= visible
+
+def test_line_map(line_storage):
+  tile_map = walled(factory.create_line_map(10, line_storage), [2, 7])
+  assert {2, 3, 4, 5, 6, 7} == fov.field_of_view(tile_map, 5, opaque)
+  assert {4, 5, 6} == fov.field_of_view(tile_map, 5, opaque, radius=1)
+
+def test_line():
+  rect_map = factory.create_rectangle_map(9, 9)
+  assert [(0, 0), (1, 0), (2, 1), (3, 1), (4, 2), (5, 2)] == fov.line(rect_map, (0, 0), (5, 2))
+  assert [(5, 2), (4, 2), (3, 1), (2, 1), (1, 0), (0, 0)] == fov.line(rect_map, (5, 2), (0, 0))
+  hex_map = factory.create_rectangle_hex_map(9, 9)
+  assert [(0, 3), (1, 3), (2, 3), (3, 3)] == fov.line(hex_map, (0, 3), (3, 3))
+  hex_line = fov.line(hex_map, (0, 0), (3, 4))
+  assert 8 == len(hex_line)
+  assert all((b[0] - a[0], b[1] - a[1]) in hex_map.direction_map.values()
+             for a, b in zip(hex_line, hex_line[1:]))
+  assert [5, 4, 3] == fov.line(factory.create_line_map(9), 5, 3)
+
+def test_line_of_sight(storage):
+  tile_map = walled(factory.create_rectangle_map(9, 9, storage), [(2, 1)])
+  assert not fov.line_of_sight(tile_map, (0, 0), (4, 2), opaque)
+  assert fov.line_of_sight(tile_map, (0, 0), (4, 2))
+  assert fov.line_of_sight(tile_map, (0, 0), (2, 1), opaque)
+  assert fov.line_of_sight(tile_map, (0, 0), (0, 8), opaque)
+  with pytest.raises(IndexError):
+    fov.line_of_sight(tile_map, (0, 0), (9, 0))
+
+def test_fields_of_view(storage):
+  tile_map = walled(factory.create_rectangle_hex_map(6, 5, storage), [(1, 1), (2, 2), (0, 3)])
+  origins = [(0, 0), (3, 2), (-2, 4)]
+  fields = fov.fields_of_view(tile_map, origins, opaque, radius=3)
+  assert 3 == len(fields)
+  for origin, field in zip(origins, fields):
+    expected = fov.field_of_view(tile_map, origin, opaque, radius=3)
+    if storage == 'array':
+      assert (6 * 5,) == (field.size,)
+      assert expected == {tile_map.coor_of(index) for index in field.reshape(-1).nonzero()[0].tolist()}
+    else:
+      assert expected == {tile_map.coor_of(index) for index in range(30) if field >> index & 1}
+  with pytest.raises(IndexError):
+    fov.fields_of_view(tile_map, [(0, 0), (9, 9)])
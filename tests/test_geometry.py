@@ -0,0 +1,146 @@
+from .context import tilemap
+from tilemap import factory, geometry
+from tilemap.constants import *
+from .common import shift_coor
+import copy
+import gc
+import pickle
+import pytest
+import weakref
+
+CREATORS = [factory.create_rectangle_map, factory.create_rectangle_hex_map]
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_shared_coordinates(create, storage):
+  first = create(4, 5, storage)
+  second = create(4, 5, LIST_STORAGE)
+  coors = list(second.tile_coors())
+  assert all(coor is other for coor, other in zip(first.tile_coors(), coors))
+  assert all(any(coor is other for other in coors) for coor in first.side_coors())
+  for coor in coors:
+    assert all(any(adjacent is other for other in coors) for adjacent, _ in first.adjacent(coor))
+  assert first.neighbor_table() is second.neighbor_table()
+  assert first.neighbor_table() is not create(5, 4, storage).neighbor_table()
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_adjacent_order(create):
+  tile_map = create(4, 5)
+  for coor in tile_map.tile_coors():
+    shifted = [shift_coor(coor, shift) for shift in tile_map.direction_map.values()]
+    assert [adjacent for adjacent, _ in tile_map.adjacent(coor)] == list(filter(tile_map.exists, shifted))
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_over_intern_limit(create, monkeypatch):
+  interned = create(4, 5)
+  monkeypatch.setattr(geometry, 'INTERN_LIMIT', 10)
+  monkeypatch.setattr(geometry, '_GEOMETRIES', {})
+  tile_map = create(4, 5)
+  assert next(tile_map.tile_coors()) is not next(interned.tile_coors())
+  assert list(interned.tile_coors()) == list(tile_map.tile_coors())
+  assert list(interned.side_coors()) == list(tile_map.side_coors())
+  for coor in tile_map.tile_coors():
+    assert list(interned.adjacent(coor)) == list(tile_map.adjacent(coor))
+  assert tile_map.neighbor_table() is not create(4, 5).neighbor_table()
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_table_freed_with_maps(create):
+  first = create(4, 5)
+  table = weakref.ref(first.neighbor_table())
+  second = create(4, 5)
+  assert table() is second.neighbor_table()
+  del first, second
+  gc.collect()
+  assert table() is None
+  assert create(4, 5).neighbor_table() is not None
+
+def test_own_directions():
+  king_map = factory.create_rectangle_map(6, 6)
+  assert 4 == len(list(king_map.adjacent((2, 2))))
+  king_map.direction_map = {**RECT_DIRECTION_MAP, NE: (1, -1), SE: (1, 1), SW: (-1, 1), NW: (-1, -1)}
+  assert 8 == len(list(king_map.adjacent((2, 2))))
+  king_map.set((2, 2), True)
+  assert 9 == king_map.bitboard().expand().count()
+  tile_map = factory.create_rectangle_map(6, 6)
+  assert 4 == len(list(tile_map.adjacent((2, 2))))
+  assert tile_map.direction_map is RECT_DIRECTION_MAP
+  assert king_map.neighbor_table() is not tile_map.neighbor_table()
+  loaded = pickle.loads(pickle.dumps(king_map))
+  assert king_map.direction_map == loaded.direction_map
+  assert 8 == len(list(loaded.adjacent((2, 2))))
+
+def test_cache_size(monkeypatch):
+  monkeypatch.setattr(geometry, 'CACHE_SIZE', 2)
+  monkeypatch.setattr(geometry, '_GEOMETRIES', {})
+  maps = [factory.create_line_map(length) for length in range(1, 5)]
+  tables = [tile_map.neighbor_table() for tile_map in maps]
+  # only the two newest layouts are still shared
+  assert tables[3] is factory.create_line_map(4).neighbor_table()
+  assert tables[0] is not factory.create_line_map(1).neighbor_table()
+  assert [1, 2, 3, 4] == [len(list(tile_map.tile_coors())) for tile_map in maps]
+
+def test_unbounded_map():
+  tile_map = factory.create_sparse_rectangle_map()
+  tile_map.set((100, -3), 'x')
+  assert 4 == len(list(tile_map.adjacent((100, -3))))
+  assert [] == list(tile_map.side_coors())
+
+def test_slots(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  assert not hasattr(tile_map, '__dict__')
+  with pytest.raises(AttributeError):
+    tile_map.unknown = 1
+  tile_map.enable_stats()
+  assert not hasattr(tile_map, '__dict__')
+  tile_map.disable_stats()
+  with tile_map.unchecked():
+    assert not hasattr(tile_map, '__dict__')
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_is_side(create, storage):
+  for width, height in [(4, 5), (2, 3), (1, 1)]:
+    tile_map = create(width, height, storage)
+    sides = set(tile_map.side_coors())
+    assert all(tile_map.is_side(coor) == (coor in sides) for coor in tile_map.tile_coors())
+    for coor in tile_map.tile_coors():
+      assert tile_map.is_side(coor) == (len(list(tile_map.adjacent(coor))) < len(tile_map.direction_map))
+  with pytest.raises(IndexError):
+    tile_map.is_side((5, 5))
+
+def test_is_side_line():
+  tile_map = factory.create_line_map(5)
+  assert [True, False, False, False, True] == [tile_map.is_side(coor) for coor in range(5)]
+  assert not factory.create_sparse_rectangle_map().is_side((3, 4))
+
+def test_hex_tables():
+  tile_map = factory.create_rectangle_hex_map(4, 5)
+  assert [(0, 0), (-1, 1), (-1, 2), (-2, 3), (-2, 4)] == list(tile_map.tile_coors())[::4]
+  chunked = factory.create_rectangle_hex_map(4, 5, CHUNKED_STORAGE)
+  for hex_map in [tile_map, chunked]:
+    assert [index * 4 for index in range(5)] == [hex_map.index_of((-((r + 1) // 2), r)) for r in range(5)]
+  for r in range(-2, 8):
+    for q in range(-5, 7):
+      row_offset = (r + 1) // 2
+      assert tile_map.exists((q, r)) == (0 <= r < 5 and 0 <= q + row_offset < 4)
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_coor_of_interned(create):
+  tile_map = create(4, 5)
+  coors = list(tile_map.tile_coors())
+  assert all(tile_map.coor_of(index) is coor for index, coor in enumerate(coors))
+
+@pytest.mark.parametrize('create', CREATORS)
+def test_pickle_and_copy(create, storage):
+  tile_map = create(4, 5, storage)
+  tile_map.set((1, 2), 'x')
+  list(tile_map.adjacent((1, 2)))
+  data = pickle.dumps(tile_map)
+  assert b'Geometry' not in data
+  for loaded in [pickle.loads(data), copy.deepcopy(tile_map)]:
+    assert loaded.neighbor_table() is tile_map.neighbor_table()
+    assert all(coor is other for coor, other in zip(loaded.tile_coors(), tile_map.tile_coors()))
+    assert type(loaded) is type(tile_map)
+    assert loaded.direction_map is tile_map.direction_map
+    assert 'x' == loaded.get((1, 2))
+    loaded.set((0, 3), 'y')
+    assert {(1, 2), (0, 3)} == {coor for coor, _ in loaded.tiles(skip_empty=True)}
+    assert None == tile_map.get((0, 3))
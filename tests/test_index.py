@@ -0,0 +1,51 @@
+from .context import tilemap
+from tilemap import factory
+from .common import GamePiece
+import pytest
+
+def piece_key(piece):
+  return (piece.name, piece.color)
+
+@pytest.fixture
+def indexed_map(storage):
+  tile_map = factory.create_rectangle_map(4, 4, storage)
+  tile_map.set((0, 1), GamePiece('pawn', 'black'))
+  tile_map.set((1, 1), GamePiece('pawn', 'black'))
+  tile_map.set((3, 3), GamePiece('king', 'white'))
+  tile_map.index_by(piece_key)
+  return tile_map
+
+def test_find(indexed_map):
+  assert {(0, 1), (1, 1)} == set(indexed_map.coors_of(('pawn', 'black')))
+  assert [((3, 3), GamePiece('king', 'white'))] == indexed_map.find(('king', 'white'))
+  assert [] == indexed_map.find(('queen', 'white'))
+
+def test_set(indexed_map):
+  indexed_map.set((0, 1), GamePiece('queen', 'white'))
+  indexed_map.set((2, 2), GamePiece('pawn', 'black'))
+  indexed_map.set((3, 3), None)
+  assert {(1, 1), (2, 2)} == set(indexed_map.coors_of(('pawn', 'black')))
+  assert [(0, 1)] == indexed_map.coors_of(('queen', 'white'))
+  assert [] == indexed_map.coors_of(('king', 'white'))
+
+def test_move_and_swap(indexed_map):
+  indexed_map.move((0, 1), (1, 1))
+  assert [(1, 1)] == indexed_map.coors_of(('pawn', 'black'))
+  indexed_map.swap((1, 1), (3, 3))
+  assert [(3, 3)] == indexed_map.coors_of(('pawn', 'black'))
+  assert [(1, 1)] == indexed_map.coors_of(('king', 'white'))
+
+def test_bulk(indexed_map):
+  indexed_map.set_many([(0, 0), (0, 1)], [GamePiece('pawn', 'black'), None])
+  assert {(0, 0), (1, 1)} == set(indexed_map.coors_of(('pawn', 'black')))
+  indexed_map.fill(((0, 0), (1, 3)), GamePiece('wall', 'grey'))
+  assert [] == indexed_map.coors_of(('pawn', 'black'))
+  assert 8 == len(indexed_map.coors_of(('wall', 'grey')))
+  indexed_map.clear()
+  assert [] == indexed_map.coors_of(('wall', 'grey'))
+  assert [] == indexed_map.coors_of(('king', 'white'))
+
+def test_drop_index(indexed_map):
+  indexed_map.drop_index()
+  with pytest.raises(ValueError):
+    indexed_map.find(('pawn', 'black'))
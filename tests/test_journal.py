@@ -0,0 +1,99 @@
+from .context import tilemap
+from tilemap import factory
+from .common import GamePiece
+import random
+import pytest
+
+@pytest.fixture
+def simple_map(storage):
+  tile_map = factory.create_rectangle_map(4, 4, storage)
+  tile_map.set((1, 1), GamePiece('pawn', 'black'))
+  tile_map.set((2, 0), GamePiece('bishop', 'white'))
+  tile_map.track((2, 0), 'bishop')
+  return tile_map
+
+def snapshot(tile_map):
+  return (list(tile_map.tiles()), dict(tile_map.tracking), dict(tile_map.properties))
+
+def test_undo_move_and_swap(simple_map):
+  before = snapshot(simple_map)
+  checkpoint = simple_map.checkpoint()
+  simple_map.move((2, 0), (1, 1))
+  simple_map.swap((1, 1), (3, 3))
+  simple_map.track((0, 0), 'empty')
+  simple_map.set((0, 0), GamePiece('meeple', 'blue'))
+  assert (3, 3) == simple_map.properties['bishop']
+  after = snapshot(simple_map)
+  simple_map.undo(checkpoint)
+  assert before == snapshot(simple_map)
+  assert 'empty' not in simple_map.properties
+  simple_map.redo()
+  assert after == snapshot(simple_map)
+
+def test_nested_checkpoints(simple_map):
+  first = simple_map.checkpoint()
+  simple_map.set((0, 0), GamePiece('meeple', 'blue'))
+  middle_state = snapshot(simple_map)
+  second = simple_map.checkpoint()
+  simple_map.clear()
+  simple_map.undo(second)
+  assert middle_state == snapshot(simple_map)
+  simple_map.undo(first)
+  assert None == simple_map.get((0, 0))
+  simple_map.redo(second)
+  assert middle_state == snapshot(simple_map)
+  with pytest.raises(ValueError):
+    simple_map.undo(second + 1)
+
+def test_new_change_drops_redo(simple_map):
+  checkpoint = simple_map.checkpoint()
+  simple_map.set((0, 0), GamePiece('meeple', 'blue'))
+  simple_map.undo(checkpoint)
+  simple_map.set((0, 1), GamePiece('road', 'red'))
+  simple_map.redo()
+  assert None == simple_map.get((0, 0))
+  assert GamePiece('road', 'red') == simple_map.get((0, 1))
+
+def test_random_rollback(simple_map):
+  rng = random.Random(3)
+  coors = list(simple_map.tile_coors())
+  simple_map.index_by(lambda piece: piece.name)
+  before = snapshot(simple_map)
+  checkpoint = simple_map.checkpoint()
+  for step in range(200):
+    first, second = rng.choice(coors), rng.choice(coors)
+    operation = step % 4
+    if operation == 0:
+      simple_map.set(first, rng.choice([None, GamePiece('pawn', 'black'), GamePiece('rook', 'white')]))
+    elif operation == 1:
+      simple_map.move(first, second)
+    elif operation == 2:
+      simple_map.swap(first, second)
+    else:
+      simple_map.track(first, 'piece{}'.format(step))
+  simple_map.undo(checkpoint)
+  assert before == snapshot(simple_map)
+  assert [(1, 1)] == simple_map.coors_of('pawn')
+  assert [] == simple_map.coors_of('rook')
+
+def test_index_after_checkpoint(simple_map):
+  before = snapshot(simple_map)
+  checkpoint = simple_map.checkpoint()
+  simple_map.set((0, 0), GamePiece('rook', 'white'))
+  simple_map.index_by(lambda piece: piece.name)
+  simple_map.set((3, 3), GamePiece('rook', 'black'))
+  assert {(0, 0), (3, 3)} == set(simple_map.coors_of('rook'))
+  simple_map.undo(checkpoint)
+  assert before == snapshot(simple_map)
+  assert [] == simple_map.coors_of('rook')
+  simple_map.drop_index()
+  simple_map.redo()
+  assert GamePiece('rook', 'black') == simple_map.get((3, 3))
+
+def test_without_journal(simple_map):
+  with pytest.raises(ValueError):
+    simple_map.undo(0)
+  simple_map.checkpoint()
+  simple_map.stop_journal()
+  with pytest.raises(ValueError):
+    simple_map.redo()
@@ -0,0 +1,165 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import *
+from tilemap.zobrist import ZobristTable
+from .common import GamePiece
+import pytest
+
+LAYERS = {'terrain': BYTE_STORAGE, 'fog': BIT_STORAGE, 'units': LIST_STORAGE}
+CREATORS = [lambda layers: factory.create_layered_rectangle_map(4, 3, layers),
+            lambda layers: factory.create_layered_rectangle_hex_map(4, 3, layers)]
+
+@pytest.fixture(params=CREATORS, ids=['rect', 'hex'])
+def board(request):
+  return request.param(LAYERS)
+
+@pytest.mark.parametrize('create', [factory.create_line_map, factory.create_rectangle_map,
+                                    factory.create_rectangle_hex_map])
+def test_byte_storage(create):
+  tile_map = create(*([9] if create is factory.create_line_map else [3, 3]), storage=BYTE_STORAGE)
+  coors = list(tile_map.tile_coors())
+  assert all(content is None for _, content in tile_map.tiles())
+  tile_map.set(coors[4], 7)
+  assert 7 == tile_map.get(coors[4])
+  assert 7 == tile_map.values[4]
+  assert 7 == tile_map.set(coors[4], 0)
+  assert tile_map.get(coors[4]) is None
+  with pytest.raises(ValueError):
+    tile_map.set(coors[1], 256)
+  with pytest.raises(ValueError):
+    tile_map.set(coors[1], 'grass')
+  with pytest.raises(ValueError):
+    tile_map.set(coors[1], True)
+  with pytest.raises(ValueError):
+    tile_map.set_many(coors[:2], [3, -1])
+  assert [None, None] == tile_map.get_many(coors[:2])
+  tile_map.set_many(coors[:2], [3, 255])
+  assert [(coors[0], 3), (coors[1], 255)] == list(tile_map.occupied_tiles())
+
+@pytest.mark.parametrize('create', [factory.create_line_map, factory.create_rectangle_map,
+                                    factory.create_rectangle_hex_map])
+def test_bit_storage(create):
+  tile_map = create(*([11] if create is factory.create_line_map else [3, 4]), storage=BIT_STORAGE)
+  coors = list(tile_map.tile_coors())
+  assert 2 == len(tile_map.bits)
+  for coor in coors[::3]:
+    tile_map.set(coor, 'seen')
+  assert [True if index % 3 == 0 else None for index in range(len(coors))] == [content for _, content in tile_map.tiles()]
+  assert 4 == tile_map.count()
+  tile_map.set(coors[9], False)
+  assert tile_map.get(coors[9]) is None
+  assert 3 == tile_map.count()
+  tile_map.move(coors[0], coors[10])
+  assert [coors[3], coors[6], coors[10]] == [coor for coor, _ in tile_map.occupied_tiles()]
+
+@pytest.mark.parametrize('storage, content, stored', [(BYTE_STORAGE, 0, None), (BIT_STORAGE, 'fog', True)])
+def test_observers_see_stored_content(storage, content, stored):
+  table = ZobristTable(seed=3)
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.set((0, 0), 1)
+  tile_map.index_by(lambda content: content)
+  tile_map.enable_zobrist(table=table)
+  tile_map.enable_changes()
+  tile_map.set((0, 0), content)
+  tile_map.set_index(1, content)
+  tile_map.set_many([(1, 1), (2, 2)], [content, content])
+  tile_map.fill(((0, 2), (1, 2)), content)
+  assert all(change.new == tile_map.get(change.coor) for change in tile_map.drain_changes().tiles)
+  occupied = [coor for coor, _ in tile_map.occupied_tiles()]
+  if stored is not None:
+    assert sorted(occupied) == sorted(tile_map.coors_of(stored))
+  assert [] == tile_map.coors_of(content)
+  fresh = factory.create_rectangle_map(3, 3, storage)
+  fresh.set_many(occupied, [1] * len(occupied))
+  fresh.enable_zobrist(table=table)
+  assert fresh.zobrist == tile_map.zobrist
+
+@pytest.mark.parametrize('storage', [BYTE_STORAGE, BIT_STORAGE])
+def test_fork_storage(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.set((1, 1), 1)
+  fork = tile_map.fork()
+  fork.set((1, 1), None)
+  fork.set((2, 2), 1)
+  assert [((1, 1), True if storage == BIT_STORAGE else 1)] == list(tile_map.occupied_tiles())
+  assert [(2, 2)] == [coor for coor, _ in fork.occupied_tiles()]
+
+def test_get_set(board):
+  coor = list(board.tile_coors())[5]
+  assert board.set(coor, 3, 'terrain') is None
+  board.set(coor, True, 'fog')
+  board.set(coor, GamePiece('knight', 'red'), 'units')
+  assert 3 == board.get(coor, 'terrain')
+  assert board.get(coor, 'fog')
+  assert GamePiece('knight', 'red') == board.get(coor, 'units')
+  assert {'terrain': 3, 'fog': True, 'units': GamePiece('knight', 'red')} == board.get_all(coor)
+  assert {'fog': True} == board.get_all(coor, ['fog'])
+  assert {'terrain': 3, 'units': GamePiece('knight', 'red')} == board.set_all(coor, {'terrain': 4, 'units': None})
+  assert (4, True, None) == dict(board.tiles())[coor]
+
+def test_errors(board):
+  with pytest.raises(IndexError):
+    board.get((9, 9), 'terrain')
+  with pytest.raises(IndexError):
+    board.get_all((9, 9))
+  with pytest.raises(IndexError):
+    board.get_many([(0, 0), (9, 9)])
+  with pytest.raises(ValueError):
+    board.get((0, 0), 'items')
+  with pytest.raises(ValueError):
+    board.set_many([(0, 0)], {'terrain': [1, 2]})
+  with pytest.raises(IndexError):
+    board.set_many([(0, 0), (9, 9)], {'terrain': [1, 2]})
+  with pytest.raises(ValueError):
+    board.set_all((0, 0), {'units': 'pawn', 'terrain': 'grass'})
+  with pytest.raises(ValueError):
+    board.set_many([(0, 0)], {'units': ['pawn'], 'terrain': [True]})
+  assert {'terrain': None, 'fog': None, 'units': None} == board.get_all((0, 0))
+
+def test_mismatched_layers():
+  with pytest.raises(ValueError):
+    tilemap.layers.LayeredMap({'terrain': factory.create_rectangle_map(3, 3, BYTE_STORAGE),
+                               'units': factory.create_rectangle_map(3, 4)})
+  with pytest.raises(ValueError):
+    tilemap.layers.LayeredMap({'terrain': factory.create_rectangle_map(3, 3),
+                               'units': factory.create_rectangle_hex_map(3, 3)})
+  with pytest.raises(ValueError):
+    tilemap.layers.LayeredMap({})
+
+def test_bulk(board):
+  coors = list(board.tile_coors())
+  board.set_many(coors[:3], {'terrain': [1, 2, 3], 'units': ['a', 'b', 'c']})
+  assert {'terrain': [1, 2, 3], 'fog': [None] * 3, 'units': ['a', 'b', 'c']} == board.get_many(coors[:3])
+  board.fill((coors[0], coors[-1]), {'fog': True})
+  assert 12 == board.layer('fog').count()
+  board.clear(['terrain', 'fog'])
+  assert [('a', None), ('b', None), ('c', None)] == [contents for _, contents in board.tiles(layers=['units', 'fog'])][:3]
+  assert [] == list(board.layer('terrain').occupied_tiles())
+
+def test_track_and_move(board):
+  start, middle, end = list(board.tile_coors())[:3]
+  board.set(start, GamePiece('knight', 'red'), 'units')
+  board.set(start, 2, 'terrain')
+  board.track(start, 'knight', 'units')
+  board.move(start, end, 'units')
+  assert end == board.locate('knight', 'units')
+  assert 2 == board.get(start, 'terrain')
+  assert board.get(start, 'units') is None
+  board.set(middle, 5, 'terrain')
+  board.track(middle, 'mountain', 'terrain')
+  board.set(end, 1, 'terrain')
+  assert end == board.locate('knight', 'units')
+  assert middle == board.locate('mountain', 'terrain')
+  board.set_all(middle, {'terrain': 6})
+  assert board.locate('mountain', 'terrain') is None
+
+def test_fork(board):
+  coor = next(board.tile_coors())
+  fork = board.fork()
+  fork.set_all(coor, {'terrain': 9, 'units': 'pawn'})
+  assert {'terrain': None, 'fog': None, 'units': None} == board.get_all(coor)
+  assert {'terrain': 9, 'fog': None, 'units': 'pawn'} == fork.get_all(coor)
+
+def test_shared_geometry(storage):
+  board = factory.create_layered_rectangle_map(5, 5, {'terrain': BYTE_STORAGE, 'units': storage})
+  assert board.layer('terrain').neighbor_table() is board.layer('units').neighbor_table()
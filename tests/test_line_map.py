@@ -4,16 +4,16 @@ from .common import GamePiece
 import pytest
 
 @pytest.fixture
-def zero_map():
-  return factory.create_line_map(0)
+def zero_map(line_storage):
+  return factory.create_line_map(0, line_storage)
 
 @pytest.fixture
-def one_map():
-  return factory.create_line_map(1)
+def one_map(line_storage):
+  return factory.create_line_map(1, line_storage)
 
 @pytest.fixture
-def empty_map():
-  return factory.create_line_map(8)
+def empty_map(line_storage):
+  return factory.create_line_map(8, line_storage)
 
 @pytest.fixture
 def simple_map(empty_map):
@@ -165,3 +165,29 @@ def test_track(simple_map):
   simple_map.set(4, GamePiece('meeple', 'blue'))
   assert None == simple_map.properties['empty']
   assert None == simple_map.properties['bishop']
+
+def test_get_many(simple_map):
+  assert [GamePiece('bishop', 'white'), None, GamePiece('pawn', 'black')] == simple_map.get_many([5, 0, 2])
+  with pytest.raises(IndexError):
+    simple_map.get_many([0, 8])
+
+def test_set_many(simple_map):
+  simple_map.track(2, 'pawn')
+  assert [GamePiece('pawn', 'black'), None] == simple_map.set_many([2, 3], [None, GamePiece('road', 'red')])
+  assert None == simple_map.get(2)
+  assert GamePiece('road', 'red') == simple_map.get(3)
+  assert None == simple_map.properties['pawn']
+  with pytest.raises(IndexError):
+    simple_map.set_many([0, -1], [GamePiece('cube', 'brown'), GamePiece('cube', 'brown')])
+  assert None == simple_map.get(0)
+
+def test_fill(simple_map):
+  simple_map.track(5, 'bishop')
+  simple_map.fill((1, 4), GamePiece('road', 'red'))
+  assert [None, GamePiece('road', 'red'), GamePiece('road', 'red')] == simple_map.get_many([0, 1, 4])
+  assert GamePiece('bishop', 'white') == simple_map.get(5)
+  assert 5 == simple_map.properties['bishop']
+
+def test_clear(simple_map):
+  simple_map.clear()
+  assert [None] * 8 == [content for _, content in simple_map.tiles()]
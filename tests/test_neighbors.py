@@ -0,0 +1,55 @@
+from .context import tilemap
+from tilemap import factory, neighbors
+from tilemap.constants import *
+import pytest
+
+def all_maps():
+  return [factory.create_line_map(6), factory.create_rectangle_map(3, 4),
+          factory.create_rectangle_hex_map(3, 4), factory.create_rectangle_map(1, 1)]
+
+@pytest.mark.parametrize('tile_map', all_maps())
+def test_matches_adjacent(tile_map):
+  table = tile_map.neighbor_table()
+  assert len(list(tile_map.tile_coors())) == len(table)
+  for index, coor in enumerate(tile_map.tile_coors()):
+    expected = {adjacent_coor for adjacent_coor, _ in tile_map.adjacent(coor)}
+    assert expected == {tile_map.coor_of(i) for i in tile_map.adjacent_indices(index)}
+
+@pytest.mark.parametrize('tile_map', all_maps())
+def test_pure_python_build(tile_map, monkeypatch):
+  table = tile_map.neighbor_table()
+  monkeypatch.setattr(neighbors, 'numpy', None)
+  python_table = neighbors.build_neighbor_table(tile_map)
+  assert list(table.offsets) == list(python_table.offsets)
+  assert list(table.indices) == list(python_table.indices)
+  assert list(table.directions) == list(python_table.directions)
+
+def test_directions():
+  tile_map = factory.create_rectangle_map(3, 4)
+  table = tile_map.neighbor_table()
+  # (1, 1) has index 5
+  start, end = table.offsets[5], table.offsets[6]
+  actual = dict(zip(table.directions[start:end], table.indices[start:end]))
+  assert {NORTH: 4, EAST: 9, SOUTH: 6, WEST: 1} == actual
+
+def test_adjacent_indices_out_of_bounds():
+  tile_map = factory.create_rectangle_hex_map(3, 4)
+  with pytest.raises(IndexError):
+    tile_map.adjacent_indices(12)
+  with pytest.raises(IndexError):
+    tile_map.adjacent_indices(-1)
+
+def test_neighbors_array():
+  pytest.importorskip('numpy')
+  tile_map = factory.create_rectangle_map(3, 4)
+  offsets, indices = tile_map.neighbors_array()
+  assert 13 == len(offsets)
+  assert [4, 1] == list(indices[offsets[0]:offsets[1]])
+  padded = tile_map.neighbor_table().padded()
+  # columns follow RECT_DIRECTION_MAP: north, east, south, west
+  assert [12, 4, 1, 12] == list(padded[0])
+
+def test_array_storage_table():
+  pytest.importorskip('numpy')
+  tile_map = factory.create_rectangle_hex_map(3, 4, ARRAY_STORAGE)
+  assert factory.create_rectangle_hex_map(3, 4).neighbor_table().indices == tile_map.neighbor_table().indices
@@ -0,0 +1,69 @@
+from .context import tilemap
+from tilemap import factory, fov
+from tilemap.constants import CHEBYSHEV, LIST_STORAGE
+from .common import GamePiece
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+WALL = GamePiece('wall', 'grey')
+
+def count_walls(view, region):
+  return sum(1 for _ in view.tiles(region, skip_empty=True))
+
+def region_coors(view, region):
+  return list(view.tile_coors(region))
+
+def try_write(view, coor):
+  try:
+    view.set(coor, WALL)
+  except ValueError:
+    return 'read-only'
+  return 'written'
+
+def visible_count(view, origin):
+  return len(fov.field_of_view(view, origin, lambda content: content == WALL))
+
+def describe(view, _):
+  return (view.properties['turn'], view.tracking, view.metric if hasattr(view, 'metric') else None)
+
+def walled(tile_map):
+  for number, coor in enumerate(tile_map.tile_coors()):
+    if number % 4 == 1:
+      tile_map.set(coor, WALL)
+  return tile_map
+
+def test_parallel_map(storage):
+  for tile_map in (walled(factory.create_rectangle_map(9, 7, storage)),
+                   walled(factory.create_rectangle_hex_map(9, 7, storage))):
+    counts = tile_map.parallel_map(count_walls, region_split=3, workers=2)
+    assert 3 == len(counts)
+    assert len(list(tile_map.occupied_tiles())) == sum(counts)
+
+def test_regions_cover_map():
+  tile_map = factory.create_rectangle_hex_map(5, 7)
+  with tile_map.shared(workers=2) as shared:
+    regions = shared.regions(3)
+    assert 3 == len(regions)
+    coors = [coor for band in shared.map(region_coors, regions) for coor in band]
+    assert list(tile_map.tile_coors()) == coors
+    assert 7 == len(shared.regions(50))
+
+def test_views_are_read_only():
+  tile_map = factory.create_line_map(6, LIST_STORAGE)
+  assert ['read-only'] == tile_map.parallel_map(try_write, [2], workers=1)
+  assert None == tile_map.get(2)
+
+def test_map_items(storage):
+  tile_map = walled(factory.create_rectangle_map(8, 8, storage))
+  viewers = [(0, 0), (3, 4), (7, 7), (2, 6)]
+  with tile_map.shared(workers=2) as shared:
+    assert [visible_count(tile_map, viewer) for viewer in viewers] == shared.map_items(visible_count, viewers)
+
+def test_view_state():
+  tile_map = factory.create_rectangle_map(4, 4)
+  tile_map.set((1, 1), WALL)
+  tile_map.track((1, 1), 'wall')
+  tile_map.properties['turn'] = 3
+  tile_map.metric = CHEBYSHEV
+  assert [(3, {(1, 1): 'wall'}, CHEBYSHEV)] == tile_map.parallel_map(describe, 1, workers=1)
@@ -0,0 +1,74 @@
+from .context import tilemap
+from tilemap import factory, path
+from .common import GamePiece
+import pytest
+
+WALL = GamePiece('wall', 'grey')
+
+def open_tile(content):
+  return content != WALL
+
+@pytest.fixture
+def walled_map(storage):
+  # . # . . .
+  # . # . # .
+  # . . . # .
+  tile_map = factory.create_rectangle_map(5, 3, storage)
+  for coor in [(1, 0), (1, 1), (3, 1), (3, 2)]:
+    tile_map.set(coor, WALL)
+  return tile_map
+
+@pytest.mark.parametrize('search', [path.astar, path.dijkstra, path.bfs])
+def test_around_walls(walled_map, search):
+  found = search(walled_map, (0, 0), (4, 2), passable=open_tile)
+  assert [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (3, 0), (4, 0), (4, 1), (4, 2)] == found
+
+@pytest.mark.parametrize('search', [path.astar, path.dijkstra, path.bfs])
+def test_unreachable(walled_map, search):
+  walled_map.set((3, 0), WALL)
+  assert None == search(walled_map, (0, 0), (4, 2), passable=open_tile)
+  assert None == search(walled_map, (0, 0), (3, 0), passable=open_tile)
+  assert [(0, 0)] == search(walled_map, (0, 0), (0, 0), passable=open_tile)
+
+def test_out_of_bounds(walled_map):
+  with pytest.raises(IndexError):
+    path.astar(walled_map, (0, 0), (5, 0))
+  with pytest.raises(IndexError):
+    path.bfs(walled_map, (-1, 0), (0, 0))
+
+def test_costs():
+  mud = GamePiece('mud', 'brown')
+  tile_map = factory.create_rectangle_map(3, 3)
+  tile_map.set((1, 0), mud)
+  tile_map.set((1, 1), mud)
+  cost = lambda content: 10 if content == mud else 1
+  expected = [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0)]
+  assert expected == path.astar(tile_map, (0, 0), (2, 0), cost=cost)
+  assert expected == path.dijkstra(tile_map, (0, 0), (2, 0), cost=cost)
+  assert 3 == len(path.bfs(tile_map, (0, 0), (2, 0)))
+
+def test_hex():
+  tile_map = factory.create_rectangle_hex_map(3, 4)
+  found = path.astar(tile_map, (0, 0), (-2, 3))
+  assert 4 == len(found)
+  assert 3 == path.hex_distance((0, 0), (-2, 3))
+  for first, second in zip(found, found[1:]):
+    assert 1 == path.hex_distance(first, second)
+  tile_map.set((-1, 2), WALL)
+  tile_map.set((-1, 3), WALL)
+  assert None == path.astar(tile_map, (0, 0), (-2, 3), passable=open_tile)
+
+def test_line():
+  tile_map = factory.create_line_map(6)
+  assert [1, 2, 3, 4] == path.astar(tile_map, 1, 4)
+  tile_map.set(3, WALL)
+  assert None == path.bfs(tile_map, 1, 4, passable=open_tile)
+
+def test_custom_heuristic(walled_map):
+  found = path.astar(walled_map, (0, 0), (4, 2), passable=open_tile, heuristic=lambda first, second: 0)
+  assert 11 == len(found)
+
+def test_default_heuristic():
+  assert path.manhattan_distance == path.default_heuristic(factory.create_rectangle_map(2, 2))
+  assert path.hex_distance == path.default_heuristic(factory.create_rectangle_hex_map(2, 2))
+  assert path.line_distance == path.default_heuristic(factory.create_line_map(2))
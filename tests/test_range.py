@@ -0,0 +1,77 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import CHEBYSHEV, CHUNKED_STORAGE, MANHATTAN
+from .common import GamePiece
+import pytest
+
+PAWN = GamePiece('pawn', 'black')
+
+def brute_force(tile_map, coor, keep):
+  return [(tile_coor, tile_map.get(tile_coor)) for tile_coor in tile_map.tile_coors()
+          if keep(tile_map.distance(coor, tile_coor))]
+
+def check_ranges(tile_map, centers, radii):
+  for coor in centers:
+    for radius in radii:
+      assert brute_force(tile_map, coor, lambda distance: distance <= radius) == list(tile_map.within(coor, radius))
+      assert brute_force(tile_map, coor, lambda distance: distance == radius) == list(tile_map.ring(coor, radius))
+
+def test_distance():
+  rect_map = factory.create_rectangle_map(5, 5)
+  assert 7 == rect_map.distance((0, 0), (3, 4))
+  rect_map.metric = CHEBYSHEV
+  assert 4 == rect_map.distance((0, 0), (3, 4))
+  assert 5 == factory.create_rectangle_hex_map(5, 5).distance((0, 0), (-2, 5))
+  assert 6 == factory.create_line_map(5).distance(7, 1)
+  rect_map.metric = 'euclid'
+  with pytest.raises(ValueError):
+    rect_map.distance((0, 0), (1, 1))
+
+def test_rect_ranges(storage):
+  tile_map = factory.create_rectangle_map(7, 6, storage)
+  tile_map.set((2, 3), PAWN)
+  assert MANHATTAN == tile_map.metric
+  assert [((1, 3), None), ((2, 2), None), ((2, 3), PAWN), ((2, 4), None), ((3, 3), None)] == list(tile_map.within((2, 3), 1))
+  check_ranges(tile_map, [(0, 0), (2, 3), (6, 5)], [0, 1, 2, 4, 9])
+  tile_map.metric = CHEBYSHEV
+  assert 9 == len(list(tile_map.within((2, 3), 1)))
+  check_ranges(tile_map, [(0, 0), (2, 3), (6, 5)], [0, 1, 2, 4, 9])
+
+def test_hex_ranges(storage):
+  tile_map = factory.create_rectangle_hex_map(7, 6, storage)
+  assert 7 == len(list(tile_map.within((1, 2), 1)))
+  assert 12 == len(list(tile_map.ring((1, 3), 2)))
+  check_ranges(tile_map, [(0, 0), (1, 2), (-2, 5), (3, 5)], [0, 1, 2, 3, 6, 12])
+
+def test_line_ranges(storage):
+  if storage == CHUNKED_STORAGE:
+    pytest.skip('line maps have no chunked storage')
+  tile_map = factory.create_line_map(8, storage)
+  assert [(3, None), (4, None), (5, None)] == list(tile_map.within(4, 1))
+  assert [(1, None), (7, None)] == list(tile_map.ring(4, 3))
+  check_ranges(tile_map, [0, 4, 7], [0, 1, 3, 8])
+
+def test_range_errors(storage):
+  tile_map = factory.create_rectangle_hex_map(4, 4, storage)
+  with pytest.raises(IndexError):
+    list(tile_map.within((-3, 0), 2))
+  with pytest.raises(IndexError):
+    list(tile_map.ring((0, 4), 2))
+  assert [] == list(tile_map.within((0, 0), -1))
+  assert [] == list(tile_map.ring((0, 0), -1))
+
+def test_unbounded_ranges():
+  tile_map = factory.create_sparse_rectangle_hex_map()
+  assert 6 * 30 == len(list(tile_map.ring((-1000, 70), 30)))
+  assert 1 + 3 * 5 * 6 == len(list(tile_map.within((0, 0), 5)))
+  rect_map = factory.create_sparse_rectangle_map()
+  rect_map.metric = CHEBYSHEV
+  assert 8 * 3 == len(list(rect_map.ring((5, 5), 3)))
+
+def test_line(storage):
+  tile_map = factory.create_rectangle_map(4, 4, storage)
+  tile_map.set((1, 1), PAWN)
+  assert [((0, 0), None), ((1, 1), PAWN), ((2, 2), None), ((3, 3), None)] == list(tile_map.line((0, 0), (5, 5)))
+  hex_map = factory.create_rectangle_hex_map(4, 4, storage)
+  # row 1 is shifted by its row offset
+  assert [(-1, 1), (0, 1), (1, 1), (2, 1)] == [coor for coor, _ in hex_map.line((-3, 1), (6, 1))]
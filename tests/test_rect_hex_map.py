@@ -4,12 +4,12 @@ from .common import GamePiece
 import pytest
 
 @pytest.fixture
-def zero_map():
-  return factory.create_rectangle_hex_map(0, 0)
+def zero_map(storage):
+  return factory.create_rectangle_hex_map(0, 0, storage)
 
 @pytest.fixture
-def one_map():
-  return factory.create_rectangle_hex_map(1, 1)
+def one_map(storage):
+  return factory.create_rectangle_hex_map(1, 1, storage)
 
 #     (0,0) (1,0) (2,0)
 # (-1,1) (0,1) (1,1)
@@ -17,8 +17,8 @@ def one_map():
 # (-2,3) (-1,3) (0,3)
 
 @pytest.fixture
-def empty_map():
-  return factory.create_rectangle_hex_map(3, 4)
+def empty_map(storage):
+  return factory.create_rectangle_hex_map(3, 4, storage)
 
 @pytest.fixture
 def simple_map(empty_map):
@@ -197,3 +197,38 @@ def test_track(simple_map):
   simple_map.set((1, 1), GamePiece('meeple', 'blue'))
   assert None == simple_map.properties['empty']
   assert None == simple_map.properties['bishop']
+
+def test_get_many(simple_map):
+  expected = [GamePiece('bishop', 'white'), None, GamePiece('queen', 'black')]
+  assert expected == simple_map.get_many([(-1, 2), (-2, 3), (0, 3)])
+  with pytest.raises(IndexError):
+    simple_map.get_many([(0, 0), (-1, 0)])
+
+def test_set_many(simple_map):
+  simple_map.track((0, 1), 'pawn')
+  previous = simple_map.set_many([(0, 1), (-2, 3)], [GamePiece('meeple', 'blue'), GamePiece('road', 'red')])
+  assert [GamePiece('pawn', 'black'), None] == previous
+  assert GamePiece('meeple', 'blue') == simple_map.get((0, 1))
+  assert GamePiece('road', 'red') == simple_map.get((-2, 3))
+  assert None == simple_map.properties['pawn']
+  with pytest.raises(IndexError):
+    simple_map.set_many([(0, 0), (2, 1)], [GamePiece('cube', 'brown'), GamePiece('cube', 'brown')])
+  assert None == simple_map.get((0, 0))
+
+def test_fill(simple_map):
+  simple_map.track((0, 1), 'pawn')
+  simple_map.track((0, 3), 'queen')
+  # rows 1 and 2, stored columns 1 and 2
+  simple_map.fill(((0, 1), (1, 2)), GamePiece('wall', 'grey'))
+  assert GamePiece('wall', 'grey') == simple_map.get((0, 1))
+  assert GamePiece('wall', 'grey') == simple_map.get((1, 1))
+  assert GamePiece('wall', 'grey') == simple_map.get((0, 2))
+  assert GamePiece('wall', 'grey') == simple_map.get((1, 2))
+  assert None == simple_map.get((-1, 1))
+  assert GamePiece('bishop', 'white') == simple_map.get((-1, 2))
+  assert None == simple_map.properties['pawn']
+  assert (0, 3) == simple_map.properties['queen']
+
+def test_clear(simple_map):
+  simple_map.clear()
+  assert all(content is None for _, content in simple_map.tiles())
@@ -1,19 +1,20 @@
 from .context import tilemap
 from tilemap import factory
+from tilemap.zobrist import ZobristTable
 from .common import GamePiece
 import pytest
 
 @pytest.fixture
-def zero_map():
-  return factory.create_rectangle_map(0, 0)
+def zero_map(storage):
+  return factory.create_rectangle_map(0, 0, storage)
 
 @pytest.fixture
-def one_map():
-  return factory.create_rectangle_map(1, 1)
+def one_map(storage):
+  return factory.create_rectangle_map(1, 1, storage)
 
 @pytest.fixture
-def empty_map():
-  return factory.create_rectangle_map(3, 4)
+def empty_map(storage):
+  return factory.create_rectangle_map(3, 4, storage)
 
 @pytest.fixture
 def simple_map(empty_map):
@@ -190,3 +191,57 @@ def test_track(simple_map):
   simple_map.set((1, 1), GamePiece('meeple', 'blue'))
   assert None == simple_map.properties['empty']
   assert None == simple_map.properties['bishop']
+
+def test_get_many(simple_map):
+  expected = [GamePiece('pawn', 'black'), None, GamePiece('queen', 'black')]
+  assert expected == simple_map.get_many([(1, 1), (2, 2), (0, 3)])
+  assert [] == simple_map.get_many([])
+  with pytest.raises(IndexError):
+    simple_map.get_many([(0, 0), (3, 0)])
+
+def test_set_many(simple_map):
+  simple_map.track((1, 1), 'pawn')
+  previous = simple_map.set_many([(1, 1), (2, 3)], [GamePiece('meeple', 'blue'), GamePiece('road', 'red')])
+  assert [GamePiece('pawn', 'black'), None] == previous
+  assert GamePiece('meeple', 'blue') == simple_map.get((1, 1))
+  assert GamePiece('road', 'red') == simple_map.get((2, 3))
+  assert None == simple_map.properties['pawn']
+  # Out of bounds writes nothing
+  with pytest.raises(IndexError):
+    simple_map.set_many([(0, 0), (0, 4)], [GamePiece('cube', 'brown'), GamePiece('cube', 'brown')])
+  assert None == simple_map.get((0, 0))
+  with pytest.raises(ValueError):
+    simple_map.set_many([(0, 0)], [])
+
+def test_set_many_repeated(simple_map):
+  table = ZobristTable(seed=2)
+  simple_map.index_by(lambda piece: piece.name)
+  simple_map.enable_zobrist(table=table)
+  previous = simple_map.set_many([(1, 1), (1, 1)], [GamePiece('meeple', 'blue'), GamePiece('road', 'red')])
+  assert [GamePiece('pawn', 'black'), GamePiece('meeple', 'blue')] == previous
+  assert GamePiece('road', 'red') == simple_map.get((1, 1))
+  assert [(1, 1)] == simple_map.coors_of('road')
+  assert [] == simple_map.coors_of('meeple') == simple_map.coors_of('pawn')
+  hash_value = simple_map.zobrist
+  simple_map.enable_zobrist(table=table)
+  assert hash_value == simple_map.zobrist
+
+def test_fill(simple_map):
+  simple_map.track((1, 1), 'pawn')
+  simple_map.track((0, 3), 'queen')
+  simple_map.fill(((1, 0), (2, 2)), GamePiece('wall', 'grey'))
+  assert GamePiece('wall', 'grey') == simple_map.get((1, 1))
+  assert GamePiece('wall', 'grey') == simple_map.get((2, 2))
+  assert None == simple_map.get((0, 0))
+  assert None == simple_map.get((1, 3))
+  assert None == simple_map.properties['pawn']
+  assert (0, 3) == simple_map.properties['queen']
+  with pytest.raises(IndexError):
+    simple_map.fill(((0, 0), (3, 3)), None)
+
+def test_clear(simple_map):
+  simple_map.track((1, 1), 'pawn')
+  simple_map.clear()
+  assert all(content is None for _, content in simple_map.tiles())
+  assert None == simple_map.properties['pawn']
+  assert {} == simple_map.tracking
@@ -0,0 +1,83 @@
+from .context import tilemap
+from tilemap import factory, serialize, storage
+from tilemap.constants import CHEBYSHEV, CHUNKED_STORAGE
+from .common import GamePiece
+import pytest
+
+def create_maps(storage):
+  line_map = factory.create_line_map(7, storage)
+  line_map.set(3, GamePiece('pawn', 'black'))
+  rect_map = factory.create_rectangle_map(4, 3, storage)
+  rect_map.set((3, 1), GamePiece('king', 'white'))
+  rect_map.set((0, 2), GamePiece('pawn', 'black'))
+  rect_map.track((3, 1), 'king')
+  hex_map = factory.create_rectangle_hex_map(3, 4, storage)
+  hex_map.set((-2, 3), GamePiece('queen', 'black'))
+  hex_map.properties['turn'] = 12
+  return [line_map, rect_map, hex_map, factory.create_rectangle_map(0, 0, storage)]
+
+@pytest.fixture
+def tile_maps(storage):
+  if storage == CHUNKED_STORAGE:
+    return create_maps(storage=factory.LIST_STORAGE)[1:] + [factory.create_rectangle_map(5, 5, CHUNKED_STORAGE)]
+  return create_maps(storage)
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_round_trip(tile_maps, tmp_path, mmap):
+  for number, tile_map in enumerate(tile_maps):
+    path = str(tmp_path / 'map{}.tilemap'.format(number))
+    tile_map.save(path)
+    loaded = factory.load_map(path, mmap=mmap)
+    assert list(tile_map.tile_coors()) == list(loaded.tile_coors())
+    assert list(tile_map.tiles()) == list(loaded.tiles())
+    assert tile_map.properties == loaded.properties
+    assert tile_map.tracking == loaded.tracking
+
+def test_loaded_map_is_writable(tmp_path):
+  path = str(tmp_path / 'rect.tilemap')
+  tile_map = factory.create_rectangle_map(4, 3)
+  tile_map.set((1, 1), GamePiece('rook', 'black'))
+  tile_map.track((1, 1), 'rook')
+  tile_map.save(path)
+  loaded = factory.load_map(path)
+  loaded.move((1, 1), (2, 2))
+  loaded.set((0, 0), GamePiece('meeple', 'blue'))
+  assert (2, 2) == loaded.properties['rook']
+  # the file is untouched
+  again = factory.load_map(path)
+  assert GamePiece('rook', 'black') == again.get((1, 1))
+  assert None == again.get((0, 0))
+
+def test_without_numpy(tmp_path, monkeypatch):
+  path = str(tmp_path / 'hex.tilemap')
+  tile_map = create_maps(factory.LIST_STORAGE)[2]
+  tile_map.save(path)
+  monkeypatch.setattr(serialize, 'numpy', None)
+  monkeypatch.setattr(factory, 'numpy', None)
+  loaded = factory.load_map(path)
+  assert isinstance(loaded, factory.RectHexMap)
+  assert not isinstance(loaded, storage.ArrayStorage)
+  assert list(tile_map.tiles()) == list(loaded.tiles())
+
+def test_not_a_map(tmp_path):
+  path = tmp_path / 'junk.bin'
+  path.write_bytes(b'not a tilemap at all, just some bytes')
+  with pytest.raises(ValueError):
+    factory.load_map(str(path))
+
+def test_unbounded_map(tmp_path):
+  path = tmp_path / 'sparse.bin'
+  with pytest.raises(ValueError):
+    factory.create_sparse_rectangle_map().save(str(path))
+  assert not path.exists()
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_metric_round_trip(tmp_path, mmap):
+  tile_map = factory.create_rectangle_map(6, 6)
+  tile_map.metric = CHEBYSHEV
+  path = str(tmp_path / 'chebyshev.tilemap')
+  tile_map.save(path)
+  loaded = factory.load_map(path, mmap=mmap)
+  assert CHEBYSHEV == loaded.metric
+  assert 2 == loaded.distance((0, 0), (2, 2))
+  assert 9 == len(list(loaded.within((1, 1), 1)))
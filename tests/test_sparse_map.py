@@ -0,0 +1,60 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import CHUNKED_STORAGE
+from .common import GamePiece
+import pytest
+
+def test_unbounded():
+  tile_map = factory.create_sparse_rectangle_map(chunk_size=4)
+  assert tile_map.exists((-100000, 100000))
+  assert None == tile_map.get((50000, -3))
+  tile_map.set((50000, -3), GamePiece('pawn', 'black'))
+  tile_map.set((-7, 2), GamePiece('king', 'white'))
+  assert GamePiece('pawn', 'black') == tile_map.get((50000, -3))
+  assert 2 == len(tile_map.chunks)
+  assert {((50000, -3), GamePiece('pawn', 'black')), ((-7, 2), GamePiece('king', 'white'))} == set(tile_map.occupied_tiles())
+  # tiles covers every tile of the allocated chunks
+  assert 32 == len(list(tile_map.tiles()))
+  assert [] == list(tile_map.sides())
+  with pytest.raises(ValueError):
+    tile_map.neighbor_table()
+
+def test_chunks_freed():
+  tile_map = factory.create_sparse_rectangle_map(chunk_size=4)
+  tile_map.set((1, 1), GamePiece('pawn', 'black'))
+  tile_map.set((2, 1), GamePiece('pawn', 'black'))
+  tile_map.set((1, 1), None)
+  assert 1 == len(tile_map.chunks)
+  tile_map.move((2, 1), (9, 9))
+  assert [(2, 2)] == list(tile_map.chunks)
+  tile_map.set((9, 9), None)
+  assert {} == tile_map.chunks
+  # writing empty never allocates
+  tile_map.set((0, 0), None)
+  assert {} == tile_map.chunks
+
+def test_bounded_across_chunks():
+  tile_map = factory.create_sparse_rectangle_map(10, 10, chunk_size=3)
+  assert not tile_map.exists((10, 0))
+  with pytest.raises(IndexError):
+    tile_map.set((0, 10), GamePiece('pawn', 'black'))
+  tile_map.fill(((2, 2), (4, 4)), GamePiece('wall', 'grey'))
+  assert 4 == len(tile_map.chunks)
+  assert 9 == len(list(tile_map.occupied_tiles()))
+  assert 100 == len(list(tile_map.tiles()))
+  assert 36 == len(list(tile_map.sides()))
+
+def test_unbounded_hex():
+  tile_map = factory.create_sparse_rectangle_hex_map(chunk_size=8)
+  tile_map.set((-20, 41), GamePiece('queen', 'black'))
+  expected = {(-19, 40), (-19, 41), (-20, 42), (-21, 42), (-21, 41), (-20, 40)}
+  assert expected == {coor for coor, _ in tile_map.adjacent((-20, 41))}
+  assert [((-20, 41), GamePiece('queen', 'black'))] == list(tile_map.occupied_tiles())
+
+def test_bounded_hex_tracking():
+  tile_map = factory.create_rectangle_hex_map(5, 5, CHUNKED_STORAGE)
+  tile_map.set((-2, 4), GamePiece('queen', 'black'))
+  tile_map.track((-2, 4), 'queen')
+  tile_map.move((-2, 4), (4, 0))
+  assert (4, 0) == tile_map.properties['queen']
+  assert [((4, 0), GamePiece('queen', 'black'))] == list(tile_map.occupied_tiles())
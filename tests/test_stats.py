@@ -0,0 +1,96 @@
+from .context import tilemap
+from tilemap import factory
+from .common import GamePiece
+import json
+import pickle
+import pytest
+
+PAWN = GamePiece('pawn', 'black')
+
+def test_disabled_by_default(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  plain = type(tile_map)
+  with pytest.raises(ValueError):
+    tile_map.stats()
+  tile_map.enable_stats()
+  assert type(tile_map) is not plain
+  assert isinstance(tile_map, plain)
+  tile_map.disable_stats()
+  assert type(tile_map) is plain
+  assert 'get' not in vars(type(tile_map))
+
+def test_counts(storage):
+  tile_map = factory.create_rectangle_hex_map(4, 4, storage)
+  tile_map.enable_stats()
+  tile_map.set((0, 0), PAWN)
+  tile_map.get((0, 0))
+  tile_map.get((1, 1))
+  tile_map.track((0, 0), 'pawn')
+  tile_map.move((0, 0), (1, 0))
+  tile_map.swap((1, 0), (2, 0))
+  assert 6 == len(list(tile_map.adjacent((1, 1))))
+  assert 16 == len(list(tile_map.tiles()))
+  stats = tile_map.stats()
+  assert 1 == stats['set']['calls']
+  assert 2 == stats['get']['calls']
+  assert 1 == stats['track']['calls']
+  assert 1 == stats['move']['calls']
+  assert 1 == stats['swap']['calls']
+  assert 1 == stats['adjacent']['calls']
+  assert 1 == stats['tiles']['calls']
+  assert all(counter['time'] >= 0 for name, counter in stats.items() if isinstance(counter, dict))
+  assert (2, 0) == tile_map.properties['pawn']
+  json.dumps(stats)
+
+def test_failures_and_invalidations(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.enable_stats()
+  with pytest.raises(IndexError):
+    tile_map.get((3, 0))
+  with pytest.raises(IndexError):
+    tile_map.set_many([(0, 0), (0, 5)], [PAWN, PAWN])
+  tile_map.set((1, 1), PAWN)
+  tile_map.track((1, 1), 'pawn')
+  tile_map.set((2, 2), PAWN)
+  tile_map.track((2, 2), 'other')
+  tile_map.set((1, 1), None)
+  tile_map.move((0, 0), (2, 2))
+  stats = tile_map.stats()
+  assert 2 == stats['bounds_failures']
+  assert 2 == stats['tracking_invalidations']
+  assert 1 == stats['get']['calls']
+
+def test_snapshot_and_reset(line_storage):
+  tile_map = factory.create_line_map(5, line_storage)
+  tile_map.enable_stats()
+  tile_map.get(1)
+  before = tile_map.stats()
+  tile_map.get(2)
+  assert 1 == before['get']['calls']
+  assert 2 == tile_map.stats()['get']['calls']
+  tile_map.reset_stats()
+  assert 0 == tile_map.stats()['get']['calls']
+
+def test_fork_starts_without_stats(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.enable_stats()
+  fork = tile_map.fork()
+  fork.get((0, 0))
+  assert type(fork) is not type(tile_map)
+  with pytest.raises(ValueError):
+    fork.stats()
+  assert 0 == tile_map.stats()['get']['calls']
+
+def test_pickle_without_stats(storage):
+  tile_map = factory.create_rectangle_hex_map(3, 3, storage)
+  tile_map.set((1, 1), PAWN)
+  plain = type(tile_map)
+  tile_map.enable_stats()
+  copy = pickle.loads(pickle.dumps(tile_map))
+  assert type(copy) is plain
+  assert PAWN == copy.get((1, 1))
+  with pytest.raises(ValueError):
+    copy.stats()
+  copy.enable_stats()
+  copy.get((1, 1))
+  assert 1 == copy.stats()['get']['calls']
@@ -0,0 +1,45 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import ARRAY_STORAGE
+from .common import GamePiece
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+def test_unknown_storage():
+  with pytest.raises(ValueError):
+    factory.create_rectangle_map(3, 3, 'linked-list')
+
+def test_palette_shares_ids():
+  tile_map = factory.create_rectangle_map(3, 3, ARRAY_STORAGE)
+  tile_map.set((0, 0), GamePiece('pawn', 'black'))
+  tile_map.set((2, 1), GamePiece('pawn', 'black'))
+  tile_map.set((1, 1), GamePiece('pawn', 'white'))
+  assert 3 == len(tile_map.palette)
+  assert tile_map.ids[0, 0] == tile_map.ids[2, 1]
+  assert 0 == tile_map.ids[1, 0]
+
+def test_ids_widen():
+  tile_map = factory.create_line_map(400, ARRAY_STORAGE)
+  assert numpy.uint8 == tile_map.ids.dtype
+  for i in range(400):
+    tile_map.set(i, GamePiece('meeple', i))
+  assert numpy.uint16 == tile_map.ids.dtype
+  assert GamePiece('meeple', 0) == tile_map.get(0)
+  assert GamePiece('meeple', 399) == tile_map.get(399)
+
+def test_hex_layout():
+  tile_map = factory.create_rectangle_hex_map(3, 4, ARRAY_STORAGE)
+  tile_map.set((-2, 3), GamePiece('queen', 'black'))
+  assert (4, 3) == tile_map.ids.shape
+  assert 0 != tile_map.ids[3, 0]
+  assert [((-2, 3), GamePiece('queen', 'black'))] == [tile for tile in tile_map.tiles() if tile[1]]
+
+def test_palette_keeps_types():
+  tile_map = factory.create_line_map(4, ARRAY_STORAGE)
+  tile_map.set(0, 1)
+  tile_map.set(1, True)
+  tile_map.set(2, 1.0)
+  assert [1, True, 1.0] == tile_map.get_many([0, 1, 2])
+  assert [int, bool, float] == [type(content) for content in tile_map.get_many([0, 1, 2])]
+  assert 4 == len(tile_map.palette)
@@ -0,0 +1,95 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import CHUNKED_STORAGE
+from .common import GamePiece
+import pytest
+
+PAWN = GamePiece('pawn', 'black')
+KING = GamePiece('king', 'white')
+
+def coor_of(tile):
+  return tile[0][::-1]
+
+def populate(tile_map):
+  coors = list(tile_map.tile_coors())
+  for number, coor in enumerate(coors):
+    if number % 3 == 0:
+      tile_map.set(coor, PAWN)
+    elif number % 7 == 0:
+      tile_map.set(coor, KING)
+  return tile_map
+
+def test_region_rect(storage):
+  tile_map = populate(factory.create_rectangle_map(6, 5, storage))
+  region = ((1, 2), (3, 3))
+  expected = [(x, y) for x in range(1, 4) for y in range(2, 4)]
+  assert expected == list(tile_map.tile_coors(region))
+  assert [(coor, tile_map.get(coor)) for coor in expected] == list(tile_map.tiles(region))
+
+def test_region_hex(storage):
+  tile_map = populate(factory.create_rectangle_hex_map(5, 4, storage))
+  # stored columns 1 to 3 of rows 1 to 3, each row shifted by its offset
+  region = ((0, 1), (1, 3))
+  expected = [(0, 1), (1, 1), (2, 1), (0, 2), (1, 2), (2, 2), (-1, 3), (0, 3), (1, 3)]
+  assert expected == list(tile_map.tile_coors(region))
+  assert [(coor, tile_map.get(coor)) for coor in expected] == list(tile_map.tiles(region))
+
+def test_region_clipped(storage):
+  tile_map = populate(factory.create_rectangle_map(4, 4, storage))
+  assert [(2, 3), (3, 3)] == [coor for coor, _ in tile_map.tiles(((2, 3), (9, 9)))]
+  assert [] == list(tile_map.tiles(((5, 5), (9, 9))))
+  hex_map = factory.create_rectangle_hex_map(3, 3, storage)
+  assert list(hex_map.tile_coors()) == list(hex_map.tile_coors(((-5, -5), (5, 5))))
+
+def test_filters(storage):
+  tile_map = populate(factory.create_rectangle_hex_map(7, 6, storage))
+  everything = list(tile_map.tiles())
+  # sparse maps visit chunk by chunk when skipping empty tiles
+  assert [tile for tile in everything if tile[1] is not None] == sorted(tile_map.tiles(skip_empty=True), key=coor_of)
+  assert [tile for tile in everything if tile[1] == KING] == list(tile_map.tiles(where=lambda content: content == KING))
+  seen = []
+  list(tile_map.tiles(where=seen.append, skip_empty=True))
+  assert None not in seen
+  region = ((1, 1), (3, 4))
+  expected = [tile for tile in tile_map.tiles(region) if tile[1] == PAWN]
+  assert expected == sorted(tile_map.tiles(region, lambda content: content == PAWN, skip_empty=True), key=coor_of)
+
+def test_line_region(storage):
+  if storage == CHUNKED_STORAGE:
+    pytest.skip('line maps have no chunked storage')
+  tile_map = populate(factory.create_line_map(10, storage))
+  assert [(3, PAWN), (4, None), (5, None), (6, PAWN)] == list(tile_map.tiles((3, 6)))
+  assert [3, 6] == [coor for coor, _ in tile_map.tiles((3, 6), skip_empty=True)]
+
+def test_tile_blocks(storage):
+  tile_map = populate(factory.create_rectangle_map(9, 7, storage))
+  blocks = list(tile_map.tile_blocks(size=10))
+  assert [10] * 6 + [3] == [len(coors) for coors, _ in blocks]
+  assert all(len(coors) == len(contents) for coors, contents in blocks)
+  flat = [tile for coors, contents in blocks for tile in zip(coors, contents)]
+  assert list(tile_map.tiles()) == flat
+  region = ((2, 1), (6, 5))
+  filtered = [tile for coors, contents in tile_map.tile_blocks(region, skip_empty=True, size=4)
+              for tile in zip(coors, contents)]
+  assert sorted(tile_map.tiles(region, skip_empty=True), key=coor_of) == sorted(filtered, key=coor_of)
+
+def test_sparse_region():
+  tile_map = factory.create_sparse_rectangle_map(chunk_size=4)
+  tile_map.set((50000, -3), PAWN)
+  tile_map.set((-7, 2), KING)
+  region = ((-10, 0), (0, 5))
+  assert 66 == len(list(tile_map.tiles(region)))
+  assert [((-7, 2), KING)] == list(tile_map.tiles(region, skip_empty=True))
+
+def test_reversed_corners(storage):
+  for tile_map, region in [(factory.create_rectangle_map(4, 4, storage), ((0, 0), (2, 2))),
+                           (factory.create_rectangle_hex_map(4, 4, storage), ((0, 1), (1, 3)))]:
+    first, last = region
+    expected = list(tile_map.tile_coors(region))
+    assert expected == list(tile_map.tile_coors((last, first)))
+    tile_map.fill((last, first), PAWN)
+    assert set(expected) == {coor for coor, _ in tile_map.occupied_tiles()}
+  if storage != CHUNKED_STORAGE:
+    line_map = factory.create_line_map(6, storage)
+    line_map.fill((4, 2), PAWN)
+    assert [2, 3, 4] == [coor for coor, _ in line_map.occupied_tiles()]
@@ -0,0 +1,99 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.constants import CHUNKED_STORAGE
+from .common import GamePiece
+import pickle
+import pytest
+
+PAWN = GamePiece('pawn', 'black')
+KING = GamePiece('king', 'white')
+
+def test_index_round_trip(storage):
+  for tile_map in (factory.create_rectangle_map(4, 3, storage), factory.create_rectangle_hex_map(4, 3, storage)):
+    for index, coor in enumerate(tile_map.tile_coors()):
+      assert index == tile_map.index_of(coor)
+      assert coor == tile_map.coor_of(index)
+    with pytest.raises(IndexError):
+      tile_map.coor_of(12)
+    with pytest.raises(IndexError):
+      tile_map.index_of((4, 0))
+    with pytest.raises(IndexError):
+      tile_map.get_index(-1)
+
+def test_get_and_set_index(storage):
+  tile_map = factory.create_rectangle_hex_map(4, 3, storage)
+  index = tile_map.index_of((-1, 2))
+  assert None == tile_map.set_index(index, PAWN)
+  assert PAWN == tile_map.get((-1, 2))
+  assert PAWN == tile_map.get_index(index)
+  tile_map.track((-1, 2), 'pawn')
+  before = tile_map.checkpoint()
+  assert PAWN == tile_map.set_index(index, KING)
+  assert None == tile_map.properties['pawn']
+  tile_map.undo(before)
+  assert PAWN == tile_map.get_index(index)
+  assert (-1, 2) == tile_map.properties['pawn']
+
+def test_set_index_on_fork(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  fork = tile_map.fork()
+  fork.set_index(4, PAWN)
+  assert None == tile_map.get((1, 1))
+  assert PAWN == fork.get((1, 1))
+
+def test_unchecked(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.set((0, 2), PAWN)
+  checked = type(tile_map)
+  with tile_map.unchecked() as fast:
+    assert fast is tile_map
+    assert PAWN == tile_map.get((0, 2))
+    assert PAWN == tile_map.get_index(2)
+    assert 5 == tile_map.index_of((1, 2))
+    tile_map.set((1, 1), KING)
+    assert isinstance(tile_map, checked)
+    # nothing is checked, a negative coordinate reads whatever the storage holds there
+    tile_map.get((0, -1))
+  assert type(tile_map) is checked
+  assert KING == tile_map.get((1, 1))
+  with pytest.raises(IndexError):
+    tile_map.get((0, -1))
+
+def test_unchecked_restores_on_error(storage):
+  tile_map = factory.create_line_map(3, storage) if storage != CHUNKED_STORAGE else factory.create_rectangle_map(3, 3, storage)
+  checked = type(tile_map)
+  with pytest.raises(RuntimeError):
+    with tile_map.unchecked():
+      raise RuntimeError()
+  assert type(tile_map) is checked
+
+def test_swap_tracking(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.set((0, 0), PAWN)
+  tile_map.set((2, 2), KING)
+  tile_map.track((0, 0), 'pawn')
+  tile_map.track((2, 2), 'king')
+  before = tile_map.checkpoint()
+  tile_map.swap((0, 0), (2, 2))
+  assert KING == tile_map.get((0, 0))
+  assert {'pawn': (2, 2), 'king': (0, 0)} == tile_map.properties
+  assert {(2, 2): 'pawn', (0, 0): 'king'} == tile_map.tracking
+  tile_map.swap((1, 1), (1, 1))
+  tile_map.swap((0, 0), (0, 0))
+  assert KING == tile_map.get((0, 0))
+  assert 'king' == tile_map.tracking[(0, 0)]
+  tile_map.undo(before)
+  assert {'pawn': (0, 0), 'king': (2, 2)} == tile_map.properties
+  assert PAWN == tile_map.get((0, 0))
+
+def test_pickle_unchecked(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.set((2, 1), KING)
+  checked = type(tile_map)
+  tile_map.enable_stats()
+  with tile_map.unchecked():
+    copy = pickle.loads(pickle.dumps(tile_map))
+  assert type(copy) is checked
+  assert KING == copy.get((2, 1))
+  with pytest.raises(IndexError):
+    copy.get((0, -1))
@@ -0,0 +1,78 @@
+from .context import tilemap
+from tilemap import factory
+from tilemap.zobrist import ZobristTable
+from .common import GamePiece
+
+def test_move_back_restores_hash(storage):
+  tile_map = factory.create_rectangle_hex_map(4, 4, storage)
+  tile_map.set((0, 0), GamePiece('pawn', 'black'))
+  tile_map.enable_zobrist()
+  start = tile_map.zobrist
+  assert start != 0
+  tile_map.move((0, 0), (1, 1))
+  assert start != tile_map.zobrist
+  tile_map.move((1, 1), (0, 0))
+  assert start == tile_map.zobrist
+
+def test_same_position_same_hash(storage):
+  table = ZobristTable(seed=5)
+  first = factory.create_rectangle_map(3, 3, storage)
+  second = factory.create_rectangle_map(3, 3, storage)
+  first.enable_zobrist(table=table)
+  second.enable_zobrist(table=table)
+  assert first.zobrist == second.zobrist
+  # reach the same position by different routes
+  first.set((0, 0), GamePiece('pawn', 'black'))
+  first.set((2, 2), GamePiece('king', 'white'))
+  second.set((1, 1), GamePiece('king', 'white'))
+  second.swap((1, 1), (2, 2))
+  second.set_many([(0, 0)], [GamePiece('pawn', 'black')])
+  assert first.zobrist == second.zobrist
+  second.fill(((0, 1), (0, 2)), None)
+  assert first.zobrist == second.zobrist
+  first.clear()
+  assert 0 == first.zobrist
+
+def test_key_function(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.enable_zobrist(key=lambda piece: piece.name)
+  tile_map.set((0, 0), GamePiece('pawn', 'black'))
+  black = tile_map.zobrist
+  tile_map.set((0, 0), GamePiece('pawn', 'white'))
+  assert black == tile_map.zobrist
+
+def test_undo_and_fork(storage):
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.enable_zobrist()
+  tile_map.set((1, 1), GamePiece('rook', 'white'))
+  start = tile_map.zobrist
+  checkpoint = tile_map.checkpoint()
+  tile_map.move((1, 1), (0, 2))
+  tile_map.set((2, 2), GamePiece('pawn', 'black'))
+  tile_map.undo(checkpoint)
+  assert start == tile_map.zobrist
+  fork = tile_map.fork()
+  assert start == fork.zobrist
+  fork.move((1, 1), (0, 2))
+  assert start == tile_map.zobrist
+  tile_map.move((1, 1), (0, 2))
+  assert fork.zobrist == tile_map.zobrist
+  tile_map.disable_zobrist()
+  assert None == tile_map.zobrist
+
+def test_index_and_journal_keep_hash(storage):
+  table = ZobristTable(7)
+  tile_map = factory.create_rectangle_map(3, 3, storage)
+  tile_map.enable_zobrist(table=table)
+  tile_map.index_by(lambda piece: piece.name)
+  tile_map.set((1, 1), GamePiece('rook', 'white'))
+  tile_map.drop_index()
+  tile_map.checkpoint()
+  tile_map.set((0, 2), GamePiece('pawn', 'black'))
+  tile_map.stop_journal()
+  tile_map.move((0, 2), (2, 2))
+  expected = factory.create_rectangle_map(3, 3, storage)
+  expected.set((1, 1), GamePiece('rook', 'white'))
+  expected.set((2, 2), GamePiece('pawn', 'black'))
+  expected.enable_zobrist(table=table)
+  assert expected.zobrist == tile_map.zobrist != None
@@ -0,0 +1,126 @@
+from tilemap.observer import MapObserver
+from tilemap.storage import ArrayStorage, numpy
+
+def _occupied(content):
+  return content is not None
+
+def table_rule(table):
+  """Makes a step rule from a neighbor-count table
+
+  Args:
+    table (dict): maps tile content to its outcomes, either a list indexed by neighbor count
+      or a dict from neighbor count to new content; contents and counts without an outcome stay as they are
+
+  Returns:
+    function of (content, count) giving the new content
+  """
+  def rule(content, count):
+    outcomes = table.get(content)
+    if outcomes is None:
+      return content
+    if isinstance(outcomes, dict):
+      return outcomes.get(count, content)
+    return outcomes[count] if count < len(outcomes) else content
+  return rule
+
+class Automaton(MapObserver):
+  """A cellular automaton stepping a whole map at once.
+  Each tick reads every tile and the number of its neighbors holding counted content,
+  then writes all the new contents together, so no tile sees another's update from the same tick.
+  On array storage the rule is tabulated once per palette entry and neighbor count,
+  and the tick runs as numpy gathers over the padded neighbor table.
+  An active automaton watches the map and only re-evaluates tiles next to something that changed.
+  """
+  def __init__(self, tile_map, rule, counted=None, active=False):
+    self.tile_map = tile_map
+    self.rule = table_rule(rule) if isinstance(rule, dict) else rule
+    self.counted = _occupied if counted is None else counted
+    self._table = tile_map.neighbor_table()
+    # flat indices changed since the last tick, None until the first tick has seen every tile
+    self._changed = None
+    self._watching = False
+    if active:
+      tile_map._add_observer(self)
+      self._watching = True
+  def tile_changed(self, coor, previous_content, content):
+    if self._changed is not None:
+      self._changed.add(self.tile_map._index(coor))
+  def close(self):
+    """Stops watching the map, later ticks evaluate every tile"""
+    if self._watching:
+      self.tile_map._remove_observer(self)
+      self._watching = False
+    self._changed = None
+  def step(self):
+    """Advances the map by one tick
+
+    Returns:
+      list of the coordinates whose content changed, in flat index order
+    """
+    candidates = None
+    if self._changed is not None:
+      candidates = self._near(self._changed)
+    if self._watching:
+      self._changed = set()
+    if numpy is not None and isinstance(self.tile_map, ArrayStorage):
+      return self._step_vectorized(candidates)
+    return self._step(candidates)
+  def _near(self, changed):
+    # a tile can only change if it or one of its neighbors changed last time
+    near = set(changed)
+    for index in changed:
+      near.update(self._table.neighbors(index))
+    return sorted(near)
+  def _step(self, candidates):
+    tile_map = self.tile_map
+    get = tile_map._get_index
+    counted = self.counted
+    rule = self.rule
+    offsets = self._table.offsets
+    indices = self._table.indices
+    flags = {}
+    changes = []
+    for index in range(tile_map._tile_count()) if candidates is None else candidates:
+      count = 0
+      for position in range(offsets[index], offsets[index + 1]):
+        neighbor = indices[position]
+        flag = flags.get(neighbor)
+        if flag is None:
+          flag = flags[neighbor] = bool(counted(get(neighbor)))
+        count += flag
+      content = get(index)
+      new_content = rule(content, count)
+      if new_content != content:
+        changes.append((tile_map._coor(index), new_content))
+    coors = [coor for coor, _ in changes]
+    tile_map.set_many(coors, [content for _, content in changes])
+    return coors
+  def _step_vectorized(self, candidates):
+    tile_map = self.tile_map
+    padded = self._table.padded()
+    contents = list(tile_map.palette.contents)
+    # tabulate before reading the ids, new contents can widen the id array
+    outcomes = numpy.array([[tile_map._id_of(self.rule(content, count)) for count in range(padded.shape[1] + 1)]
+                            for content in contents], dtype=numpy.intp)
+    counted = numpy.array([bool(self.counted(content)) for content in contents] + [False], dtype=numpy.int8)
+    ids = tile_map._flat_ids
+    flags = counted[numpy.append(ids, len(contents))]
+    if candidates is None:
+      positions = numpy.arange(ids.size)
+      neighbors = padded
+    else:
+      positions = numpy.array(candidates, dtype=numpy.intp)
+      neighbors = padded[positions]
+    old_ids = ids[positions]
+    new_ids = outcomes[old_ids, flags[neighbors].sum(axis=1)]
+    changed = new_ids != old_ids
+    positions = positions[changed]
+    new_ids = new_ids[changed]
+    coors = tile_map._coor_list(tile_map._coor_array(positions))
+    if tile_map._observers or tile_map.tracking:
+      palette = tile_map.palette.contents
+      tile_map.set_many(coors, [palette[tile_id] for tile_id in new_ids.tolist()])
+    else:
+      tile_map._own_ids()
+      tile_map._flat_ids[positions] = new_ids
+    return coors
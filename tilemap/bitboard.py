@@ -0,0 +1,199 @@
+from tilemap.geometry import layout_key
+from tilemap.storage import numpy
+
+_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+def bits_from_flags(flags):
+  """Packs one flag per tile into a bitboard int
+
+  Args:
+    flags (bytes): 0 or 1 for each tile in flat index order
+
+  Returns:
+    int whose bit i is the flag of the tile at flat index i
+  """
+  if not flags:
+    return 0
+  # base 2 parsing is linear, where setting bits one at a time on a growing int is not
+  return int(bytes(flags).translate(_DIGITS)[::-1], 2)
+
+def bits_from_indices(indices, tile_count):
+  """Packs the given flat indices into a bitboard int
+
+  Args:
+    indices (iterable): flat indices of the set tiles
+    tile_count (int): the number of tiles in the map
+
+  Returns:
+    int with the bits of the given indices set
+  """
+  flags = bytearray(tile_count)
+  for index in indices:
+    flags[index] = 1
+  return bits_from_flags(flags)
+
+class Bitboard:
+  """A set of tiles of one map, packed into a Python int whose bit i stands for the tile at flat index i.
+  Coordinates follow the map's own, as for exists and index_of.
+  Bitboards of maps with the same geometry and size combine with &, |, ^, - and ~, each a handful of int operations.
+  Shifting by a direction moves every tile one step at once; edge masks drop the tiles that would leave the map,
+  with separate masks for even and odd rows of hex maps, whose steps change the flat index by a different amount.
+  """
+  __slots__ = ('tile_map', 'bits')
+  def __init__(self, tile_map, bits=0):
+    self.tile_map = tile_map
+    self.bits = bits
+  def _full(self):
+    return (1 << self.tile_map._tile_count()) - 1
+  def _combined(self, other):
+    if layout_key(self.tile_map) != layout_key(other.tile_map):
+      raise ValueError('Bitboards of maps with different geometries or sizes do not combine')
+    return other.bits
+  def __and__(self, other):
+    return Bitboard(self.tile_map, self.bits & self._combined(other))
+  def __or__(self, other):
+    return Bitboard(self.tile_map, self.bits | self._combined(other))
+  def __xor__(self, other):
+    return Bitboard(self.tile_map, self.bits ^ self._combined(other))
+  def __sub__(self, other):
+    return Bitboard(self.tile_map, self.bits & ~self._combined(other))
+  def __invert__(self):
+    return Bitboard(self.tile_map, self.bits ^ self._full())
+  def __eq__(self, other):
+    return isinstance(other, Bitboard) and self.bits == other.bits and \
+        layout_key(self.tile_map) == layout_key(other.tile_map)
+  def __bool__(self):
+    return self.bits != 0
+  def __len__(self):
+    return self.count()
+  def __contains__(self, coor):
+    return self.tile_map.exists(coor) and self.bits >> self.tile_map._index(coor) & 1 == 1
+  def __iter__(self):
+    coors = self.tile_map._geometry.coors
+    coor = self.tile_map._coor if coors is None else coors.__getitem__
+    for index in self.indices():
+      yield coor(index)
+  def __repr__(self):
+    return 'Bitboard({} of {} tiles)'.format(self.count(), self.tile_map._tile_count())
+  def count(self):
+    """Counts the set tiles
+
+    Returns:
+      number of set bits
+    """
+    return bin(self.bits).count('1')
+  def indices(self):
+    """Gets the flat indices of the set tiles
+
+    Returns:
+      generator of flat indices in increasing order
+    """
+    # one pass over the binary digits, lowest bit first
+    digits = bin(self.bits)[:1:-1]
+    index = digits.find('1')
+    while index != -1:
+      yield index
+      index = digits.find('1', index + 1)
+  def add(self, coor):
+    """Sets the tile at the given coordinate
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self.tile_map._require_coor(coor)
+    self.bits |= 1 << self.tile_map._index(coor)
+  def discard(self, coor):
+    """Clears the tile at the given coordinate
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self.tile_map._require_coor(coor)
+    self.bits &= ~(1 << self.tile_map._index(coor))
+  def shift(self, direction):
+    """Moves every set tile one step in the given direction, dropping the tiles that would leave the map
+
+    Args:
+      direction (int): a direction of the map's direction_map
+
+    Returns:
+      the shifted Bitboard
+
+    Raises:
+      ValueError when the map has no such direction
+    """
+    if direction not in self.tile_map.direction_map:
+      raise ValueError('Unknown direction {}'.format(direction))
+    return Bitboard(self.tile_map, self._shifted(_shift_masks(self.tile_map)[direction]))
+  def _shifted(self, steps):
+    bits = self.bits
+    result = 0
+    for delta, mask in steps:
+      if delta > 0:
+        result |= (bits & mask) << delta
+      else:
+        result |= (bits & mask) >> -delta
+    return result
+  def neighbors(self, directions=None):
+    """Gets the tiles adjacent to any set tile, as for Map.adjacent
+
+    Args:
+      directions (iterable): optional directions to step in, all of the map's by default
+
+    Returns:
+      Bitboard of the adjacent tiles, which may include set tiles next to other set tiles
+    """
+    masks = _shift_masks(self.tile_map)
+    result = 0
+    for direction in self.tile_map.direction_map if directions is None else directions:
+      result |= self._shifted(masks[direction])
+    return Bitboard(self.tile_map, result)
+  def expand(self, directions=None):
+    """Grows the set tiles by one step, as one round of a flood fill
+
+    Args:
+      directions (iterable): optional directions to step in, all of the map's by default
+
+    Returns:
+      Bitboard of the set tiles and their neighbors
+    """
+    return self | self.neighbors(directions)
+
+def _shift_masks(tile_map):
+  # per direction, the (flat index delta, source mask) pairs of every step that stays on the map,
+  # worked out once from the map's neighbor table and kept with the shared geometry
+  geometry = tile_map._geometry
+  if geometry._shift_masks is None:
+    table = tile_map.neighbor_table()
+    masks = {direction: [] for direction in table.direction_order}
+    if numpy is not None:
+      offsets, indices, directions = table.arrays()
+      sources = numpy.repeat(numpy.arange(len(table)), numpy.diff(offsets))
+      deltas = indices - sources
+      for direction in masks:
+        chosen = directions == direction
+        direction_sources = sources[chosen]
+        direction_deltas = deltas[chosen]
+        for delta in numpy.unique(direction_deltas).tolist():
+          flags = numpy.zeros(len(table), dtype=bool)
+          flags[direction_sources[direction_deltas == delta]] = True
+          mask = int.from_bytes(numpy.packbits(flags, bitorder='little').tobytes(), 'little')
+          masks[direction].append((delta, mask))
+    else:
+      groups = {}
+      offsets = table.offsets
+      indices = table.indices
+      directions = table.directions
+      for index in range(len(table)):
+        for position in range(offsets[index], offsets[index + 1]):
+          groups.setdefault((directions[position], indices[position] - index), []).append(index)
+      for (direction, delta), sources in sorted(groups.items()):
+        masks[direction].append((delta, bits_from_indices(sources, len(table))))
+    geometry._shift_masks = masks
+  return geometry._shift_masks
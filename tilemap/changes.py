@@ -0,0 +1,100 @@
+from collections import namedtuple
+from tilemap.bitboard import Bitboard, bits_from_indices
+from tilemap.observer import MapObserver
+
+TileChange = namedtuple('TileChange', ['coor', 'old', 'new', 'old_name', 'new_name'])
+TileChange.__doc__ = """The net change of one tile over a batch: its content and the tracking name at the coordinate,
+both as they were before the batch and as they are after it. A name of None means nothing was tracked there."""
+
+class ChangeBatch:
+  """The changes a map went through between two drains, at most one record per tile.
+  A tile written several times shows only its first old and last new content,
+  and tiles that ended as they started are left out, so reading a batch costs O(changes), not O(map size).
+  properties maps each changed property name to its (old, new) values, MISSING where the property did not exist.
+  """
+  __slots__ = ('tile_map', 'tiles', 'properties')
+  def __init__(self, tile_map, tiles, properties):
+    self.tile_map = tile_map
+    self.tiles = tiles
+    self.properties = properties
+  def __len__(self):
+    return len(self.tiles)
+  def __iter__(self):
+    return iter(self.tiles)
+  def __bool__(self):
+    return bool(self.tiles) or bool(self.properties)
+  def coors(self):
+    """Gets the coordinates of the changed tiles
+
+    Returns:
+      list of coordinates in the order the tiles first changed
+    """
+    return [change.coor for change in self.tiles]
+  def dirty(self):
+    """Gets the changed tiles as a dirty bitmap
+
+    Returns:
+      Bitboard of the changed tiles
+
+    Raises:
+      ValueError when the map is unbounded
+    """
+    tile_map = self.tile_map
+    if tile_map._geometry is None:
+      raise ValueError('Unbounded maps have no fixed size')
+    indices = [tile_map._index(change.coor) for change in self.tiles]
+    bits = bits_from_indices(indices, tile_map._tile_count())
+    return Bitboard(tile_map, bits)
+
+class ChangeStream(MapObserver):
+  """Collects a map's tile, tracking and property changes into batches, coalescing each tile as it goes.
+  Every consumer, such as a renderer or a network sync, can keep its own stream and drain it once per frame.
+  """
+  def __init__(self, tile_map):
+    self.tile_map = tile_map
+    # coor: [old content, new content, old name, new name]
+    self._tiles = {}
+    # name: [old value, new value]
+    self._properties = {}
+    self._watching = True
+    tile_map._add_observer(self)
+  def tile_changed(self, coor, previous_content, content):
+    entry = self._tiles.get(coor)
+    if entry is None:
+      # the name is not yet touched in this batch, so the one there now is the old one
+      name = self.tile_map.tracking.get(coor)
+      self._tiles[coor] = [previous_content, content, name, name]
+    else:
+      entry[1] = content
+  def tracking_changed(self, coor, previous_name, name):
+    entry = self._tiles.get(coor)
+    if entry is None:
+      # the content is not yet touched in this batch, so it is as it was
+      content = self.tile_map._get(coor)
+      self._tiles[coor] = [content, content, previous_name, name]
+    else:
+      entry[3] = name
+  def property_changed(self, name, previous_value, value):
+    entry = self._properties.get(name)
+    if entry is None:
+      self._properties[name] = [previous_value, value]
+    else:
+      entry[1] = value
+  def drain(self):
+    """Gets the changes since the stream started or was last drained, and starts a new batch
+
+    Returns:
+      ChangeBatch of the net changes
+    """
+    tiles = [TileChange(coor, old, new, old_name, new_name)
+             for coor, (old, new, old_name, new_name) in self._tiles.items()
+             if old != new or old_name != new_name]
+    properties = {name: (old, new) for name, (old, new) in self._properties.items() if old is not new and old != new}
+    self._tiles = {}
+    self._properties = {}
+    return ChangeBatch(self.tile_map, tiles, properties)
+  def close(self):
+    """Stops watching the map, the changes collected so far can still be drained"""
+    if self._watching:
+      self.tile_map._remove_observer(self)
+      self._watching = False
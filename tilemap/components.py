@@ -0,0 +1,286 @@
+from collections import deque
+from tilemap.observer import MapObserver
+from tilemap.storage import ArrayStorage, numpy
+
+class Components(MapObserver):
+  """Connected components of a map: groups of adjacent tiles whose contents have the same key.
+  Tiles whose key is None belong to no component and have label -1.
+  Labels are found with union-find over the map's neighbor table.
+  An incremental labeling watches the map and after each change only walks the components around the changed tile.
+  Borders and sides of a component are worked out again lazily once a change has touched it.
+  """
+  def __init__(self, tile_map, key, incremental=False):
+    self.tile_map = tile_map
+    self.key = key
+    self._table = tile_map.neighbor_table()
+    self._watching = False
+    self._label_all()
+    if incremental:
+      tile_map._add_observer(self)
+      self._watching = True
+  @property
+  def labels(self):
+    """Per-tile component label by flat index, -1 where the key is None;
+    a numpy array in the storage shape on array storage"""
+    if numpy is not None and isinstance(self.tile_map, ArrayStorage):
+      return numpy.array(self._labels, dtype=numpy.intp).reshape(self.tile_map._storage_shape())
+    return self._labels
+  @property
+  def sizes(self):
+    """Dict from each component label to its number of tiles"""
+    return self._sizes
+  def label(self, coor):
+    """Gets the label of the component holding the given coordinate
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Returns:
+      the component label, or None when the tile's key is None
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self.tile_map._require_coor(coor)
+    label = self._labels[self.tile_map._index(coor)]
+    return None if label == -1 else label
+  def key_of(self, label):
+    """Gets the key shared by the tiles of a component"""
+    return self._keys[self._members[label]]
+  def coors(self, label):
+    """Gets the coordinates of the tiles in a component
+
+    Args:
+      label (int): the component label
+
+    Returns:
+      list of coordinates in flat index order
+    """
+    coor = self.tile_map._coor
+    return [coor(index) for index in sorted(self._walk(label))]
+  def borders(self, label):
+    """Gets the keys of the tiles adjacent to a component but outside it
+
+    Args:
+      label (int): the component label
+
+    Returns:
+      set of keys, including None when the component touches tiles without a key
+    """
+    if self._borders[label] is None:
+      self._describe(label)
+    return self._borders[label]
+  def touches_side(self, label):
+    """Checks whether any tile of a component is on the side of the map
+
+    Args:
+      label (int): the component label
+
+    Returns:
+      True when the component reaches the side
+    """
+    if self._sides[label] is None:
+      self._describe(label)
+    return self._sides[label]
+  def close(self):
+    """Stops watching the map, leaving the labels as they were last updated"""
+    if self._watching:
+      self.tile_map._remove_observer(self)
+      self._watching = False
+  def tile_changed(self, coor, previous_content, content):
+    index = self.tile_map._index(coor)
+    key = self.key(content)
+    if key == self._keys[index]:
+      return
+    self._keys[index] = key
+    touched = {self._labels[neighbor] for neighbor in self._table.neighbors(index)}
+    if self._labels[index] != -1:
+      touched.update(self._detach(index))
+    if key is not None:
+      touched.add(self._attach(index, key))
+    for label in touched:
+      if label in self._sizes:
+        self._borders[label] = None
+        self._sides[label] = None
+  def _tile_keys(self):
+    tile_map = self.tile_map
+    if numpy is not None and isinstance(tile_map, ArrayStorage):
+      by_id = [self.key(content) for content in tile_map.palette.contents]
+      return [by_id[tile_id] for tile_id in tile_map._flat_ids.tolist()]
+    get = tile_map._get_index
+    return [self.key(get(index)) for index in range(tile_map._tile_count())]
+  def _label_all(self):
+    keys = self._keys = self._tile_keys()
+    offsets = self._table.offsets
+    indices = self._table.indices
+    count = len(keys)
+    parents = list(range(count))
+    def find(index):
+      while parents[index] != index:
+        parents[index] = parents[parents[index]]
+        index = parents[index]
+      return index
+    for index in range(count):
+      key = keys[index]
+      if key is None:
+        continue
+      for position in range(offsets[index], offsets[index + 1]):
+        neighbor = indices[position]
+        if neighbor < index and keys[neighbor] == key:
+          first, second = find(neighbor), find(index)
+          if first != second:
+            parents[max(first, second)] = min(first, second)
+    # roots are the smallest index of their component, so labels follow flat index order
+    labels = self._labels = [-1] * count
+    self._sizes = {}
+    self._members = {}
+    root_labels = {}
+    for index in range(count):
+      if keys[index] is None:
+        continue
+      root = find(index)
+      label = root_labels.get(root)
+      if label is None:
+        label = root_labels[root] = len(root_labels)
+        self._sizes[label] = 0
+        self._members[label] = index
+      labels[index] = label
+      self._sizes[label] += 1
+    self._next_label = len(root_labels)
+    self._borders = {label: set() for label in self._sizes}
+    self._sides = {label: False for label in self._sizes}
+    directions = len(self.tile_map.direction_map)
+    for index in range(count):
+      label = labels[index]
+      if label == -1:
+        continue
+      start, end = offsets[index], offsets[index + 1]
+      if end - start < directions:
+        self._sides[label] = True
+      for position in range(start, end):
+        neighbor = indices[position]
+        if labels[neighbor] != label:
+          self._borders[label].add(keys[neighbor])
+  def _walk(self, label, start=None):
+    # flat indices of the tiles connected to start that carry the given label
+    labels = self._labels
+    table = self._table
+    start = self._members[label] if start is None else start
+    seen = {start}
+    pending = [start]
+    while pending:
+      index = pending.pop()
+      for neighbor in table.neighbors(index):
+        if neighbor not in seen and labels[neighbor] == label:
+          seen.add(neighbor)
+          pending.append(neighbor)
+    return seen
+  def _describe(self, label):
+    directions = len(self.tile_map.direction_map)
+    labels = self._labels
+    borders = set()
+    side = False
+    for index in self._walk(label):
+      neighbors = self._table.neighbors(index)
+      if len(neighbors) < directions:
+        side = True
+      for neighbor in neighbors:
+        if labels[neighbor] != label:
+          borders.add(self._keys[neighbor])
+    self._borders[label] = borders
+    self._sides[label] = side
+  def _new_label(self, member, size):
+    label = self._next_label
+    self._next_label += 1
+    self._sizes[label] = size
+    self._members[label] = member
+    self._borders[label] = None
+    self._sides[label] = None
+    return label
+  def _drop_label(self, label):
+    for table in (self._sizes, self._members, self._borders, self._sides):
+      del table[label]
+  def _detach(self, index):
+    # removes a tile from its component, which may fall apart into several
+    labels = self._labels
+    label = labels[index]
+    labels[index] = -1
+    self._sizes[label] -= 1
+    if not self._sizes[label]:
+      self._drop_label(label)
+      return set()
+    seeds = sorted({neighbor for neighbor in self._table.neighbors(index) if labels[neighbor] == label})
+    self._members[label] = seeds[0]
+    if len(seeds) == 1:
+      return {label}
+    pieces = self._split(label, seeds)
+    self._members[label] = next(seed for seed in seeds if labels[seed] == label)
+    return {label} | pieces
+  def _split(self, label, seeds):
+    # walks out from every seed in turn; a walk that runs dry before meeting the others is a separate piece,
+    # so the work is bounded by the smaller pieces rather than the whole component
+    labels = self._labels
+    table = self._table
+    groups = list(range(len(seeds)))
+    def find(group):
+      while groups[group] != group:
+        groups[group] = groups[groups[group]]
+        group = groups[group]
+      return group
+    owners = {seed: group for group, seed in enumerate(seeds)}
+    queues = {group: deque((seed,)) for group, seed in enumerate(seeds)}
+    finished = []
+    while len(queues) > 1:
+      for group in list(queues):
+        if group not in queues:
+          continue
+        queue = queues[group]
+        if not queue:
+          finished.append(group)
+          del queues[group]
+          if len(queues) == 1:
+            break
+          continue
+        index = queue.popleft()
+        for neighbor in table.neighbors(index):
+          if labels[neighbor] != label:
+            continue
+          owner = owners.get(neighbor)
+          if owner is None:
+            owners[neighbor] = group
+            queue.append(neighbor)
+            continue
+          other = find(owner)
+          if other != group:
+            # two walks met, they are the same piece
+            groups[other] = group
+            queue.extend(queues.pop(other))
+            if len(queues) == 1:
+              break
+    pieces = set()
+    for group in finished:
+      members = [index for index, owner in owners.items() if find(owner) == group]
+      piece = self._new_label(min(members), len(members))
+      for index in members:
+        labels[index] = piece
+      self._sizes[label] -= len(members)
+      pieces.add(piece)
+    return pieces
+  def _attach(self, index, key):
+    # adds a tile to the components of the same key around it, merging them into the largest
+    labels = self._labels
+    joined = {labels[neighbor] for neighbor in self._table.neighbors(index) if self._keys[neighbor] == key}
+    joined.discard(-1)
+    if not joined:
+      label = self._new_label(index, 1)
+      labels[index] = label
+      return label
+    label = max(joined, key=lambda joined_label: self._sizes[joined_label])
+    for other in joined - {label}:
+      for member in self._walk(other):
+        labels[member] = label
+      self._sizes[label] += self._sizes[other]
+      self._drop_label(other)
+    labels[index] = label
+    self._sizes[label] += 1
+    return label
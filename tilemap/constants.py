@@ -18,3 +18,15 @@ SW = SOUTHWEST
 SLOT_DIRECTION_MAP = {LEFT: -1, RIGHT: 1}
 RECT_DIRECTION_MAP = {NORTH: (0, -1), EAST: (1, 0), SOUTH: (0, 1), WEST: (-1, 0)}
 HEX_DIRECTION_MAP = {NE: (1, -1), EAST: (1, 0), SE: (0, 1), SW: (-1, 1), WEST: (-1, 0), NW: (0, -1)}
+
+LIST_STORAGE = 'list'
+ARRAY_STORAGE = 'array'
+CHUNKED_STORAGE = 'chunked'
+BYTE_STORAGE = 'bytes'
+BIT_STORAGE = 'bits'
+
+MANHATTAN = 'manhattan'
+CHEBYSHEV = 'chebyshev'
+
+OPPOSITE_DIRECTION = {NORTH: SOUTH, NORTHEAST: SOUTHWEST, EAST: WEST, SOUTHEAST: NORTHWEST,
+                      SOUTH: NORTH, SOUTHWEST: NORTHEAST, WEST: EAST, NORTHWEST: SOUTHEAST}
@@ -1,50 +1,322 @@
 from tilemap.constants import *
+from tilemap.layers import LayeredMap
 from tilemap.map import Map
+from tilemap import serialize
+from tilemap.path import chebyshev_distance, hex_distance, line_distance, manhattan_distance
+from tilemap.storage import ArrayStorage, BitStorage, ByteStorage, ChunkStorage, Palette, numpy
 
-def create_line_map(length):
-  return LineMap(length)
-def create_rectangle_map(width, height):
-  return RectRectMap(width, height)
-def create_rectangle_hex_map(width, height):
-  return RectHexMap(width, height)
+def create_line_map(length, storage=LIST_STORAGE):
+  """Creates a line map of the given length.
+  Array storage needs hashable contents and keeps one copy of equal contents of the same type,
+  so a tile may read back an equal object rather than the one that was set.
+
+  Args:
+    length (int): the number of tiles
+    storage (str): LIST_STORAGE, ARRAY_STORAGE, BYTE_STORAGE or BIT_STORAGE
+
+  Returns:
+    the new map
+
+  Raises:
+    ValueError when the storage is unknown
+  """
+  return _map_class(storage, LineMap)(length)
+def create_rectangle_map(width, height, storage=LIST_STORAGE):
+  """Creates a rectangle map of square tiles, with storage as for create_line_map or CHUNKED_STORAGE
+
+  Args:
+    width (int): the number of columns
+    height (int): the number of rows
+    storage (str): how to store the tiles, array storage has the limits given in create_line_map
+
+  Returns:
+    the new map
+
+  Raises:
+    ValueError when the storage is unknown
+  """
+  return _map_class(storage, RectRectMap)(width, height)
+def create_rectangle_hex_map(width, height, storage=LIST_STORAGE):
+  """Creates a rectangle map of hex tiles, with storage as for create_line_map or CHUNKED_STORAGE
+
+  Args:
+    width (int): the number of tiles in each row
+    height (int): the number of rows
+    storage (str): how to store the tiles, array storage has the limits given in create_line_map
+
+  Returns:
+    the new map
+
+  Raises:
+    ValueError when the storage is unknown
+  """
+  return _map_class(storage, RectHexMap)(width, height)
+def create_sparse_rectangle_map(width=None, height=None, chunk_size=64):
+  """Creates a rectangle map of square tiles in chunked storage, which only allocates chunks that hold content.
+  Without a width and height the map is unbounded and every coordinate exists.
+
+  Args:
+    width (int): the number of columns, None for an unbounded map
+    height (int): the number of rows, None for an unbounded map
+    chunk_size (int): the side of each square chunk
+
+  Returns:
+    the new map
+  """
+  return ChunkedRectRectMap(width, height, chunk_size)
+def create_sparse_rectangle_hex_map(width=None, height=None, chunk_size=64):
+  """Creates a rectangle map of hex tiles in chunked storage, as for create_sparse_rectangle_map
+
+  Args:
+    width (int): the number of tiles in each row, None for an unbounded map
+    height (int): the number of rows, None for an unbounded map
+    chunk_size (int): the side of each square chunk
+
+  Returns:
+    the new map
+  """
+  return ChunkedRectHexMap(width, height, chunk_size)
+def create_layered_line_map(length, layers):
+  """Creates a layered map of line maps, one per layer, all of the given length
+
+  Args:
+    length (int): the number of tiles
+    layers (dict): from layer name to the storage of that layer, as for create_line_map
+
+  Returns:
+    the new LayeredMap
+
+  Raises:
+    ValueError when there are no layers or a storage is unknown
+  """
+  return LayeredMap({name: create_line_map(length, storage) for name, storage in layers.items()})
+def create_layered_rectangle_map(width, height, layers):
+  """Creates a layered map of rectangle maps of square tiles, one per layer, all of the given size
+
+  Args:
+    width (int): the number of columns
+    height (int): the number of rows
+    layers (dict): from layer name to the storage of that layer, as for create_rectangle_map
+
+  Returns:
+    the new LayeredMap
+
+  Raises:
+    ValueError when there are no layers or a storage is unknown
+  """
+  return LayeredMap({name: create_rectangle_map(width, height, storage) for name, storage in layers.items()})
+def create_layered_rectangle_hex_map(width, height, layers):
+  """Creates a layered map of rectangle maps of hex tiles, one per layer, all of the given size
+
+  Args:
+    width (int): the number of tiles in each row
+    height (int): the number of rows
+    layers (dict): from layer name to the storage of that layer, as for create_rectangle_hex_map
+
+  Returns:
+    the new LayeredMap
+
+  Raises:
+    ValueError when there are no layers or a storage is unknown
+  """
+  return LayeredMap({name: create_rectangle_hex_map(width, height, storage) for name, storage in layers.items()})
+def load_map(path, mmap=True):
+  """Loads a map written by Map.save.
+  With numpy the map uses array storage. With mmap the id array stays in the file and pages in as tiles are read;
+  writes go to private copies of the touched pages and never reach the file.
+  Without numpy the file is read into list storage.
+  The palette, properties and tracking are pickled, and unpickling can run arbitrary code,
+  so only load files from a trusted source.
+
+  Args:
+    path (str): the file to read
+    mmap (bool): whether to memory-map the tile ids instead of reading them
+
+  Returns:
+    the loaded map
+
+  Raises:
+    ValueError when the file is not in the tilemap binary format
+  """
+  data = serialize.read(path, mmap)
+  list_class, array_class = _SAVED_CLASSES[data['geometry']]
+  dimensions = (data['width'],) if data['geometry'] == LineMap._geometry_code else (data['width'], data['height'])
+  contents = data['palette']
+  if numpy is None:
+    tile_map = list_class(*dimensions)
+    for index, tile_id in enumerate(data['ids']):
+      if tile_id:
+        tile_map._set(tile_map._coor(index), contents[tile_id])
+  else:
+    tile_map = array_class(*dimensions)
+    tile_map.palette = Palette(contents)
+    tile_map._attach_ids(data['ids'].reshape(tile_map._storage_shape()))
+  tile_map.properties.update(data['properties'])
+  tile_map.tracking.update(data['tracking'])
+  # files written before attributes were saved have none
+  for name, value in data.get('attributes', {}).items():
+    setattr(tile_map, name, value)
+  return tile_map
+
+def _map_class(storage, geometry_class):
+  map_class = _STORAGE_CLASSES[geometry_class._geometry_code].get(storage)
+  if map_class is None:
+    raise ValueError('Unknown storage {}'.format(storage))
+  return map_class
 
 class LineMap(Map):
+  __slots__ = ('length', 'slots', '_owned')
+  _geometry_code = 0
+  _default_direction_map = SLOT_DIRECTION_MAP
   def __init__(self, size):
     super().__init__()
-    self.slots = [None for _ in range(size)]
-    self.direction_map = SLOT_DIRECTION_MAP
+    self.length = size
+    self._create_storage()
+    self._attach_geometry()
+  def _create_storage(self):
+    self.slots = [None for _ in range(self.length)]
+    self._owned = None
+  def _share_storage(self, fork):
+    # the slots list is the only row, it is copied on the first write
+    self._owned = set()
+    fork._owned = set()
+  def _storage_shape(self):
+    return (self.length,)
+  def _tile_count(self):
+    return self.length
+  def _index(self, coor):
+    return coor
+  def _coor(self, index):
+    return index
+  def _index_array(self, coors):
+    return coors[:, 0]
+  def _coor_array(self, indices):
+    return indices.reshape(-1, 1)
+  def _storage_key(self, coor):
+    return (coor,)
+  def _region_slices(self, region):
+    first, last = sorted(region)
+    return (slice(first, last + 1),)
   def exists(self, coor):
-    return coor > -1 and coor < len(self.slots)
+    return coor > -1 and coor < self.length
+  def _exists_array(self, coors):
+    i = coors[:, 0]
+    return (i > -1) & (i < self.length)
   def _shift_coor(self, coor, shift):
     return coor + shift
+  def _distance(self, first_coor, second_coor):
+    return line_distance(first_coor, second_coor)
+  def _within_coors(self, coor, radius):
+    slots, = self._region_bounds((coor - radius, coor + radius))
+    yield from range(slots.start, slots.stop)
+  def _ring_coors(self, coor, radius):
+    for ring_coor in sorted({coor - radius, coor + radius}):
+      if self.exists(ring_coor):
+        yield ring_coor
   def _get(self, coor):
     # internal get assumes that coor is valid
     return self.slots[coor]
   def _set(self, coor, content):
     # internal set assumes that coor is valid
+    if self._owned is not None:
+      self.slots = list(self.slots)
+      self._owned = None
     self.slots[coor] = content
-  def tile_coors(self):
-    for i in range(len(self.slots)):
-      yield i
-  def side_coors(self):
-    if len(self.slots) < 3:
-      yield from self.tile_coors()
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return self.slots[index]
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    self._set(index, content)
+  def _tile_coors(self, region=None):
+    slots, = self._region_bounds(region)
+    yield from range(slots.start, slots.stop)
+  def _side_coors(self):
+    if self.length < 3:
+      yield from self._tile_coors()
       return
     yield 0
-    yield len(self.slots) - 1
+    yield self.length - 1
 
 class RectRectMap(Map):
+  __slots__ = ('width', 'height', 'metric', 'cols', '_owned')
+  _geometry_code = 1
+  _default_direction_map = RECT_DIRECTION_MAP
   def __init__(self, width, height):
     super().__init__()
     self.width = width
     self.height = height
+    self.metric = MANHATTAN
+    self._create_storage()
+    self._attach_geometry()
+  def _create_storage(self):
     self.cols = []
-    for _ in range(width):
-      self.cols.append([None for _ in range(height)])
-    self.direction_map = RECT_DIRECTION_MAP
+    for _ in range(self.width):
+      self.cols.append([None for _ in range(self.height)])
+    self._owned = None
+  def _share_storage(self, fork):
+    # columns are shared until each map first writes to them
+    fork.cols = list(self.cols)
+    self._owned = set()
+    fork._owned = set()
+  def _storage_shape(self):
+    return (self.width, self.height)
+  def _tile_count(self):
+    return self.width * self.height
+  def _index(self, coor):
+    x, y = coor
+    return x * self.height + y
+  def _coor(self, index):
+    return (index // self.height, index % self.height)
+  def _index_array(self, coors):
+    return coors[:, 0] * self.height + coors[:, 1]
+  def _coor_array(self, indices):
+    return numpy.stack((indices // self.height, indices % self.height), axis=1)
+  def _storage_key(self, coor):
+    return coor
+  def _region_slices(self, region):
+    # the corners may come in any order, each axis runs from the lower to the higher
+    (first_x, first_y), (last_x, last_y) = region
+    return (slice(min(first_x, last_x), max(first_x, last_x) + 1),
+            slice(min(first_y, last_y), max(first_y, last_y) + 1))
   def exists(self, coor):
     x, y = coor
     return x > -1 and x < self.width and y > -1 and y < self.height
+  def _exists_array(self, coors):
+    x = coors[:, 0]
+    y = coors[:, 1]
+    return (x > -1) & (x < self.width) & (y > -1) & (y < self.height)
+  def _distance(self, first_coor, second_coor):
+    if self.metric == MANHATTAN:
+      return manhattan_distance(first_coor, second_coor)
+    if self.metric == CHEBYSHEV:
+      return chebyshev_distance(first_coor, second_coor)
+    raise ValueError('Unknown metric {}'.format(self.metric))
+  def _span(self, dx, radius):
+    # how far a ball of the metric reaches along y, dx columns from its center
+    if self.metric == MANHATTAN:
+      return radius - abs(dx)
+    if self.metric == CHEBYSHEV:
+      return radius
+    raise ValueError('Unknown metric {}'.format(self.metric))
+  def _within_coors(self, coor, radius):
+    center_x, center_y = coor
+    cols, rows = self._region_bounds(((center_x - radius, center_y - radius), (center_x + radius, center_y + radius)))
+    for x in range(cols.start, cols.stop):
+      span = self._span(x - center_x, radius)
+      for y in range(max(rows.start, center_y - span), min(rows.stop, center_y + span + 1)):
+        yield (x, y)
+  def _ring_coors(self, coor, radius):
+    center_x, center_y = coor
+    cols, rows = self._region_bounds(((center_x - radius, center_y - radius), (center_x + radius, center_y + radius)))
+    for x in range(cols.start, cols.stop):
+      span = self._span(x - center_x, radius)
+      if self.metric == CHEBYSHEV and abs(x - center_x) == radius:
+        yield from ((x, y) for y in range(rows.start, rows.stop))
+        continue
+      for y in sorted({center_y - span, center_y + span}):
+        if rows.start <= y < rows.stop:
+          yield (x, y)
   def _get(self, coor):
     # internal get assumes that coor is valid
     x, y = coor
@@ -52,14 +324,31 @@ class RectRectMap(Map):
   def _set(self, coor, content):
     # internal set assumes that coor is valid
     x, y = coor
+    if self._owned is not None and x not in self._owned:
+      self._own_column(x)
     self.cols[x][y] = content
-  def tile_coors(self):
-    for x in range(self.width):
-      for y in range(self.height):
+  def _own_column(self, x):
+    self.cols[x] = list(self.cols[x])
+    self._owned.add(x)
+    if len(self._owned) == self.width:
+      self._owned = None
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return self.cols[index // self.height][index % self.height]
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    x = index // self.height
+    if self._owned is not None and x not in self._owned:
+      self._own_column(x)
+    self.cols[x][index % self.height] = content
+  def _tile_coors(self, region=None):
+    cols, rows = self._region_bounds(region)
+    for x in range(cols.start, cols.stop):
+      for y in range(rows.start, rows.stop):
         yield (x, y)
-  def side_coors(self):
+  def _side_coors(self):
     if self.width < 3 or self.height < 3:
-      yield from self.tile_coors()
+      yield from self._tile_coors()
       return
     for x in range(self.width):
       yield (x, 0)
@@ -69,36 +358,127 @@ class RectRectMap(Map):
       yield (self.width - 1, y)
 
 class RectHexMap(Map):
+  __slots__ = ('width', 'height', '_tiles', '_owned', '_row_offsets')
+  _layout_slots = Map._layout_slots + ('_row_offsets',)
+  _geometry_code = 2
+  _default_direction_map = HEX_DIRECTION_MAP
   def __init__(self, width, height):
     super().__init__()
     self.width = width
     self.height = height
+    self._create_storage()
+    self._attach_geometry()
+  def _attach_geometry(self):
+    super()._attach_geometry()
+    # the shared table, unbounded maps have no rows to tabulate
+    self._row_offsets = None if self._geometry is None else self._geometry.row_offsets
+  def _create_storage(self):
     self._tiles = []
-    for _ in range(height):
-      self._tiles.append([None for _ in range(width)])
-    self.direction_map = HEX_DIRECTION_MAP
+    for _ in range(self.height):
+      self._tiles.append([None for _ in range(self.width)])
+    self._owned = None
+  def _share_storage(self, fork):
+    # rows are shared until each map first writes to them
+    fork._tiles = list(self._tiles)
+    self._owned = set()
+    fork._owned = set()
+  def _storage_shape(self):
+    return (self.height, self.width)
+  def _tile_count(self):
+    return self.width * self.height
+  def _index(self, coor):
+    q, r = coor
+    return r * self.width + q + self._row_offset(r)
+  def _coor(self, index):
+    r = index // self.width
+    return (index % self.width - self._row_offsets[r], r)
+  def _index_array(self, coors):
+    q = coors[:, 0]
+    r = coors[:, 1]
+    return r * self.width + q + self._row_offset(r)
+  def _coor_array(self, indices):
+    r = indices // self.width
+    return numpy.stack((indices % self.width - self._row_offset(r), r), axis=1)
+  def _storage_key(self, coor):
+    q, r = coor
+    return (r, q + self._row_offset(r))
+  def _region_slices(self, region):
+    # hex regions are rectangles of the stored rows and columns
+    # the corners may come in any order, each axis runs from the lower to the higher
+    (first_q, first_r), (last_q, last_r) = region
+    first_col = first_q + self._row_offset(first_r)
+    last_col = last_q + self._row_offset(last_r)
+    return (slice(min(first_r, last_r), max(first_r, last_r) + 1),
+            slice(min(first_col, last_col), max(first_col, last_col) + 1))
   def _row_offset(self, row):
     return (row + 1) // 2
+  def _distance(self, first_coor, second_coor):
+    return hex_distance(first_coor, second_coor)
+  def _hex_row_spans(self, coor, radius):
+    # each row of a hex ball is one run of q, clipped through the row's stored columns
+    center_q, center_r = coor
+    rows, _ = self._region_bounds(((center_q, center_r - radius), (center_q, center_r + radius)))
+    for r in range(rows.start, rows.stop):
+      dr = r - center_r
+      first_q = center_q + max(-radius, -dr - radius)
+      last_q = center_q + min(radius, radius - dr)
+      _, cols = self._region_bounds(((first_q, r), (last_q, r)))
+      row_offset = self._row_offset(r)
+      yield r, first_q, last_q, range(cols.start - row_offset, cols.stop - row_offset)
+  def _within_coors(self, coor, radius):
+    for r, _, _, qs in self._hex_row_spans(coor, radius):
+      for q in qs:
+        yield (q, r)
+  def _ring_coors(self, coor, radius):
+    for r, first_q, last_q, qs in self._hex_row_spans(coor, radius):
+      if abs(r - coor[1]) == radius:
+        yield from ((q, r) for q in qs)
+        continue
+      for q in sorted({first_q, last_q}):
+        if q in qs:
+          yield (q, r)
   def exists(self, coor):
     q, r = coor
+    return r > -1 and r < self.height and -1 < q + self._row_offsets[r] < self.width
+  def _exists_array(self, coors):
+    q = coors[:, 0]
+    r = coors[:, 1]
     row_offset = self._row_offset(r)
-    return r > -1 and r < self.height and q > -1 - row_offset and q < self.width - row_offset
+    return (r > -1) & (r < self.height) & (q > -1 - row_offset) & (q < self.width - row_offset)
   def _get(self, coor):
+    # internal get assumes that coor is valid
     q, r = coor
-    row_offset = self._row_offset(r)
-    return self._tiles[r][q + row_offset]
+    return self._tiles[r][q + self._row_offsets[r]]
   def _set(self, coor, content):
+    # internal set assumes that coor is valid
     q, r = coor
-    row_offset = self._row_offset(r)
-    self._tiles[r][q + row_offset] = content
-  def tile_coors(self):
-    for r in range(self.height):
+    if self._owned is not None and r not in self._owned:
+      self._own_row(r)
+    self._tiles[r][q + self._row_offsets[r]] = content
+  def _own_row(self, r):
+    self._tiles[r] = list(self._tiles[r])
+    self._owned.add(r)
+    if len(self._owned) == self.height:
+      self._owned = None
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return self._tiles[index // self.width][index % self.width]
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    r = index // self.width
+    if self._owned is not None and r not in self._owned:
+      self._own_row(r)
+    self._tiles[r][index % self.width] = content
+  def _tile_coors(self, region=None):
+    # the bounds are stored rows and columns, each row shifts its q range by the row offset
+    rows, cols = self._region_bounds(region)
+    for r in range(rows.start, rows.stop):
       row_offset = self._row_offset(r)
-      for q in range(-row_offset, self.width - row_offset):
+      for q in range(cols.start - row_offset, cols.stop - row_offset):
         yield (q, r)
-  def side_coors(self):
+  def _side_coors(self):
     if self.width < 3 or self.height < 3:
-      yield from self.tile_coors()
+      yield from self._tile_coors()
       return
     for x in range(self.width):
       yield (x, 0)
@@ -108,3 +488,49 @@ class RectHexMap(Map):
       row_offset = self._row_offset(r)
       yield (-row_offset, r)
       yield (self.width - row_offset - 1, r)
+
+class ArrayLineMap(ArrayStorage, LineMap):
+  __slots__ = ArrayStorage._storage_slots
+
+class ArrayRectRectMap(ArrayStorage, RectRectMap):
+  __slots__ = ArrayStorage._storage_slots
+
+class ArrayRectHexMap(ArrayStorage, RectHexMap):
+  __slots__ = ArrayStorage._storage_slots
+
+class ChunkedRectRectMap(ChunkStorage, RectRectMap):
+  __slots__ = ChunkStorage._storage_slots
+
+class ChunkedRectHexMap(ChunkStorage, RectHexMap):
+  __slots__ = ChunkStorage._storage_slots
+
+class ByteLineMap(ByteStorage, LineMap):
+  __slots__ = ByteStorage._storage_slots
+
+class ByteRectRectMap(ByteStorage, RectRectMap):
+  __slots__ = ByteStorage._storage_slots
+
+class ByteRectHexMap(ByteStorage, RectHexMap):
+  __slots__ = ByteStorage._storage_slots
+
+class BitLineMap(BitStorage, LineMap):
+  __slots__ = BitStorage._storage_slots
+
+class BitRectRectMap(BitStorage, RectRectMap):
+  __slots__ = BitStorage._storage_slots
+
+class BitRectHexMap(BitStorage, RectHexMap):
+  __slots__ = BitStorage._storage_slots
+
+_STORAGE_CLASSES = {LineMap._geometry_code: {LIST_STORAGE: LineMap, ARRAY_STORAGE: ArrayLineMap,
+                                             BYTE_STORAGE: ByteLineMap, BIT_STORAGE: BitLineMap},
+                    RectRectMap._geometry_code: {LIST_STORAGE: RectRectMap, ARRAY_STORAGE: ArrayRectRectMap,
+                                                 CHUNKED_STORAGE: ChunkedRectRectMap,
+                                                 BYTE_STORAGE: ByteRectRectMap, BIT_STORAGE: BitRectRectMap},
+                    RectHexMap._geometry_code: {LIST_STORAGE: RectHexMap, ARRAY_STORAGE: ArrayRectHexMap,
+                                                CHUNKED_STORAGE: ChunkedRectHexMap,
+                                                BYTE_STORAGE: ByteRectHexMap, BIT_STORAGE: BitRectHexMap}}
+
+_SAVED_CLASSES = {LineMap._geometry_code: (LineMap, ArrayLineMap),
+                  RectRectMap._geometry_code: (RectRectMap, ArrayRectRectMap),
+                  RectHexMap._geometry_code: (RectHexMap, ArrayRectHexMap)}
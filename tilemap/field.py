@@ -0,0 +1,211 @@
+from heapq import heappop, heappush
+from tilemap.constants import OPPOSITE_DIRECTION
+from tilemap.observer import MapObserver
+from tilemap.storage import ArrayStorage, numpy
+
+_BLOCKED = float('inf')
+
+class DistanceField(MapObserver):
+  """Distances and best directions from every tile of a map toward a set of source tiles.
+  Per-tile results are addressed by flat index, the order of Map.tile_coors.
+  On array storage they are numpy arrays in the map's storage shape, otherwise flat lists.
+  An incremental field watches the map and repairs only the tiles affected by later changes.
+  """
+  def __init__(self, tile_map, sources, passable=None, cost=None, incremental=False):
+    sources = list(sources)
+    tile_map._require_coors(sources)
+    self.tile_map = tile_map
+    self.passable = passable
+    self.cost = cost
+    self._table = tile_map.neighbor_table()
+    self._sources = {tile_map._index(coor) for coor in sources}
+    self._dirty = set()
+    self._watching = False
+    if numpy is not None and isinstance(tile_map, ArrayStorage):
+      self._compute_vectorized()
+    else:
+      self._compute()
+    if incremental:
+      tile_map._add_observer(self)
+      self._watching = True
+  @property
+  def distances(self):
+    """Per-tile distance to the nearest source, inf where no source can be reached"""
+    self.update()
+    return self._shaped(self._distances)
+  @property
+  def directions(self):
+    """Per-tile direction constant of the best step, -1 for sources and unreachable tiles"""
+    self.update()
+    return self._shaped(self._directions)
+  def distance(self, coor):
+    """Gets the distance from the given coordinate to its nearest source
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Returns:
+      total cost to reach a source, inf when none can be reached
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self.tile_map._require_coor(coor)
+    self.update()
+    return self._distances[self.tile_map._index(coor)]
+  def direction(self, coor):
+    """Gets the direction of the best step from the given coordinate
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Returns:
+      direction constant, or None for sources and unreachable tiles
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self.tile_map._require_coor(coor)
+    self.update()
+    direction = int(self._directions[self.tile_map._index(coor)])
+    return None if direction == -1 else direction
+  def tile_changed(self, coor, previous_content, content):
+    index = self.tile_map._index(coor)
+    if self._step_cost(index, previous_content) != self._step_cost(index, content):
+      self._dirty.add(index)
+  def close(self):
+    """Stops watching the map, leaving the field as it was last updated"""
+    self.update()
+    if self._watching:
+      self.tile_map._remove_observer(self)
+      self._watching = False
+  def update(self):
+    """Repairs the field after changes to the map.
+    Only tiles whose best route ran through a changed tile are recomputed.
+    Queries call this automatically.
+    """
+    if not self._dirty:
+      return
+    distances = self._distances
+    parents = self._parents
+    directions = self._directions
+    costs = self._costs
+    get = self.tile_map._get_index
+    for index in self._dirty:
+      costs[index] = self._step_cost(index, get(index))
+    # everything downstream of a changed tile may now be too cheap
+    invalid = set(self._dirty)
+    pending = list(self._dirty)
+    self._dirty = set()
+    table = self._table
+    while pending:
+      index = pending.pop()
+      for neighbor in table.neighbors(index):
+        if neighbor not in invalid and parents[neighbor] == index:
+          invalid.add(neighbor)
+          pending.append(neighbor)
+    heap = []
+    for index in invalid:
+      distances[index] = _BLOCKED
+      parents[index] = -1
+      directions[index] = -1
+    for index in invalid:
+      if index in self._sources:
+        distances[index] = 0
+        heap.append((0, index))
+        continue
+      if costs[index] == _BLOCKED:
+        continue
+      start = table.offsets[index]
+      for position in range(start, table.offsets[index + 1]):
+        neighbor = table.indices[position]
+        distance = distances[neighbor] + costs[neighbor]
+        if neighbor not in invalid and distance < distances[index]:
+          distances[index] = distance
+          parents[index] = neighbor
+          directions[index] = table.directions[position]
+      if distances[index] < _BLOCKED:
+        heappush(heap, (distances[index], index))
+    self._relax(heap)
+  def _step_cost(self, index, content):
+    # sources can always be entered, whatever they hold
+    if self.passable is not None and index not in self._sources and not self.passable(content):
+      return _BLOCKED
+    return 1 if self.cost is None else self.cost(content)
+  def _shaped(self, values):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+      return values.reshape(self.tile_map._storage_shape())
+    return values
+  def _compute(self):
+    count = self.tile_map._tile_count()
+    get = self.tile_map._get_index
+    self._costs = [self._step_cost(index, get(index)) for index in range(count)]
+    self._distances = [_BLOCKED] * count
+    self._parents = [-1] * count
+    self._directions = [-1] * count
+    heap = []
+    for index in self._sources:
+      self._distances[index] = 0
+      heap.append((0, index))
+    self._relax(heap)
+  def _relax(self, heap):
+    # label-correcting Dijkstra, also used to push repairs outward
+    distances = self._distances
+    parents = self._parents
+    directions = self._directions
+    costs = self._costs
+    sources = self._sources
+    offsets = self._table.offsets
+    indices = self._table.indices
+    table_directions = self._table.directions
+    while heap:
+      distance, index = heappop(heap)
+      if distance > distances[index]:
+        continue
+      new_distance = distance + costs[index]
+      if new_distance == _BLOCKED:
+        continue
+      for position in range(offsets[index], offsets[index + 1]):
+        neighbor = indices[position]
+        if new_distance < distances[neighbor] and costs[neighbor] < _BLOCKED and neighbor not in sources:
+          distances[neighbor] = new_distance
+          parents[neighbor] = index
+          directions[neighbor] = OPPOSITE_DIRECTION[table_directions[position]]
+          heappush(heap, (new_distance, neighbor))
+  def _compute_vectorized(self):
+    tile_map = self.tile_map
+    count = tile_map._tile_count()
+    step_costs = numpy.array([self._step_cost(-1, content) for content in tile_map.palette.contents], dtype=float)
+    self._costs = step_costs[tile_map._flat_ids]
+    for index in self._sources:
+      self._costs[index] = self._step_cost(index, tile_map._get_index(index))
+    self._distances = numpy.full(count, _BLOCKED)
+    self._parents = numpy.full(count, -1, dtype=numpy.intp)
+    self._directions = numpy.full(count, -1, dtype=numpy.int8)
+    sources = numpy.array(sorted(self._sources), dtype=numpy.intp)
+    self._distances[sources] = 0
+    if self.cost is not None:
+      heap = [(0, index) for index in self._sources]
+      self._relax(heap)
+      return
+    # unit costs: breadth-first, one whole frontier per numpy step
+    padded = self._table.padded()
+    open_tiles = numpy.append(self._costs < _BLOCKED, False)
+    visited = numpy.zeros(count + 1, dtype=bool)
+    visited[count] = True
+    visited[sources] = True
+    frontier = sources
+    step = 0
+    while frontier.size:
+      step += 1
+      reached = []
+      for column, direction in enumerate(self._table.direction_order):
+        neighbors = padded[frontier, column]
+        keep = open_tiles[neighbors] & ~visited[neighbors]
+        neighbors = neighbors[keep]
+        visited[neighbors] = True
+        self._distances[neighbors] = step
+        self._parents[neighbors] = frontier[keep]
+        self._directions[neighbors] = OPPOSITE_DIRECTION[direction]
+        reached.append(neighbors)
+      frontier = numpy.concatenate(reached)
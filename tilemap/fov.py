@@ -0,0 +1,236 @@
+from tilemap.constants import RECT_DIRECTION_MAP, HEX_DIRECTION_MAP
+from tilemap.storage import ArrayStorage, numpy
+
+# each sector scans rows at increasing depth: tile (depth, col) is origin + depth * axis + col * step
+_RECT_SECTORS = [((0, -1), (1, 0)), ((1, 0), (0, 1)), ((0, 1), (1, 0)), ((-1, 0), (0, 1))]
+_HEX_CORNERS = list(HEX_DIRECTION_MAP.values())
+# a hex sector runs along one edge of each ring, from one corner to the next
+_HEX_SECTORS = [(corner, (following[0] - corner[0], following[1] - corner[1]))
+                for corner, following in zip(_HEX_CORNERS, _HEX_CORNERS[1:] + _HEX_CORNERS[:1])]
+_BITS = bytes.maketrans(b'\x00\x01', b'01')
+
+def field_of_view(tile_map, origin, opaque=None, radius=None):
+  """Finds the tiles visible from the given coordinate.
+  Rect maps use symmetric shadowcasting, so a tile sees the origin exactly when the origin sees it.
+  Hex maps shadowcast the six edges of each ring in cube coordinates.
+  Opaque tiles are visible themselves but hide what is behind them.
+
+  Args:
+    tile_map (Map): a bounded map
+    origin (tuple): the coordinate to look from
+    opaque (function): takes tile content and says whether it blocks sight, nothing does by default
+    radius (int): how far sight reaches, in the map's distance as Map.distance measures it, unlimited by default
+
+  Returns:
+    set of visible coordinates, including the origin
+
+  Raises:
+    IndexError when the origin is outside the map
+  """
+  tile_map._require_coor(origin)
+  get = tile_map._get_index
+  blocked = (lambda index: False) if opaque is None else (lambda index: opaque(get(index)))
+  seen = bytearray(tile_map._tile_count())
+  _cast(tile_map, origin, blocked, radius, seen)
+  coor = tile_map._coor
+  return {coor(index) for index, visible in enumerate(seen) if visible}
+
+def fields_of_view(tile_map, origins, opaque=None, radius=None):
+  """Finds the tiles visible from each of many coordinates in one pass over the map.
+  Opacity is worked out once per tile and shared by every viewer.
+
+  Args:
+    tile_map (Map): a bounded map
+    origins (iterable): the coordinates to look from
+    opaque (function): takes tile content and says whether it blocks sight, nothing does by default
+    radius (int): how far sight reaches, in the map's distance as Map.distance measures it, unlimited by default
+
+  Returns:
+    on array storage a bool numpy array shaped (viewers,) + the map's storage shape,
+    otherwise a list of ints, one per viewer, with bit i set when the tile at flat index i is visible
+
+  Raises:
+    IndexError when any origin is outside the map
+  """
+  origins = list(origins)
+  tile_map._require_coors(origins)
+  blocked = _opacity_table(tile_map, opaque).__getitem__
+  count = tile_map._tile_count()
+  array = numpy is not None and isinstance(tile_map, ArrayStorage)
+  if array:
+    visible = numpy.zeros((len(origins), count), dtype=bool)
+  else:
+    visible = []
+  for number, origin in enumerate(origins):
+    seen = bytearray(count)
+    _cast(tile_map, origin, blocked, radius, seen)
+    if array:
+      visible[number] = numpy.frombuffer(seen, dtype=bool)
+    else:
+      visible.append(int(seen.translate(_BITS)[::-1], 2) if count else 0)
+  if array:
+    return visible.reshape((len(origins),) + tile_map._storage_shape())
+  return visible
+
+def line(tile_map, first_coor, second_coor):
+  """Gets the tiles on the straight line between two coordinates.
+  Rect maps use Bresenham's line, hex maps round points along the line in cube coordinates.
+
+  Args:
+    tile_map (Map): the map whose geometry to use
+    first_coor (tuple): where the line starts
+    second_coor (tuple): where the line ends
+
+  Returns:
+    list of coordinates from first_coor to second_coor inclusive, possibly outside the map
+  """
+  if tile_map.direction_map is RECT_DIRECTION_MAP:
+    return _bresenham_line(first_coor, second_coor)
+  if tile_map.direction_map is HEX_DIRECTION_MAP:
+    return _hex_line(first_coor, second_coor)
+  step = 1 if second_coor >= first_coor else -1
+  return list(range(first_coor, second_coor + step, step))
+
+def line_of_sight(tile_map, first_coor, second_coor, opaque=None):
+  """Checks whether two tiles can see each other along the line between them.
+  Only the tiles strictly between the two are tested, so a wall can be seen.
+
+  Args:
+    tile_map (Map): the map to look across
+    first_coor (tuple): one end of the line
+    second_coor (tuple): the other end of the line
+    opaque (function): takes tile content and says whether it blocks sight, nothing does by default
+
+  Returns:
+    True when no tile between the two blocks sight
+
+  Raises:
+    IndexError when either coordinate is outside the map
+  """
+  tile_map._require_coor(first_coor)
+  tile_map._require_coor(second_coor)
+  for coor in line(tile_map, first_coor, second_coor)[1:-1]:
+    if opaque is not None and opaque(tile_map._get(coor)):
+      return False
+  return True
+
+def _opacity_table(tile_map, opaque):
+  count = tile_map._tile_count()
+  if opaque is None:
+    return bytearray(count)
+  if numpy is not None and isinstance(tile_map, ArrayStorage):
+    by_id = numpy.array([bool(opaque(content)) for content in tile_map.palette.contents], dtype=bool)
+    return by_id[tile_map._flat_ids].tolist()
+  get = tile_map._get_index
+  return [bool(opaque(get(index))) for index in range(count)]
+
+def _cast(tile_map, origin, blocked, radius, seen):
+  seen[tile_map._index(origin)] = 1
+  if tile_map.direction_map is RECT_DIRECTION_MAP:
+    depth = max(tile_map.width, tile_map.height) if radius is None else radius
+    # the ball of the map's metric rather than the square the scan covers
+    distance = tile_map._distance
+    within = None if radius is None else (lambda coor: distance(origin, coor) <= radius)
+    for axis, step in _RECT_SECTORS:
+      _shadowcast(tile_map, origin, axis, step, (-1, 1), (1, 1), depth, within, blocked, seen)
+  elif tile_map.direction_map is HEX_DIRECTION_MAP:
+    depth = tile_map.width + tile_map.height if radius is None else radius
+    # every tile in a row of a hex sector is as far from the origin as the row is deep
+    for axis, step in _HEX_SECTORS:
+      _shadowcast(tile_map, origin, axis, step, (0, 1), (1, 1), depth, None, blocked, seen)
+  else:
+    _cast_line(tile_map, origin, blocked, radius, seen)
+
+def _shadowcast(tile_map, origin, axis, step, start, end, max_depth, within, blocked, seen):
+  # symmetric shadowcasting, with slopes kept as exact (numerator, denominator) pairs
+  exists = tile_map.exists
+  index_of = tile_map._index
+  origin_a, origin_b = origin
+  axis_a, axis_b = axis
+  step_a, step_b = step
+  rows = [(1, start[0], start[1], end[0], end[1])]
+  while rows:
+    depth, start_num, start_den, end_num, end_den = rows.pop()
+    if depth > max_depth:
+      continue
+    base_a = origin_a + depth * axis_a
+    base_b = origin_b + depth * axis_b
+    first_col = (2 * depth * start_num + start_den) // (2 * start_den)
+    last_col = -((end_den - 2 * depth * end_num) // (2 * end_den))
+    previous_wall = None
+    for col in range(first_col, last_col + 1):
+      coor = (base_a + col * step_a, base_b + col * step_b)
+      if exists(coor):
+        index = index_of(coor)
+        wall = blocked(index)
+        if wall or (col * start_den >= depth * start_num and col * end_den <= depth * end_num):
+          if within is None or within(coor):
+            seen[index] = 1
+      else:
+        wall = True
+      if previous_wall and not wall:
+        start_num, start_den = 2 * col - 1, 2 * depth
+      if previous_wall is False and wall:
+        rows.append((depth + 1, start_num, start_den, 2 * col - 1, 2 * depth))
+      previous_wall = wall
+    if previous_wall is False:
+      rows.append((depth + 1, start_num, start_den, end_num, end_den))
+
+def _cast_line(tile_map, origin, blocked, radius, seen):
+  for step in (-1, 1):
+    coor = origin + step
+    while tile_map.exists(coor) and (radius is None or abs(coor - origin) <= radius):
+      seen[coor] = 1
+      if blocked(coor):
+        break
+      coor += step
+
+def _bresenham_line(first_coor, second_coor):
+  x, y = first_coor
+  last_x, last_y = second_coor
+  dx = abs(last_x - x)
+  dy = -abs(last_y - y)
+  step_x = 1 if x < last_x else -1
+  step_y = 1 if y < last_y else -1
+  error = dx + dy
+  coors = [(x, y)]
+  while (x, y) != (last_x, last_y):
+    doubled = 2 * error
+    if doubled >= dy:
+      error += dy
+      x += step_x
+    if doubled <= dx:
+      error += dx
+      y += step_y
+    coors.append((x, y))
+  return coors
+
+def _hex_line(first_coor, second_coor):
+  q, r = first_coor
+  dq = second_coor[0] - q
+  dr = second_coor[1] - r
+  steps = (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+  if not steps:
+    return [first_coor]
+  # nudged off the exact midpoints so ties round the same way along the whole line
+  q += 1e-6
+  r += 2e-6
+  coors = []
+  for number in range(steps + 1):
+    fraction = number / steps
+    coors.append(_cube_round(q + dq * fraction, r + dr * fraction))
+  return coors
+
+def _cube_round(q, r):
+  s = -q - r
+  rounded_q = round(q)
+  rounded_r = round(r)
+  rounded_s = round(s)
+  q_error = abs(rounded_q - q)
+  r_error = abs(rounded_r - r)
+  s_error = abs(rounded_s - s)
+  if q_error > r_error and q_error > s_error:
+    rounded_q = -rounded_r - rounded_s
+  elif r_error > s_error:
+    rounded_r = -rounded_q - rounded_s
+  return (rounded_q, rounded_r)
@@ -0,0 +1,90 @@
+import weakref
+from tilemap.neighbors import build_neighbor_table
+
+# maps with more tiles than this build their coordinates as they go rather than keeping them all
+INTERN_LIMIT = 1 << 16
+# how many distinct layouts stay cached, maps keep the layout they were created with either way
+CACHE_SIZE = 64
+
+_GEOMETRIES = {}
+
+class Geometry:
+  """The layout of every map with the same geometry and dimensions, worked out once and shared between them.
+  Coordinate tuples are built once, in flat index order, and handed out by tile_coors, side_coors and adjacent,
+  so a map of a known size allocates no coordinates of its own.
+  Alongside them it keeps the lookup tables the maps read instead of recomputing:
+  the first stored column of each hex row, which turns a coordinate into its storage column and flat index,
+  the side coordinates and their flat indices, a per-tile side bitmap and the edge masks of bitboard shifts.
+  The neighbor table is held by the maps and only weakly here, so it goes with the last map using it.
+  Maps over INTERN_LIMIT tiles skip the per-tile tables and keep only those along the rows and sides,
+  and each builds a neighbor table of its own.
+  """
+  __slots__ = ('tile_count', 'row_offsets', 'coors', 'sides', 'side_indices', '_side_flags',
+               '_neighbor_table', '_shift_masks')
+  def __init__(self, tile_map):
+    self.tile_count = tile_map._tile_count()
+    self.row_offsets = None
+    if hasattr(tile_map, '_row_offset'):
+      self.row_offsets = tuple(tile_map._row_offset(row) for row in range(tile_map._storage_shape()[0]))
+    self.coors = None
+    sides = list(tile_map._side_coors())
+    self.side_indices = tuple(tile_map._index(coor) for coor in sides)
+    if self.tile_count <= INTERN_LIMIT:
+      coors = self.coors = tuple(tile_map._tile_coors())
+      sides = [coors[index] for index in self.side_indices]
+    self.sides = tuple(sides)
+    self._side_flags = None
+    self._neighbor_table = None
+    self._shift_masks = None
+  def side_flags(self):
+    """Gets the side bitmap, building it the first time
+
+    Returns:
+      bytearray by flat index, 1 for tiles on the side of the map and 0 elsewhere
+    """
+    if self._side_flags is None:
+      flags = bytearray(self.tile_count)
+      for index in self.side_indices:
+        flags[index] = 1
+      self._side_flags = flags
+    return self._side_flags
+  def neighbor_table(self, tile_map):
+    """Gets the neighbor table of the layout, building it from the given map when no map holds one
+
+    Args:
+      tile_map (Map): any map with this layout
+
+    Returns:
+      NeighborTable shared by the maps with this layout that hold it, the caller should hold it too
+    """
+    table = None if self._neighbor_table is None else self._neighbor_table()
+    if table is None:
+      table = build_neighbor_table(tile_map)
+      if self.tile_count <= INTERN_LIMIT:
+        self._neighbor_table = weakref.ref(table)
+    return table
+
+def geometry_of(tile_map):
+  """Gets the shared layout of a map
+
+  Args:
+    tile_map (Map): a map whose dimensions are set
+
+  Returns:
+    the Geometry for the map's geometry and dimensions, or None for an unbounded map
+  """
+  if not tile_map._bounded():
+    return None
+  key = layout_key(tile_map)
+  geometry = _GEOMETRIES.get(key)
+  if geometry is None:
+    if len(_GEOMETRIES) >= CACHE_SIZE:
+      del _GEOMETRIES[next(iter(_GEOMETRIES))]
+    geometry = _GEOMETRIES[key] = Geometry(tile_map)
+  return geometry
+
+def layout_key(tile_map):
+  """Gets what maps of the same layout have in common: the geometry, the storage shape, None when unbounded,
+  and the directions, which the neighbor table and the shift masks follow"""
+  return (tile_map._geometry_code, tile_map._storage_shape() if tile_map._bounded() else None,
+          tuple(tile_map.direction_map.items()))
@@ -0,0 +1,40 @@
+from tilemap.observer import MapObserver
+
+class ContentIndex(MapObserver):
+  """Secondary index from a key of each tile's content to the coordinates holding it.
+  Empty tiles are not indexed. The index is kept current by the map's mutation methods.
+  """
+  def __init__(self, tile_map, key):
+    self.key = key
+    self._coors = {}
+    for coor, content in tile_map.tiles():
+      if content is not None:
+        self._add(key(content), coor)
+  def _add(self, key_value, coor):
+    coors = self._coors.get(key_value)
+    if coors is None:
+      self._coors[key_value] = {coor}
+    else:
+      coors.add(coor)
+  def _discard(self, key_value, coor):
+    coors = self._coors[key_value]
+    coors.discard(coor)
+    if not coors:
+      del self._coors[key_value]
+  def tile_changed(self, coor, previous_content, content):
+    if previous_content is not None:
+      self._discard(self.key(previous_content), coor)
+    if content is not None:
+      self._add(self.key(content), coor)
+  def coors(self, key_value):
+    """Gets the coordinates whose content has the given key
+
+    Args:
+      key_value: a value returned by the index's key function
+
+    Returns:
+      set of coordinates, empty when nothing matches
+    """
+    return self._coors.get(key_value, frozenset())
+  def keys(self):
+    return self._coors.keys()
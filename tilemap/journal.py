@@ -0,0 +1,59 @@
+from tilemap.observer import MapObserver
+
+_TILE = 0
+_TRACKING = 1
+_PROPERTY = 2
+
+class Journal(MapObserver):
+  """Log of a map's changes as (kind, key, previous, new) deltas, with a cursor for undo and redo.
+  Checkpoints are positions in the log.
+  """
+  def __init__(self, tile_map):
+    self.tile_map = tile_map
+    self.position = 0
+    self._deltas = []
+    self._replaying = False
+  def _record(self, delta):
+    if self._replaying:
+      return
+    if self.position < len(self._deltas):
+      del self._deltas[self.position:]
+    self._deltas.append(delta)
+    self.position += 1
+  def tile_changed(self, coor, previous_content, content):
+    self._record((_TILE, coor, previous_content, content))
+  def tracking_changed(self, coor, previous_name, name):
+    self._record((_TRACKING, coor, previous_name, name))
+  def property_changed(self, name, previous_value, value):
+    self._record((_PROPERTY, name, previous_value, value))
+  def _apply(self, kind, key, value):
+    if kind == _TILE:
+      self.tile_map._write(key, value)
+    elif kind == _TRACKING:
+      self.tile_map._set_tracking(key, value)
+    else:
+      self.tile_map._set_property(key, value)
+  def undo(self, checkpoint):
+    if checkpoint < 0 or checkpoint > self.position:
+      raise ValueError('Checkpoint {} is not behind the current state'.format(checkpoint))
+    self._replaying = True
+    try:
+      while self.position > checkpoint:
+        self.position -= 1
+        kind, key, previous, _ = self._deltas[self.position]
+        self._apply(kind, key, previous)
+    finally:
+      self._replaying = False
+  def redo(self, checkpoint=None):
+    if checkpoint is None:
+      checkpoint = len(self._deltas)
+    if checkpoint < self.position or checkpoint > len(self._deltas):
+      raise ValueError('Checkpoint {} is not ahead of the current state'.format(checkpoint))
+    self._replaying = True
+    try:
+      while self.position < checkpoint:
+        kind, key, _, new = self._deltas[self.position]
+        self._apply(kind, key, new)
+        self.position += 1
+    finally:
+      self._replaying = False
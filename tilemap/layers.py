@@ -0,0 +1,269 @@
+from tilemap.geometry import layout_key
+
+class LayeredMap:
+  """Several maps of one geometry and size, the layers, read and written through one coordinate system.
+  Each layer is a whole map with its own storage, such as bytes for terrain, bits for fog and lists for units,
+  and keeps its own tracking, properties and observers. All layers share one Geometry,
+  so a coordinate is checked once however many layers a call touches.
+  """
+  __slots__ = ('layers', '_base')
+  def __init__(self, layers):
+    if not layers:
+      raise ValueError('A layered map needs at least one layer')
+    self.layers = dict(layers)
+    self._base = next(iter(self.layers.values()))
+    for name, layer in self.layers.items():
+      if layout_key(layer) != layout_key(self._base):
+        raise ValueError('Layer {} does not share the geometry and size of the other layers'.format(name))
+  def layer(self, name):
+    """Gets the map holding one layer
+
+    Args:
+      name (str): the layer name
+
+    Returns:
+      the layer's map
+
+    Raises:
+      ValueError when there is no layer with the given name
+    """
+    layer = self.layers.get(name)
+    if layer is None:
+      raise ValueError('Unknown layer {}'.format(name))
+    return layer
+  def _names(self, layers):
+    if layers is None:
+      return list(self.layers)
+    for name in layers:
+      self.layer(name)
+    return list(layers)
+  def exists(self, coor):
+    """Detects whether the given coordinate exists in the map, which is the same for every layer
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Returns:
+      true or false, whether a tile with the given coordinate exists
+    """
+    return self._base.exists(coor)
+  def tile_coors(self, region=None):
+    """Gets the coordinates of the map in flat index order, as for Map.tile_coors"""
+    return self._base.tile_coors(region)
+  def get(self, coor, layer):
+    """Gets the content of one layer at the given coordinate
+
+    Args:
+      coor (tuple): the coordinate of the tile
+      layer (str): the layer name
+
+    Returns:
+      tile contents
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+      ValueError when there is no layer with the given name
+    """
+    layer_map = self.layer(layer)
+    layer_map._require_coor(coor)
+    return layer_map._get(coor)
+  def set(self, coor, content, layer):
+    """Sets the content of one layer at the given coordinate, as Map.set does on the layer's map
+
+    Args:
+      coor (tuple): the coordinate of the tile
+      content: desired tile content
+      layer (str): the layer name
+
+    Returns:
+      prior tile contents
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+      ValueError when there is no layer with the given name
+    """
+    return self.layer(layer).set(coor, content)
+  def get_all(self, coor, layers=None):
+    """Gets the contents of every layer at the given coordinate, checking it once
+
+    Args:
+      coor (tuple): the coordinate of the tile
+      layers (list): optional layer names, every layer by default
+
+    Returns:
+      dict from layer name to tile content
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+      ValueError when any of the layers does not exist
+    """
+    names = self._names(layers)
+    self._base._require_coor(coor)
+    return {name: self.layers[name]._get(coor) for name in names}
+  def set_all(self, coor, contents):
+    """Sets the contents of several layers at the given coordinate, checking it once.
+    Tracked content that is overwritten has its property set to None, as with Map.set.
+
+    Args:
+      coor (tuple): the coordinate of the tile
+      contents (dict): desired content by layer name
+
+    Returns:
+      dict from layer name to prior tile content
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+      ValueError when any of the layers does not exist or cannot hold its content, before any layer is written
+    """
+    self._names(contents)
+    self._base._require_coor(coor)
+    for name, content in contents.items():
+      self.layers[name]._stored(content)
+    previous_contents = {}
+    for name, content in contents.items():
+      with self.layers[name].unchecked() as layer_map:
+        previous_contents[name] = layer_map.set(coor, content)
+    return previous_contents
+  def get_many(self, coors, layers=None):
+    """Gets the contents of several layers at the given coordinates.
+    All coordinates are validated once, before any tile of any layer is read.
+
+    Args:
+      coors (iterable): the coordinates of the tiles
+      layers (list): optional layer names, every layer by default
+
+    Returns:
+      dict from layer name to the list of its tile contents, in the same order as coors
+
+    Raises:
+      IndexError when any of the given coordinates is outside the map
+      ValueError when any of the layers does not exist
+    """
+    names = self._names(layers)
+    coors = list(coors)
+    self._base._require_coors(coors)
+    result = {}
+    for name in names:
+      with self.layers[name].unchecked() as layer_map:
+        result[name] = layer_map.get_many(coors)
+    return result
+  def set_many(self, coors, contents):
+    """Sets the contents of several layers at the given coordinates.
+    All coordinates, lengths and contents are validated before any layer is written.
+
+    Args:
+      coors (iterable): the coordinates of the tiles
+      contents (dict): from layer name to its desired tile contents, one per coordinate
+
+    Returns:
+      dict from layer name to the list of its prior tile contents
+
+    Raises:
+      IndexError when any of the given coordinates is outside the map
+      ValueError when any of the layers does not exist, cannot hold one of its contents,
+        or its contents have a different length than coors
+    """
+    self._names(contents)
+    coors = list(coors)
+    contents = {name: list(layer_contents) for name, layer_contents in contents.items()}
+    for name, layer_contents in contents.items():
+      if len(layer_contents) != len(coors):
+        raise ValueError('Got {} coordinates but {} contents for layer {}'.format(len(coors), len(layer_contents), name))
+    self._base._require_coors(coors)
+    for name, layer_contents in contents.items():
+      layer_map = self.layers[name]
+      for content in layer_contents:
+        layer_map._stored(content)
+    previous_contents = {}
+    for name, layer_contents in contents.items():
+      with self.layers[name].unchecked() as layer_map:
+        previous_contents[name] = layer_map.set_many(coors, layer_contents)
+    return previous_contents
+  def fill(self, region, contents):
+    """Sets every tile of the given region in several layers, as Map.fill does on each layer's map
+
+    Args:
+      region (tuple): the (first_coor, last_coor) corners of the region
+      contents (dict): desired content by layer name
+
+    Raises:
+      IndexError when either corner is outside the map
+      ValueError when any of the layers does not exist
+    """
+    self._names(contents)
+    self._base._require_region(region)
+    for name, content in contents.items():
+      with self.layers[name].unchecked() as layer_map:
+        layer_map.fill(region, content)
+  def clear(self, layers=None):
+    """Empties every tile of the given layers, as Map.clear does
+
+    Args:
+      layers (list): optional layer names, every layer by default
+    """
+    for name in self._names(layers):
+      self.layers[name].clear()
+  def tiles(self, region=None, layers=None):
+    """Traverses the map, getting the contents of every layer for each tile
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for Map.fill
+      layers (list): optional layer names, every layer by default
+
+    Returns:
+      generator of (coor, contents) tuples, where contents holds one content per layer in the order of layers
+    """
+    layer_maps = [self.layers[name] for name in self._names(layers)]
+    for coor in self._base.tile_coors(region):
+      yield (coor, tuple(layer_map._get(coor) for layer_map in layer_maps))
+  def track(self, coor, name, layer):
+    """Start tracking the content of one layer at the given coordinate, as Map.track does on the layer's map.
+    The tracking property is kept in that layer's properties.
+
+    Args:
+      coor (tuple): the current coordinate for the content to track
+      name (str): the name to give the tracking property
+      layer (str): the layer name
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+      ValueError when there is no layer with the given name
+    """
+    self.layer(layer).track(coor, name)
+  def locate(self, name, layer):
+    """Gets the current coordinate of content tracked in one layer
+
+    Args:
+      name (str): the name given to track
+      layer (str): the layer name
+
+    Returns:
+      the coordinate, or None once the content was overwritten or removed
+
+    Raises:
+      ValueError when there is no layer with the given name
+    """
+    return self.layer(layer).properties[name]
+  def move(self, start_coor, end_coor, layer):
+    """Moves the content of one layer, as Map.move does on the layer's map; other layers stay as they are
+
+    Args:
+      start_coor (tuple): the coordinate from which to move
+      end_coor (tuple): the coordinate to which to move
+      layer (str): the layer name
+
+    Returns:
+      prior tile contents of end coordinate in that layer
+
+    Raises:
+      IndexError when either coordinate is outside the map
+      ValueError when there is no layer with the given name
+    """
+    return self.layer(layer).move(start_coor, end_coor)
+  def fork(self):
+    """Creates an independent copy of every layer, as Map.fork does
+
+    Returns:
+      the forked layered map
+    """
+    return LayeredMap({name: layer.fork() for name, layer in self.layers.items()})
@@ -1,10 +1,160 @@
+import copy
+from contextlib import contextmanager
+from itertools import islice
+from tilemap import fov, parallel, serialize
+from tilemap.automaton import Automaton
+from tilemap.bitboard import Bitboard, bits_from_flags
+from tilemap.changes import ChangeStream
+from tilemap.components import Components
+from tilemap.field import DistanceField
+from tilemap.geometry import geometry_of
+from tilemap.index import ContentIndex
+from tilemap.journal import Journal
+from tilemap.neighbors import build_neighbor_table
+from tilemap.observer import MISSING
+from tilemap.stats import instrumented_class, new_stats, plain_class, snapshot
+from tilemap.unchecked import checked_class, unchecked_class
+from tilemap.zobrist import ZobristHash
+
+def _occupied(content):
+  return content is not None
+
+def _new_map(map_class):
+  return map_class.__new__(map_class)
+
 class Map:
+  __slots__ = ('properties', 'tracking', '_direction_map', '_geometry', '_neighbor_table', '_observers',
+               '_content_index', '_journal', '_zobrist', '_stats', '_changes')
+  # the directions of the geometry, a map can be given its own through direction_map
+  _default_direction_map = {}
+  # slots pointing into the shared layout, looked up again after loading rather than pickled with every map
+  _layout_slots = ('_geometry', '_neighbor_table')
   def __init__(self):
     self.properties = {}
     self.tracking = {}
+    self._direction_map = self._default_direction_map
+    self._geometry = None
+    self._neighbor_table = None
+    self._observers = ()
+    self._content_index = None
+    self._journal = None
+    self._zobrist = None
+    self._stats = None
+    self._changes = None
+  def __getstate__(self):
+    slots = {}
+    for cls in type(self).__mro__:
+      for name in getattr(cls, '__slots__', ()):
+        if name not in self._layout_slots and hasattr(self, name):
+          slots[name] = getattr(self, name)
+    if self._direction_map is self._default_direction_map:
+      # the default stays the module constant after loading, which path and fov recognize by identity
+      del slots['_direction_map']
+    return (None, slots)
+  def __setstate__(self, state):
+    _, slots = state
+    self._direction_map = self._default_direction_map
+    for name, value in slots.items():
+      setattr(self, name, value)
+    self._attach_geometry()
+  def _attach_geometry(self):
+    self._geometry = geometry_of(self)
+    self._neighbor_table = None
+  @property
+  def direction_map(self):
+    """dict from direction to coordinate shift, which adjacent, the neighbor table and bitboard shifts follow.
+    Setting it looks up the shared layout of the new directions."""
+    return self._direction_map
+  @direction_map.setter
+  def direction_map(self, direction_map):
+    self._direction_map = direction_map
+    self._attach_geometry()
+  def __reduce_ex__(self, protocol):
+    # instrumented and unchecked maps pickle and copy as the map class they wrap, the copy starts without stats
+    reduced = super().__reduce_ex__(protocol)
+    map_class = plain_class(checked_class(type(self)))
+    if map_class is type(self):
+      return reduced
+    state = reduced[2]
+    _, slots = state
+    slots['_stats'] = None
+    return (_new_map, (map_class,), state)
   def _require_coor(self, coor):
     if not self.exists(coor):
       raise IndexError('Coordinate {} outside tilemap bounds'.format(coor))
+  def _require_index(self, index):
+    if not 0 <= index < self._tile_count():
+      raise IndexError('Index {} outside tilemap bounds'.format(index))
+  def _bounded(self):
+    return True
+  def _tile_count(self):
+    count = 1
+    for size in self._storage_shape():
+      count *= size
+    return count
+  def _require_coors(self, coors):
+    # one pass without raising, the slow pass only finds the offender
+    if not all(map(self.exists, coors)):
+      for coor in coors:
+        self._require_coor(coor)
+  def _require_region(self, region):
+    first, last = region
+    self._require_coor(first)
+    self._require_coor(last)
+  def _region_bounds(self, region):
+    # storage slices of the region clipped to the map, the whole map when region is None
+    shape = self._storage_shape()
+    if region is None:
+      return tuple(slice(0, size) for size in shape)
+    slices = self._region_slices(region)
+    return tuple(slice(max(bounds.start, 0), max(min(bounds.stop, size), 0)) for bounds, size in zip(slices, shape))
+  def _in_region(self, coor, slices):
+    for key, bounds in zip(self._storage_key(coor), slices):
+      if key < bounds.start or key >= bounds.stop:
+        return False
+    return True
+  def _invalidate_tracking(self, coors):
+    for coor in self.tracking.keys() & coors:
+      self._set_property(self.tracking[coor], None)
+      self._set_tracking(coor, None)
+  def _set_tracking(self, coor, name):
+    # a name of None stops tracking coor
+    previous_name = self.tracking.get(coor)
+    if name is None:
+      del self.tracking[coor]
+    else:
+      self.tracking[coor] = name
+    if self._observers:
+      for observer in self._observers:
+        observer.tracking_changed(coor, previous_name, name)
+  def _set_property(self, name, value):
+    # a value of MISSING removes the property
+    previous_value = self.properties.get(name, MISSING)
+    if value is MISSING:
+      del self.properties[name]
+    else:
+      self.properties[name] = value
+    if self._observers:
+      for observer in self._observers:
+        observer.property_changed(name, previous_value, value)
+  def _write(self, coor, content):
+    # internal write assumes that coor is valid, and leaves tracking alone
+    previous_content = self._get(coor)
+    self._set(coor, content)
+    if self._observers:
+      self._tile_changed(coor, previous_content, self._stored(content))
+    return previous_content
+  def _stored(self, content):
+    # what reading the tile back gives after content is written, for the observers
+    return content
+  def _add_observer(self, observer):
+    # a tuple, so observers added or removed during a notification wait for the next one
+    self._observers += (observer,)
+  def _remove_observer(self, observer):
+    self._observers = tuple(other for other in self._observers if other is not observer)
+  def _tile_changed(self, coor, previous_content, content):
+    for observer in self._observers:
+      observer.tile_changed(coor, previous_content, content)
   def _shift_coor(self, coor, shift):
     return (coor[0] + shift[0], coor[1] + shift[1])
   def exists(self, coor):
@@ -47,19 +197,239 @@ class Map:
     self._require_coor(coor)
     previous_content = self._get(coor)
     self._set(coor, content)
+    if self._observers:
+      self._tile_changed(coor, previous_content, self._stored(content))
     if coor in self.tracking:
-      name = self.tracking[coor]
-      self.properties[name] = None
-      del self.tracking[coor]
+      self._set_property(self.tracking[coor], None)
+      self._set_tracking(coor, None)
     return previous_content
-  def tiles(self):
-    """Traverses the map, getting all tiles within
+  def index_of(self, coor):
+    """Gets the flat index of a coordinate, its position in the order of tile_coors
+
+    Args:
+      coor (tuple): the coordinate of the tile
 
     Returns:
-      generator of (coor, content) tuples for all tiles
+      flat index as an int
+
+    Raises:
+      IndexError when the given coordinate is outside the map
     """
-    for coor in self.tile_coors():
-      yield (coor, self._get(coor))
+    self._require_coor(coor)
+    return self._index(coor)
+  def coor_of(self, index):
+    """Gets the coordinate of a flat index
+
+    Args:
+      index (int): flat index of the tile
+
+    Returns:
+      the coordinate of the tile
+
+    Raises:
+      IndexError when the given index is outside the map
+    """
+    self._require_index(index)
+    geometry = self._geometry
+    if geometry is not None and geometry.coors is not None:
+      return geometry.coors[index]
+    return self._coor(index)
+  def get_index(self, index):
+    """Gets the content of the tile at the given flat index, without building a coordinate
+
+    Args:
+      index (int): flat index of the tile
+
+    Returns:
+      tile content
+
+    Raises:
+      IndexError when the given index is outside the map
+    """
+    self._require_index(index)
+    return self._get_index(index)
+  def set_index(self, index, content):
+    """Sets the content of the tile at the given flat index, like set
+
+    Args:
+      index (int): flat index of the tile
+      content: desired tile content
+
+    Returns:
+      prior tile contents
+
+    Raises:
+      IndexError when the given index is outside the map
+    """
+    self._require_index(index)
+    previous_content = self._get_index(index)
+    self._set_index(index, content)
+    if self._observers or self.tracking:
+      coor = self._coor(index)
+      if self._observers:
+        self._tile_changed(coor, previous_content, self._stored(content))
+      if coor in self.tracking:
+        self._set_property(self.tracking[coor], None)
+        self._set_tracking(coor, None)
+    return previous_content
+  @contextmanager
+  def unchecked(self):
+    """Skips bounds checks for the duration of a with block, for trusted inner loops.
+    Inside the block get, get_index, index_of and coor_of are the bare storage lookups,
+    and every other method trusts its coordinates; out-of-bounds coordinates then give undefined results.
+    Stats should not be enabled or disabled inside the block.
+
+    Returns:
+      context manager giving the map itself
+    """
+    previous_class = type(self)
+    self.__class__ = unchecked_class(previous_class)
+    try:
+      yield self
+    finally:
+      self.__class__ = previous_class
+  def get_many(self, coors):
+    """Gets the contents of the tiles at the given coordinates.
+    All coordinates are validated before any tile is read.
+
+    Args:
+      coors (iterable): the coordinates of the tiles
+
+    Returns:
+      list of tile contents, in the same order as coors
+
+    Raises:
+      IndexError when any of the given coordinates is outside the map
+    """
+    coors = list(coors)
+    self._require_coors(coors)
+    return [self._get(coor) for coor in coors]
+  def set_many(self, coors, contents):
+    """Sets the contents of the tiles at the given coordinates.
+    All coordinates are validated before any tile is written, so a failed call leaves the map unchanged.
+    Tracked content that is overwritten has its property set to None, as with set.
+
+    Args:
+      coors (iterable): the coordinates of the tiles
+      contents (iterable): desired tile contents, one per coordinate
+
+    Returns:
+      list of prior tile contents, in the same order as coors
+
+    Raises:
+      IndexError when any of the given coordinates is outside the map
+      ValueError when coors and contents have different lengths
+    """
+    coors = list(coors)
+    contents = list(contents)
+    if len(coors) != len(contents):
+      raise ValueError('Got {} coordinates but {} contents'.format(len(coors), len(contents)))
+    self._require_coors(coors)
+    previous_contents = self._set_many(coors, contents)
+    if self._observers:
+      for coor, previous_content, content in zip(coors, previous_contents, contents):
+        self._tile_changed(coor, previous_content, self._stored(content))
+    if self.tracking:
+      self._invalidate_tracking(coors)
+    return previous_contents
+  def _set_many(self, coors, contents):
+    # internal set_many assumes that all coors are valid
+    previous_contents = []
+    for coor, content in zip(coors, contents):
+      previous_contents.append(self._get(coor))
+      self._set(coor, content)
+    return previous_contents
+  def fill(self, region, content):
+    """Sets every tile in the given region to the given content.
+    A region is a (first_coor, last_coor) pair of opposite corners, both inclusive and in either order.
+    It covers the rectangle of tiles between them as the map lays out its rows and columns.
+    Tracked content inside the region has its property set to None.
+
+    Args:
+      region (tuple): the (first_coor, last_coor) corners of the region
+      content: desired tile content
+
+    Raises:
+      IndexError when either corner is outside the map
+    """
+    self._require_region(region)
+    if self._observers:
+      coors = list(self.tile_coors(region))
+      stored = self._stored(content)
+      for coor, previous_content in zip(coors, self._set_many(coors, [content] * len(coors))):
+        self._tile_changed(coor, previous_content, stored)
+    else:
+      self._fill(region, content)
+    if self.tracking:
+      slices = self._region_slices(region)
+      self._invalidate_tracking([coor for coor in self.tracking if self._in_region(coor, slices)])
+  def _fill(self, region, content):
+    # internal fill assumes that region is valid
+    for coor in self.tile_coors(region):
+      self._set(coor, content)
+  def clear(self):
+    """Empties every tile in the map.
+    All tracked properties are set to None.
+    """
+    if self._observers:
+      occupied = list(self.occupied_tiles())
+    self._create_storage()
+    if self._observers:
+      for coor, previous_content in occupied:
+        self._tile_changed(coor, previous_content, None)
+    for coor in list(self.tracking):
+      self._set_property(self.tracking[coor], None)
+      self._set_tracking(coor, None)
+  def tiles(self, region=None, where=None, skip_empty=False):
+    """Traverses the map, getting all tiles within.
+    A region limits the traversal to the tiles between its corners, clipped to the map,
+    so only the tiles inside it are visited.
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for fill
+      where (function): optional filter, takes tile content and says whether to include the tile
+      skip_empty (bool): whether to leave out empty tiles, where is then never given None
+
+    Returns:
+      generator of (coor, content) tuples for all included tiles
+    """
+    get = self._get
+    if where is None and not skip_empty:
+      for coor in self.tile_coors(region):
+        yield (coor, get(coor))
+      return
+    for coor in self.tile_coors(region):
+      content = get(coor)
+      if skip_empty and content is None:
+        continue
+      if where is not None and not where(content):
+        continue
+      yield (coor, content)
+  def tile_blocks(self, region=None, where=None, skip_empty=False, size=4096):
+    """Traverses the map like tiles, but in blocks rather than one tuple per tile
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for fill
+      where (function): optional filter, takes tile content and says whether to include the tile
+      skip_empty (bool): whether to leave out empty tiles
+      size (int): the most tiles in one block
+
+    Returns:
+      generator of (coors, contents) tuples of equally long lists
+    """
+    tiles = self.tiles(region, where, skip_empty)
+    while True:
+      block = list(islice(tiles, size))
+      if not block:
+        return
+      yield ([coor for coor, _ in block], [content for _, content in block])
+  def occupied_tiles(self):
+    """Traverses the map, getting the tiles that are not empty
+
+    Returns:
+      generator of (coor, content) tuples for all non-empty tiles
+    """
+    return self.tiles(skip_empty=True)
   def sides(self):
     """Gets the tiles on the edges of the map.
     A tile is on the side if at least one its borders is out-of-bounds.
@@ -69,6 +439,44 @@ class Map:
     """
     for coor in self.side_coors():
       yield (coor, self._get(coor))
+  def tile_coors(self, region=None):
+    """Gets the coordinates of the map in flat index order.
+    Maps of the same geometry and size share one set of coordinate tuples, which this hands out.
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for fill
+
+    Returns:
+      iterator of coordinates
+    """
+    if region is None and self._geometry is not None and self._geometry.coors is not None:
+      return iter(self._geometry.coors)
+    return self._tile_coors(region)
+  def side_coors(self):
+    """Gets the coordinates on the edges of the map, as for sides
+
+    Returns:
+      iterator of coordinates
+    """
+    if self._geometry is not None:
+      return iter(self._geometry.sides)
+    return self._side_coors()
+  def is_side(self, coor):
+    """Detects whether the given coordinate is on the edge of the map, as for sides
+
+    Args:
+      coor (tuple): the coordinate of the tile
+
+    Returns:
+      true or false, whether the tile is on the side
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self._require_coor(coor)
+    if self._geometry is None:
+      return False
+    return self._geometry.side_flags()[self._index(coor)] == 1
   def adjacent(self, coor):
     """Gets the tiles adjacent to the given coordinate
 
@@ -82,10 +490,478 @@ class Map:
       IndexError when the given coordinate is outside the map
     """
     self._require_coor(coor)
-    for _, direction in self.direction_map.items():
-      new_coor = self._shift_coor(coor, direction)
-      if self.exists(new_coor):
-        yield (new_coor, self._get(new_coor))
+    geometry = self._geometry
+    if geometry is None or geometry.coors is None:
+      for _, direction in self.direction_map.items():
+        new_coor = self._shift_coor(coor, direction)
+        if self.exists(new_coor):
+          yield (new_coor, self._get(new_coor))
+      return
+    # the shared neighbor table lists neighbors in direction_map order, as the shifts above would
+    coors = geometry.coors
+    for neighbor in self.neighbor_table().neighbors(self._index(coor)):
+      new_coor = coors[neighbor]
+      yield (new_coor, self._get(new_coor))
+  def distance(self, first_coor, second_coor):
+    """Gets the distance between two coordinates in the map's geometry.
+    Hex maps use cube distance, line maps the absolute difference,
+    and rect maps the metric in their metric attribute, MANHATTAN by default or CHEBYSHEV.
+
+    Args:
+      first_coor (tuple): one coordinate
+      second_coor (tuple): the other coordinate, neither has to be inside the map
+
+    Returns:
+      the distance as an int
+
+    Raises:
+      ValueError when a rect map has an unknown metric
+    """
+    return self._distance(first_coor, second_coor)
+  def within(self, coor, radius):
+    """Gets the tiles at most the given distance from a coordinate.
+    Only tiles inside both the range and the map are visited.
+
+    Args:
+      coor (tuple): the coordinate of the center tile
+      radius (int): the greatest distance to include
+
+    Returns:
+      generator of (coor, content) tuples, in the order of tile_coors
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self._require_coor(coor)
+    if radius < 0:
+      return
+    for tile_coor in self._within_coors(coor, radius):
+      yield (tile_coor, self._get(tile_coor))
+  def ring(self, coor, radius):
+    """Gets the tiles exactly the given distance from a coordinate
+
+    Args:
+      coor (tuple): the coordinate of the center tile
+      radius (int): the distance of the ring
+
+    Returns:
+      generator of (coor, content) tuples, in the order of tile_coors
+
+    Raises:
+      IndexError when the given coordinate is outside the map
+    """
+    self._require_coor(coor)
+    if radius < 0:
+      return
+    for tile_coor in self._ring_coors(coor, radius):
+      yield (tile_coor, self._get(tile_coor))
+  def line(self, first_coor, second_coor):
+    """Gets the tiles on the straight line between two coordinates, see fov.line.
+    The ends don't have to be inside the map, the line is clipped to it.
+    Rectangles are covered by the region argument of tiles.
+
+    Args:
+      first_coor (tuple): where the line starts
+      second_coor (tuple): where the line ends
+
+    Returns:
+      generator of (coor, content) tuples from first_coor toward second_coor
+    """
+    for coor in fov.line(self, first_coor, second_coor):
+      if self.exists(coor):
+        yield (coor, self._get(coor))
+  def bitboard(self, where=None):
+    """Gets the tiles whose content passes a filter as a bitboard, a set of tiles packed into one int
+
+    Args:
+      where (function): optional filter, takes tile content and says whether to include the tile;
+        by default the non-empty tiles are included
+
+    Returns:
+      Bitboard of the included tiles
+
+    Raises:
+      ValueError when the map is unbounded
+    """
+    if self._geometry is None:
+      raise ValueError('Unbounded maps have no fixed size')
+    return Bitboard(self, self._tile_bits(_occupied if where is None else where))
+  def _tile_bits(self, where):
+    return bits_from_flags(self._tile_flags(where))
+  def _tile_flags(self, where):
+    # one 0 or 1 per tile in flat index order
+    return bytes(bool(where(content)) for _, content in self.tiles())
+  def neighbor_table(self):
+    """Gets the precomputed adjacency of every tile, building it on first use.
+    Tiles are addressed by flat index, which numbers tiles in the order of tile_coors.
+
+    Returns:
+      NeighborTable kept by the map for later calls and shared with other maps of the same geometry and size
+
+    Raises:
+      ValueError when the map is unbounded
+    """
+    if self._neighbor_table is None:
+      if self._geometry is None:
+        return build_neighbor_table(self)
+      self._neighbor_table = self._geometry.neighbor_table(self)
+    return self._neighbor_table
+  def adjacent_indices(self, index):
+    """Gets the flat indices of the tiles adjacent to the tile at the given flat index
+
+    Args:
+      index (int): flat index of the tile
+
+    Returns:
+      list of flat indices of all adjacent tiles
+
+    Raises:
+      IndexError when the given index is outside the map
+    """
+    self._require_index(index)
+    return self.neighbor_table().neighbors(index)
+  def neighbors_array(self):
+    """Gets the adjacency of every tile as CSR numpy arrays.
+    The neighbors of flat index i are indices[offsets[i]:offsets[i + 1]].
+
+    Returns:
+      (offsets, indices) tuple of numpy arrays
+    """
+    offsets, indices, _ = self.neighbor_table().arrays()
+    return (offsets, indices)
+  def step(self, rule, counted=None):
+    """Advances the map one tick of a cellular automaton.
+    Every tile is evaluated against the map as it was before the tick, then all changes are written together.
+
+    Args:
+      rule: function of (content, count) giving the new content of a tile with count counted neighbors,
+        or a neighbor-count table as taken by automaton.table_rule
+      counted (function): takes neighbor content and says whether it counts, non-empty tiles by default
+
+    Returns:
+      list of the coordinates whose content changed
+    """
+    return Automaton(self, rule, counted).step()
+  def automaton(self, rule, counted=None, active=False):
+    """Creates a cellular automaton for repeated ticks, see step
+
+    Args:
+      rule: function of (content, count) or a neighbor-count table
+      counted (function): takes neighbor content and says whether it counts, non-empty tiles by default
+      active (bool): whether ticks after the first should only evaluate tiles next to changes
+
+    Returns:
+      Automaton whose step method advances the map
+    """
+    return Automaton(self, rule, counted, active)
+  def shared(self, workers=None):
+    """Copies the map into shared memory and starts worker processes that can read it
+
+    Args:
+      workers (int): the number of worker processes, one per core by default
+
+    Returns:
+      parallel.SharedMap, to be closed or used as a context manager
+
+    Raises:
+      ImportError when numpy is not available
+    """
+    return parallel.SharedMap(self, workers)
+  def parallel_map(self, fn, region_split=None, workers=None):
+    """Runs a function over regions of the map in parallel worker processes.
+    Each worker gets a read-only view of the map as it is now, backed by shared memory rather than a copy.
+
+    Args:
+      fn (function): picklable function of (view, region) returning a picklable result
+      region_split: the number of bands of whole storage rows to split the map into,
+        one per worker by default, or a list of (first_coor, last_coor) regions
+      workers (int): the number of worker processes, one per core by default
+
+    Returns:
+      list of the results, one per region in order
+
+    Raises:
+      ImportError when numpy is not available
+    """
+    with parallel.SharedMap(self, workers) as shared:
+      return shared.map(fn, region_split)
+  def label_components(self, key, incremental=False):
+    """Labels the connected components of the map, groups of adjacent tiles whose contents share a key
+
+    Args:
+      key (function): takes tile content and gives its key, None for tiles that belong to no component
+      incremental (bool): whether the labels should follow later changes to the map
+
+    Returns:
+      Components with per-tile labels, component sizes, borders and sides
+    """
+    return Components(self, key, incremental)
+  def distance_field(self, sources, passable=None, cost=None, incremental=False):
+    """Computes the distance from every tile to its nearest source with one multi-source search.
+    The distance of a tile is the total cost of the tiles entered on the cheapest way to a source.
+
+    Args:
+      sources (iterable): the coordinates to measure distance to
+      passable (function): takes tile content and says whether the tile can be entered, all tiles by default
+      cost (function): takes tile content and gives the non-negative cost to enter the tile, 1 by default
+      incremental (bool): whether the field should repair itself after later changes to the map
+
+    Returns:
+      DistanceField with per-tile distances and directions
+
+    Raises:
+      IndexError when any source is outside the map
+    """
+    return DistanceField(self, sources, passable, cost, incremental)
+  def flow_field(self, sources, passable=None, cost=None):
+    """Computes the direction of the best step toward the nearest source for every tile
+
+    Args:
+      sources (iterable): the coordinates to flow toward
+      passable (function): takes tile content and says whether the tile can be entered, all tiles by default
+      cost (function): takes tile content and gives the non-negative cost to enter the tile, 1 by default
+
+    Returns:
+      per-tile direction constants by flat index, -1 for sources and unreachable tiles;
+      a numpy array in the storage shape for array storage
+
+    Raises:
+      IndexError when any source is outside the map
+    """
+    return self.distance_field(sources, passable, cost).directions
+  def index_by(self, key):
+    """Starts a secondary index of the map's contents, replacing any earlier one.
+    Every non-empty tile is filed under key(content), and set, move and swap keep the index current.
+
+    Args:
+      key (function): takes tile content and gives a hashable key, e.g. lambda piece: (piece.name, piece.color)
+    """
+    self.drop_index()
+    self._content_index = ContentIndex(self, key)
+    self._add_observer(self._content_index)
+  def drop_index(self):
+    """Stops maintaining the secondary content index, if there is one"""
+    if self._content_index is not None:
+      self._remove_observer(self._content_index)
+      self._content_index = None
+  def coors_of(self, key_value):
+    """Gets the coordinates of all tiles whose content has the given key, in time proportional to the result
+
+    Args:
+      key_value: a value returned by the key function given to index_by
+
+    Returns:
+      list of coordinates
+
+    Raises:
+      ValueError when the map has no content index
+    """
+    return list(self._require_content_index().coors(key_value))
+  def find(self, key_value):
+    """Gets all tiles whose content has the given key, in time proportional to the result
+
+    Args:
+      key_value: a value returned by the key function given to index_by
+
+    Returns:
+      list of (coor, content) tuples
+
+    Raises:
+      ValueError when the map has no content index
+    """
+    return [(coor, self._get(coor)) for coor in self._require_content_index().coors(key_value)]
+  def _require_content_index(self):
+    if self._content_index is None:
+      raise ValueError('Map has no content index, call index_by first')
+    return self._content_index
+  def checkpoint(self):
+    """Marks the current state of the map so later changes can be undone back to it.
+    The first checkpoint starts a journal of every tile, tracking and property change.
+    Each change is kept as a small delta, so undoing N changes costs O(N), not O(map size).
+
+    Returns:
+      checkpoint token to pass to undo or redo
+    """
+    if self._journal is None:
+      self._journal = Journal(self)
+      self._add_observer(self._journal)
+    return self._journal.position
+  def undo(self, to_checkpoint):
+    """Reverts every change made since the given checkpoint, tracking and properties included.
+    Undone changes can be redone until the map is changed again.
+
+    Args:
+      to_checkpoint (int): token returned by checkpoint
+
+    Raises:
+      ValueError when there is no journal or the checkpoint is not behind the current state
+    """
+    self._require_journal().undo(to_checkpoint)
+  def redo(self, to_checkpoint=None):
+    """Reapplies changes reverted by undo
+
+    Args:
+      to_checkpoint (int): token returned by checkpoint, all undone changes by default
+
+    Raises:
+      ValueError when there is no journal or the checkpoint is not ahead of the current state
+    """
+    self._require_journal().redo(to_checkpoint)
+  def stop_journal(self):
+    """Stops recording changes and forgets all checkpoints"""
+    if self._journal is not None:
+      self._remove_observer(self._journal)
+      self._journal = None
+  def fork(self):
+    """Creates an independent copy of the map that shares storage with this one until either is written.
+    With list and chunked storage, rows, columns or chunks are copied one at a time on their first write after the fork,
+    so forking costs O(rows) rather than O(tiles).
+    Array, byte and bit storage keep the whole board in one buffer instead,
+    which each map copies in full, O(tiles), on its first write after the fork.
+    The fork gets its own copies of properties and tracking, and keeps Zobrist hashing,
+    but starts without other observers, content index, journal, change stream or stats.
+
+    Returns:
+      the forked map
+    """
+    fork = copy.copy(self)
+    fork.properties = dict(self.properties)
+    fork.tracking = dict(self.tracking)
+    fork._observers = ()
+    fork._content_index = None
+    fork._journal = None
+    fork._changes = None
+    if self._stats is not None:
+      fork.__class__ = plain_class(type(self))
+      fork._stats = None
+    if self._zobrist is not None:
+      fork._zobrist = self._zobrist.copy()
+      fork._observers = (fork._zobrist,)
+    self._share_storage(fork)
+    return fork
+  def save(self, path):
+    """Writes the map, its properties and tracking to a file in the tilemap binary format.
+    Load it again with factory.load_map.
+
+    Args:
+      path (str): the file to write
+
+    Raises:
+      ValueError when the map is unbounded
+    """
+    serialize.save(self, path)
+  def _require_journal(self):
+    if self._journal is None:
+      raise ValueError('Map has no journal, call checkpoint first')
+    return self._journal
+  def subscribe(self, observer):
+    """Registers an observer to be told of every later change.
+    After each write made through the map's methods, the observer's tile_changed, tracking_changed
+    and property_changed are called with the coordinate or name, the previous value and the new one.
+
+    Args:
+      observer (MapObserver): the observer to register
+    """
+    self._add_observer(observer)
+  def unsubscribe(self, observer):
+    """Stops telling an observer of changes
+
+    Args:
+      observer (MapObserver): an observer given to subscribe
+    """
+    self._remove_observer(observer)
+  def change_stream(self):
+    """Starts a new stream of this map's changes, for a consumer that drains its own batches.
+    Close the stream once it is no longer needed, so writes stop feeding it.
+
+    Returns:
+      ChangeStream collecting every later change
+    """
+    return ChangeStream(self)
+  def enable_changes(self):
+    """Starts collecting changes for drain_changes, coalesced per tile.
+    Consumers with their own pace should each use a change_stream instead.
+    """
+    if self._changes is None:
+      self._changes = ChangeStream(self)
+  def drain_changes(self):
+    """Gets the changes since enable_changes or the last drain, once per frame say, and starts a new batch.
+    Each changed tile appears once, with its content and tracking name before and after;
+    the dirty method of the batch gives the changed tiles as a bitmap.
+
+    Returns:
+      ChangeBatch of the net changes
+
+    Raises:
+      ValueError when changes are not being collected
+    """
+    if self._changes is None:
+      raise ValueError('Changes are not enabled, call enable_changes first')
+    return self._changes.drain()
+  def disable_changes(self):
+    """Stops collecting changes, forgetting the ones not yet drained"""
+    if self._changes is not None:
+      self._changes.close()
+      self._changes = None
+  def enable_zobrist(self, key=None, table=None):
+    """Starts keeping a 64-bit Zobrist hash of the map's tiles, readable as map.zobrist.
+    set, move, swap, the bulk writes and undo update it in O(1) per tile, and forks carry it along.
+    Maps compared by hash must share one ZobristTable.
+
+    Args:
+      key (function): takes tile content and gives the hashable value to hash, the content itself by default
+      table (ZobristTable): random values to hash with, a new table by default
+    """
+    self.disable_zobrist()
+    self._zobrist = ZobristHash(self, key, table)
+    self._add_observer(self._zobrist)
+  def disable_zobrist(self):
+    """Stops keeping the Zobrist hash"""
+    if self._zobrist is not None:
+      self._remove_observer(self._zobrist)
+      self._zobrist = None
+  @property
+  def zobrist(self):
+    """The current Zobrist hash of the map's tiles, or None when hashing is not enabled"""
+    if self._zobrist is None:
+      return None
+    return self._zobrist.value
+  def enable_stats(self):
+    """Starts counting calls and time spent in get, set, move, swap, adjacent, tiles and track,
+    along with failed bounds checks and tracked properties set to None because their content was overwritten.
+    The map switches to an instrumented subclass while stats are enabled, so disabled maps pay nothing.
+    Calls made by other methods count too, such as the tiles inside occupied_tiles.
+    """
+    if self._stats is None:
+      self._stats = new_stats()
+      self.__class__ = instrumented_class(type(self))
+  def disable_stats(self):
+    """Stops counting and drops the counters"""
+    if self._stats is not None:
+      self.__class__ = plain_class(type(self))
+      self._stats = None
+  def reset_stats(self):
+    """Sets every counter back to zero
+
+    Raises:
+      ValueError when stats are not enabled
+    """
+    self._require_stats()
+    self._stats = new_stats()
+  def stats(self):
+    """Gets a snapshot of the counters, a plain dict that later calls don't change
+
+    Returns:
+      dict from method name to {'calls': count, 'time': seconds}, plus bounds_failures and tracking_invalidations
+
+    Raises:
+      ValueError when stats are not enabled
+    """
+    return snapshot(self._require_stats())
+  def _require_stats(self):
+    if self._stats is None:
+      raise ValueError('Stats are not enabled')
+    return self._stats
   def track(self, coor, name):
     """Start tracking the given coordinate using the given name.
     A new property will be added to the map.properties dict with name as its key and coor as its value.
@@ -100,8 +976,8 @@ class Map:
       IndexError when the given coordinate is outside the map
     """
     self._require_coor(coor)
-    self.properties[name] = coor
-    self.tracking[coor] = name
+    self._set_property(name, coor)
+    self._set_tracking(coor, name)
   def move(self, start_coor, end_coor):
     """Moves the contents of the given start coordinate to the given end coordinate.
     Fills the start coordinate with empty and overwrites the contens of end coordinate.
@@ -122,15 +998,17 @@ class Map:
     self._set(start_coor, None)
     removed_content = self._get(end_coor)
     self._set(end_coor, content)
+    if self._observers:
+      self._tile_changed(start_coor, content, None)
+      self._tile_changed(end_coor, removed_content, content)
     if end_coor in self.tracking:
-      name = self.tracking[end_coor]
-      self.properties[name] = None
-      del self.tracking[end_coor]
+      self._set_property(self.tracking[end_coor], None)
+      self._set_tracking(end_coor, None)
     if start_coor in self.tracking:
       name = self.tracking[start_coor]
-      self.properties[name] = end_coor
-      del self.tracking[start_coor]
-      self.tracking[end_coor] = name
+      self._set_property(name, end_coor)
+      self._set_tracking(start_coor, None)
+      self._set_tracking(end_coor, name)
     return removed_content
   def swap(self, first_coor, second_coor):
     """Moves the contents of the given first coordinate to the given second coordinate and vice versa.
@@ -142,12 +1020,27 @@ class Map:
     Raises:
       IndexError when either coordinate is outside the map
     """
-    track = False
-    if second_coor in self.tracking:
-      track = True
-      name = self.tracking[second_coor]
-    content = self.move(first_coor, second_coor)
-    self._set(first_coor, content) 
-    if track:
-      self.properties[name] = first_coor
-      self.tracking[first_coor] = name
+    self._require_coor(first_coor)
+    self._require_coor(second_coor)
+    if first_coor == second_coor:
+      return
+    first_content = self._get(first_coor)
+    second_content = self._get(second_coor)
+    self._set(first_coor, second_content)
+    self._set(second_coor, first_content)
+    if self._observers:
+      self._tile_changed(first_coor, first_content, second_content)
+      self._tile_changed(second_coor, second_content, first_content)
+    if self.tracking:
+      first_name = self.tracking.get(first_coor)
+      second_name = self.tracking.get(second_coor)
+      if first_name is not None:
+        self._set_tracking(first_coor, None)
+      if second_name is not None:
+        self._set_tracking(second_coor, None)
+      if first_name is not None:
+        self._set_property(first_name, second_coor)
+        self._set_tracking(second_coor, first_name)
+      if second_name is not None:
+        self._set_property(second_name, first_coor)
+        self._set_tracking(first_coor, second_name)
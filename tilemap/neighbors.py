@@ -0,0 +1,99 @@
+from tilemap.storage import numpy
+
+class NeighborTable:
+  """Adjacency of every tile in a map, addressed by flat tile index.
+  The layout is CSR: the neighbors of tile i are indices[offsets[i]:offsets[i + 1]],
+  and directions holds the matching direction constant for each of them.
+  Flat indices follow the order of Map.tile_coors.
+  With numpy the three are memoryviews of the numpy arrays, which read as Python ints without a copy,
+  otherwise they are lists.
+  """
+  def __init__(self, offsets, indices, directions, direction_order):
+    self.offsets = offsets
+    self.indices = indices
+    self.directions = directions
+    self.direction_order = direction_order
+    self._arrays = None
+    self._padded = None
+  def __len__(self):
+    return len(self.offsets) - 1
+  def neighbors(self, index):
+    """Gets the flat indices of the tiles adjacent to the tile at the given flat index
+
+    Args:
+      index (int): flat index of the tile
+
+    Returns:
+      list of flat indices
+    """
+    return list(self.indices[self.offsets[index]:self.offsets[index + 1]])
+  def arrays(self):
+    """Gets the table as numpy arrays
+
+    Returns:
+      (offsets, indices, directions) tuple of numpy arrays
+    """
+    if self._arrays is None:
+      self._arrays = (numpy.array(self.offsets, dtype=numpy.intp),
+                      numpy.array(self.indices, dtype=numpy.intp),
+                      numpy.array(self.directions, dtype=numpy.int8))
+    return self._arrays
+  def padded(self):
+    """Gets the table as a (tiles, directions) numpy array with one column per entry of direction_order.
+    Missing neighbors hold the sentinel index len(self), so callers can gather from an array with one extra slot.
+
+    Returns:
+      numpy array of flat indices
+    """
+    if self._padded is None:
+      offsets, indices, directions = self.arrays()
+      count = len(self)
+      padded = numpy.full((count, len(self.direction_order)), count, dtype=numpy.intp)
+      columns = numpy.zeros(max(self.direction_order) + 1, dtype=numpy.intp)
+      columns[self.direction_order] = numpy.arange(len(self.direction_order))
+      rows = numpy.repeat(numpy.arange(count), numpy.diff(offsets))
+      padded[rows, columns[directions]] = indices
+      self._padded = padded
+    return self._padded
+
+def build_neighbor_table(tile_map):
+  """Builds the neighbor table for the given map, vectorized when numpy is available
+
+  Args:
+    tile_map (Map): a bounded map
+
+  Returns:
+    NeighborTable for the map's geometry
+  """
+  if numpy is not None:
+    return _build_with_numpy(tile_map)
+  offsets = [0]
+  indices = []
+  directions = []
+  for coor in tile_map.tile_coors():
+    for direction, shift in tile_map.direction_map.items():
+      new_coor = tile_map._shift_coor(coor, shift)
+      if tile_map.exists(new_coor):
+        indices.append(tile_map._index(new_coor))
+        directions.append(direction)
+    offsets.append(len(indices))
+  return NeighborTable(offsets, indices, directions, list(tile_map.direction_map))
+
+def _build_with_numpy(tile_map):
+  count = tile_map._tile_count()
+  coors = tile_map._coor_array(numpy.arange(count))
+  shifts = numpy.array(list(tile_map.direction_map.values())).reshape(len(tile_map.direction_map), -1)
+  padded = numpy.full((count, len(shifts)), -1, dtype=numpy.intp)
+  for column, shift in enumerate(shifts):
+    new_coors = coors + shift
+    valid = tile_map._exists_array(new_coors)
+    padded[valid, column] = tile_map._index_array(new_coors[valid])
+  present = padded > -1
+  offsets = numpy.zeros(count + 1, dtype=numpy.intp)
+  numpy.cumsum(present.sum(axis=1), out=offsets[1:])
+  directions = numpy.tile(numpy.array(list(tile_map.direction_map.keys()), dtype=numpy.int8), count)[present.ravel()]
+  indices = padded[present]
+  # the arrays stay as built, the table reads them through memoryviews rather than lists of ints
+  table = NeighborTable(memoryview(offsets), memoryview(indices), memoryview(directions), list(tile_map.direction_map))
+  table._arrays = (offsets, indices, directions)
+  return table
@@ -0,0 +1,13 @@
+# stands in for a property that did not exist before a change
+MISSING = object()
+
+class MapObserver:
+  """Base for objects that keep derived data in step with a map.
+  Observers are notified after every tile, tracking and property write made through the public mutation methods.
+  """
+  def tile_changed(self, coor, previous_content, content):
+    pass
+  def tracking_changed(self, coor, previous_name, name):
+    pass
+  def property_changed(self, name, previous_value, value):
+    pass
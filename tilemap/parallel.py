@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+from tilemap.storage import ArrayStorage, Palette, numpy
+
+# the read-only view of the shared map inside a worker process
+_view = None
+_memory = None
+
+class SharedMap:
+  """A read-only snapshot of a map in shared memory, with a pool of worker processes reading it.
+  The tile ids are copied into one shared block once; every worker maps that block instead of receiving a copy.
+  Workers see an array storage map of the same geometry whose tiles can be read but not written.
+  Later changes to the original map are not seen by the workers.
+  Use it as a context manager, or call close, to stop the workers and free the shared block.
+  """
+  def __init__(self, tile_map, workers=None):
+    if numpy is None:
+      raise ImportError('Parallel maps require numpy')
+    self.tile_map = tile_map
+    self.workers = workers or os.cpu_count()
+    ids, contents = _snapshot(tile_map)
+    self._memory = shared_memory.SharedMemory(create=True, size=max(ids.nbytes, 1))
+    numpy.ndarray(ids.shape, dtype=ids.dtype, buffer=self._memory.buf)[...] = ids
+    attributes = {name: getattr(tile_map, name) for name in ('metric',) if hasattr(tile_map, name)}
+    dimensions = (tile_map.length,) if tile_map._geometry_code == 0 else (tile_map.width, tile_map.height)
+    self._executor = ProcessPoolExecutor(self.workers, initializer=_attach,
+                                         initargs=(self._memory.name, ids.shape, ids.dtype.str, tile_map._geometry_code,
+                                                   dimensions, contents, dict(tile_map.properties),
+                                                   dict(tile_map.tracking), attributes))
+  def __enter__(self):
+    return self
+  def __exit__(self, *exc_info):
+    self.close()
+  def regions(self, region_split=None):
+    """Splits the map into bands of whole storage rows, columns for rect maps
+
+    Args:
+      region_split (int): the number of bands, one per worker by default
+
+    Returns:
+      list of (first_coor, last_coor) regions covering the map in tile_coors order
+    """
+    shape = self.tile_map._storage_shape()
+    count = self.workers if region_split is None else region_split
+    bands = max(min(count, shape[0]), 1)
+    band_size = self.tile_map._tile_count() // shape[0] if shape[0] else 0
+    coor = self.tile_map._coor
+    regions = []
+    for band in range(bands):
+      first = shape[0] * band // bands
+      last = shape[0] * (band + 1) // bands
+      if first < last and band_size:
+        regions.append((coor(first * band_size), coor(last * band_size - 1)))
+    return regions
+  def map(self, fn, region_split=None):
+    """Runs a function over regions of the map in the worker processes
+
+    Args:
+      fn (function): picklable function of (view, region), where view is the read-only map
+      region_split: the number of bands to split the map into, or a list of regions
+
+    Returns:
+      list of the results, one per region in order
+    """
+    regions = region_split if isinstance(region_split, (list, tuple)) else self.regions(region_split)
+    return list(self._executor.map(_call, repeat(fn), regions))
+  def map_items(self, fn, items, chunksize=1):
+    """Runs a function for each of the given items in the worker processes, like viewers or sources
+
+    Args:
+      fn (function): picklable function of (view, item)
+      items (iterable): picklable items to spread over the workers
+      chunksize (int): how many items to send to a worker at once
+
+    Returns:
+      list of the results, one per item in order
+    """
+    return list(self._executor.map(_call, repeat(fn), items, chunksize=chunksize))
+  def close(self):
+    """Stops the workers and frees the shared block"""
+    if self._executor is not None:
+      self._executor.shutdown()
+      self._executor = None
+      self._memory.close()
+      self._memory.unlink()
+
+def _snapshot(tile_map):
+  if isinstance(tile_map, ArrayStorage):
+    return tile_map.ids, list(tile_map.palette.contents)
+  palette = Palette()
+  ids = [palette.id_of(content) for _, content in tile_map.tiles()]
+  ids = numpy.array(ids, dtype=numpy.min_scalar_type(len(palette)))
+  return ids.reshape(tile_map._storage_shape()), palette.contents
+
+def _attach(name, shape, dtype, geometry_code, dimensions, contents, properties, tracking, attributes):
+  global _view, _memory
+  # factory imports map, which imports this module
+  from tilemap.factory import _SAVED_CLASSES
+  _memory = shared_memory.SharedMemory(name=name)
+  ids = numpy.ndarray(shape, dtype=dtype, buffer=_memory.buf)
+  ids.flags.writeable = False
+  view = _SAVED_CLASSES[geometry_code][1](*dimensions)
+  view.palette = Palette(contents)
+  view._attach_ids(ids)
+  view.properties.update(properties)
+  view.tracking.update(tracking)
+  for attribute, value in attributes.items():
+    setattr(view, attribute, value)
+  _view = view
+
+def _call(fn, argument):
+  return fn(_view, argument)
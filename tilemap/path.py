@@ -0,0 +1,183 @@
+from collections import deque
+from heapq import heappop, heappush
+from tilemap.constants import RECT_DIRECTION_MAP, HEX_DIRECTION_MAP
+
+def manhattan_distance(first_coor, second_coor):
+  return abs(first_coor[0] - second_coor[0]) + abs(first_coor[1] - second_coor[1])
+
+def chebyshev_distance(first_coor, second_coor):
+  return max(abs(first_coor[0] - second_coor[0]), abs(first_coor[1] - second_coor[1]))
+
+def hex_distance(first_coor, second_coor):
+  # cube distance, with the third cube coordinate implied by the axial pair
+  dq = first_coor[0] - second_coor[0]
+  dr = first_coor[1] - second_coor[1]
+  return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+def line_distance(first_coor, second_coor):
+  return abs(first_coor - second_coor)
+
+def default_heuristic(tile_map):
+  """Gets the admissible distance heuristic for the geometry of the given map
+
+  Args:
+    tile_map (Map): the map to search
+
+  Returns:
+    function of (first_coor, second_coor) giving the fewest steps between them
+  """
+  if tile_map.direction_map is RECT_DIRECTION_MAP:
+    return manhattan_distance
+  if tile_map.direction_map is HEX_DIRECTION_MAP:
+    return hex_distance
+  return line_distance
+
+def astar(tile_map, start, goal, passable=None, cost=None, heuristic=None):
+  """Finds the cheapest path between two tiles with A* search.
+  The start tile is never tested for passability, so a piece can path away from where it stands.
+  The default heuristic is admissible as long as every step costs at least 1.
+
+  Args:
+    tile_map (Map): the map to search
+    start (tuple): the coordinate to start from
+    goal (tuple): the coordinate to reach
+    passable (function): takes tile content and says whether the tile can be entered, all tiles by default
+    cost (function): takes tile content and gives the cost to enter the tile, 1 by default
+    heuristic (function): takes two coordinates and estimates the cost between them, the geometry's distance by default
+
+  Returns:
+    list of coordinates from start to goal inclusive, or None when the goal can't be reached
+
+  Raises:
+    IndexError when either coordinate is outside the map
+  """
+  tile_map._require_coor(start)
+  tile_map._require_coor(goal)
+  goal_index = tile_map._index(goal)
+  estimate = _index_heuristic(tile_map, heuristic, goal)
+  return _best_first(tile_map, tile_map._index(start), goal_index, passable, cost, estimate)
+
+def dijkstra(tile_map, start, goal, passable=None, cost=None):
+  """Finds the cheapest path between two tiles with Dijkstra's algorithm.
+  This is A* without a heuristic, useful when costs can be below 1.
+
+  Args:
+    tile_map (Map): the map to search
+    start (tuple): the coordinate to start from
+    goal (tuple): the coordinate to reach
+    passable (function): takes tile content and says whether the tile can be entered, all tiles by default
+    cost (function): takes tile content and gives the non-negative cost to enter the tile, 1 by default
+
+  Returns:
+    list of coordinates from start to goal inclusive, or None when the goal can't be reached
+
+  Raises:
+    IndexError when either coordinate is outside the map
+  """
+  tile_map._require_coor(start)
+  tile_map._require_coor(goal)
+  return _best_first(tile_map, tile_map._index(start), tile_map._index(goal), passable, cost, None)
+
+def bfs(tile_map, start, goal, passable=None):
+  """Finds the path with the fewest steps between two tiles with breadth-first search
+
+  Args:
+    tile_map (Map): the map to search
+    start (tuple): the coordinate to start from
+    goal (tuple): the coordinate to reach
+    passable (function): takes tile content and says whether the tile can be entered, all tiles by default
+
+  Returns:
+    list of coordinates from start to goal inclusive, or None when the goal can't be reached
+
+  Raises:
+    IndexError when either coordinate is outside the map
+  """
+  tile_map._require_coor(start)
+  tile_map._require_coor(goal)
+  table = tile_map.neighbor_table()
+  offsets = table.offsets
+  indices = table.indices
+  get = tile_map._get_index
+  start_index = tile_map._index(start)
+  goal_index = tile_map._index(goal)
+  came_from = {start_index: -1}
+  frontier = deque((start_index,))
+  while frontier:
+    index = frontier.popleft()
+    if index == goal_index:
+      return _walk_back(tile_map, came_from, goal_index)
+    for position in range(offsets[index], offsets[index + 1]):
+      neighbor = indices[position]
+      if neighbor in came_from:
+        continue
+      if passable is not None and not passable(get(neighbor)):
+        continue
+      came_from[neighbor] = index
+      frontier.append(neighbor)
+  return None
+
+def _best_first(tile_map, start_index, goal_index, passable, cost, estimate):
+  # works on flat indices so the inner loop allocates no coordinates
+  table = tile_map.neighbor_table()
+  offsets = table.offsets
+  indices = table.indices
+  get = tile_map._get_index
+  best = {start_index: 0}
+  came_from = {start_index: -1}
+  closed = set()
+  open_set = [(0, start_index)]
+  while open_set:
+    _, index = heappop(open_set)
+    if index in closed:
+      continue
+    if index == goal_index:
+      return _walk_back(tile_map, came_from, goal_index)
+    closed.add(index)
+    distance = best[index]
+    for position in range(offsets[index], offsets[index + 1]):
+      neighbor = indices[position]
+      if neighbor in closed:
+        continue
+      if passable is None and cost is None:
+        new_distance = distance + 1
+      else:
+        content = get(neighbor)
+        if passable is not None and not passable(content):
+          continue
+        new_distance = distance + (1 if cost is None else cost(content))
+      if neighbor not in best or new_distance < best[neighbor]:
+        best[neighbor] = new_distance
+        came_from[neighbor] = index
+        priority = new_distance if estimate is None else new_distance + estimate(neighbor)
+        heappush(open_set, (priority, neighbor))
+  return None
+
+def _walk_back(tile_map, came_from, goal_index):
+  path = []
+  index = goal_index
+  while index != -1:
+    path.append(tile_map._coor(index))
+    index = came_from[index]
+  path.reverse()
+  return path
+
+def _index_heuristic(tile_map, heuristic, goal):
+  # estimates straight from flat indices for the built-in geometries
+  if heuristic is not None:
+    coor = tile_map._coor
+    return lambda index: heuristic(coor(index), goal)
+  if tile_map.direction_map is RECT_DIRECTION_MAP:
+    height = tile_map.height
+    goal_x, goal_y = goal
+    return lambda index: abs(index // height - goal_x) + abs(index % height - goal_y)
+  if tile_map.direction_map is HEX_DIRECTION_MAP:
+    width = tile_map.width
+    goal_q, goal_r = goal
+    def estimate(index):
+      r = index // width
+      dq = index % width - (r + 1) // 2 - goal_q
+      dr = r - goal_r
+      return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+    return estimate
+  return lambda index: abs(index - goal)
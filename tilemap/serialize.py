@@ -0,0 +1,98 @@
+import array
+import pickle
+import struct
+import sys
+from tilemap.storage import ArrayStorage, Palette, numpy
+
+MAGIC = b'TILEMAP\0'
+VERSION = 1
+# magic, version, geometry, id item size, width, height, metadata length, id array offset
+_HEADER = struct.Struct('<8sHBBqqQQ')
+_ALIGNMENT = 64
+_TYPECODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+def save(tile_map, path):
+  """Writes a bounded map to a file in the tilemap binary format.
+  The file holds a fixed header, a pickled palette with properties, tracking and attributes such as the metric,
+  and the tile ids as one aligned little-endian array in storage order.
+
+  Args:
+    tile_map (Map): the map to save, with hashable and picklable contents
+    path (str): the file to write
+
+  Raises:
+    ValueError when the map is unbounded
+  """
+  if not tile_map._bounded():
+    raise ValueError('Unbounded maps have no fixed size')
+  if numpy is not None and isinstance(tile_map, ArrayStorage):
+    palette = tile_map.palette
+    ids = tile_map._flat_ids
+    item_size = ids.dtype.itemsize
+    id_bytes = ids.astype('<u{}'.format(item_size), copy=False).tobytes()
+  else:
+    palette = Palette()
+    ids = [palette.id_of(content) for _, content in tile_map.tiles()]
+    item_size = next(size for size in sorted(_TYPECODES) if len(palette) <= 1 << (8 * size))
+    packed = array.array(_TYPECODES[item_size], ids)
+    if sys.byteorder == 'big':
+      packed.byteswap()
+    id_bytes = packed.tobytes()
+  # per-map settings such as a rect map's metric, which change how the tiles are measured
+  attributes = {name: getattr(tile_map, name) for name in ('metric',) if hasattr(tile_map, name)}
+  metadata = pickle.dumps({'palette': palette.contents, 'properties': tile_map.properties,
+                           'tracking': tile_map.tracking, 'attributes': attributes})
+  width, height = _dimensions(tile_map)
+  offset = _HEADER.size + len(metadata)
+  offset += -offset % _ALIGNMENT
+  header = _HEADER.pack(MAGIC, VERSION, tile_map._geometry_code, item_size, width, height, len(metadata), offset)
+  with open(path, 'wb') as stream:
+    stream.write(header)
+    stream.write(metadata)
+    stream.write(b'\0' * (offset - _HEADER.size - len(metadata)))
+    stream.write(id_bytes)
+
+def read(path, mmap=True):
+  """Reads a file in the tilemap binary format
+
+  Args:
+    path (str): the file to read
+    mmap (bool): whether to map the id array into memory instead of reading it, needs numpy
+
+  Returns:
+    dict with geometry, width, height, ids, palette, properties, tracking and attributes;
+    ids is a numpy array when numpy is available, otherwise a list
+
+  Raises:
+    ValueError when the file is not in the tilemap binary format
+  """
+  with open(path, 'rb') as stream:
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size or not header.startswith(MAGIC):
+      raise ValueError('{} is not a tilemap file'.format(path))
+    _, version, geometry, item_size, width, height, metadata_length, offset = _HEADER.unpack(header)
+    if version != VERSION:
+      raise ValueError('Unsupported tilemap file version {}'.format(version))
+    metadata = pickle.loads(stream.read(metadata_length))
+    count = width if geometry == 0 else width * height
+    if numpy is not None:
+      dtype = numpy.dtype('<u{}'.format(item_size))
+      if mmap and count:
+        ids = numpy.memmap(path, dtype=dtype, mode='c', offset=offset, shape=(count,))
+      else:
+        stream.seek(offset)
+        ids = numpy.fromfile(stream, dtype=dtype, count=count)
+    else:
+      stream.seek(offset)
+      packed = array.array(_TYPECODES[item_size])
+      packed.frombytes(stream.read(count * item_size))
+      if sys.byteorder == 'big':
+        packed.byteswap()
+      ids = packed.tolist()
+  metadata.update(geometry=geometry, width=width, height=height, ids=ids)
+  return metadata
+
+def _dimensions(tile_map):
+  if tile_map._geometry_code == 0:
+    return (tile_map.length, 0)
+  return (tile_map.width, tile_map.height)
@@ -0,0 +1,110 @@
+from time import perf_counter
+
+TIMED_METHODS = ('get', 'set', 'move', 'swap', 'track')
+TIMED_GENERATORS = ('adjacent', 'tiles')
+
+_INSTRUMENTED = {}
+
+def new_stats():
+  """Creates empty counters for every instrumented method
+
+  Returns:
+    dict with calls and time per method, bounds_failures and tracking_invalidations
+  """
+  methods = TIMED_METHODS + TIMED_GENERATORS
+  return {'calls': dict.fromkeys(methods, 0), 'time': dict.fromkeys(methods, 0.0),
+          'bounds_failures': 0, 'tracking_invalidations': 0}
+
+def snapshot(stats):
+  """Copies counters into a plain dict, ready for json.dumps
+
+  Returns:
+    dict from method name to its calls and cumulative time in seconds, plus bounds_failures and tracking_invalidations
+  """
+  result = {name: {'calls': calls, 'time': stats['time'][name]} for name, calls in stats['calls'].items()}
+  result['bounds_failures'] = stats['bounds_failures']
+  result['tracking_invalidations'] = stats['tracking_invalidations']
+  return result
+
+def instrumented_class(cls):
+  """Gets the subclass of a map class whose public methods count calls and time.
+  Maps switch to it while stats are enabled, so the plain class never pays for the counters.
+
+  Args:
+    cls (type): a map class
+
+  Returns:
+    the instrumented subclass, created once per class
+  """
+  if cls in _INSTRUMENTED.values():
+    return cls
+  subclass = _INSTRUMENTED.get(cls)
+  if subclass is None:
+    namespace = {name: _timed(name, getattr(cls, name)) for name in TIMED_METHODS}
+    namespace.update((name, _timed_generator(name, getattr(cls, name))) for name in TIMED_GENERATORS)
+    namespace.update((name, _counted_failures(getattr(cls, name))) for name in ('_require_coor', '_require_index'))
+    namespace['_set_property'] = _counted_invalidations(cls._set_property)
+    # no instance layout of its own, so maps can switch to the subclass and back
+    namespace['__slots__'] = ()
+    namespace['__module__'] = cls.__module__
+    namespace['__qualname__'] = cls.__qualname__
+    subclass = type(cls.__name__, (cls,), namespace)
+    _INSTRUMENTED[cls] = subclass
+  return subclass
+
+def plain_class(cls):
+  """Gets the map class an instrumented class wraps, or the class itself"""
+  for plain, subclass in _INSTRUMENTED.items():
+    if subclass is cls:
+      return plain
+  return cls
+
+def _timed(name, method):
+  def timed(self, *args, **kwargs):
+    stats = self._stats
+    stats['calls'][name] += 1
+    start = perf_counter()
+    try:
+      return method(self, *args, **kwargs)
+    finally:
+      stats['time'][name] += perf_counter() - start
+  timed.__doc__ = method.__doc__
+  return timed
+
+def _timed_generator(name, method):
+  # only the time spent producing items counts, not the caller's time between them
+  def timed(self, *args, **kwargs):
+    stats = self._stats
+    stats['calls'][name] += 1
+    times = stats['time']
+    start = perf_counter()
+    items = method(self, *args, **kwargs)
+    times[name] += perf_counter() - start
+    while True:
+      start = perf_counter()
+      try:
+        item = next(items)
+      except StopIteration:
+        times[name] += perf_counter() - start
+        return
+      times[name] += perf_counter() - start
+      yield item
+  timed.__doc__ = method.__doc__
+  return timed
+
+def _counted_failures(method):
+  def counted(self, *args):
+    try:
+      return method(self, *args)
+    except IndexError:
+      self._stats['bounds_failures'] += 1
+      raise
+  return counted
+
+def _counted_invalidations(method):
+  # tracked content that is overwritten or removed has its property set to None
+  def counted(self, name, value):
+    if value is None and self.properties.get(name) is not None:
+      self._stats['tracking_invalidations'] += 1
+    return method(self, name, value)
+  return counted
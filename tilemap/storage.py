@@ -0,0 +1,441 @@
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+class Palette:
+  """Two-way mapping between tile contents and the integer ids kept in an id array.
+  Id 0 is always the empty tile (None). Contents must be hashable, and equal contents of the same type share one id,
+  so True, 1 and 1.0 keep ids of their own while equal but distinct objects read back as the first one stored.
+  Ids are never reused, so the palette only grows.
+  """
+  def __init__(self, contents=None):
+    self.contents = [None] if contents is None else list(contents)
+    self.ids = {(type(content), content): tile_id for tile_id, content in enumerate(self.contents)}
+  def __len__(self):
+    return len(self.contents)
+  def id_of(self, content):
+    """Gets the id for the given content, adding it to the palette if needed
+
+    Args:
+      content: tile content, must be hashable
+
+    Returns:
+      integer id of the content
+    """
+    key = (type(content), content)
+    tile_id = self.ids.get(key)
+    if tile_id is None:
+      tile_id = len(self.contents)
+      self.contents.append(content)
+      self.ids[key] = tile_id
+    return tile_id
+
+_ID_DTYPES = ('uint8', 'uint16', 'uint32', 'uint64')
+
+class ArrayStorage:
+  """Mixin storing tile contents as palette ids in one contiguous numpy array.
+  It must come before the geometry class in the bases. The geometry supplies _storage_shape and _index.
+  The id array starts as uint8 and widens when the palette outgrows it.
+  The mixin has no instance layout of its own, a concrete map class lists _storage_slots in its __slots__.
+  """
+  __slots__ = ()
+  _storage_slots = ('palette', 'ids', '_flat_ids', '_max_id')
+  def _create_storage(self):
+    if numpy is None:
+      raise ImportError('Array storage requires numpy')
+    self.palette = Palette()
+    self._attach_ids(numpy.zeros(self._storage_shape(), dtype=_ID_DTYPES[0]))
+  def __getstate__(self):
+    # the flat view is taken again from the id array after loading, a pickled view would be a copy
+    state = super().__getstate__()
+    del state[1]['_flat_ids']
+    return state
+  def __setstate__(self, state):
+    super().__setstate__(state)
+    self._flat_ids = self.ids.reshape(-1)
+  def _share_storage(self, fork):
+    # the id array is shared until either map writes, the append-only palette stays shared
+    self._owned = set()
+    fork._owned = set()
+  def _attach_ids(self, ids):
+    self.ids = ids
+    self._flat_ids = ids.reshape(-1)
+    self._max_id = numpy.iinfo(ids.dtype).max
+    self._owned = None
+  def _own_ids(self):
+    if self._owned is not None:
+      self._attach_ids(self.ids.copy())
+  def _id_of(self, content):
+    tile_id = self.palette.id_of(content)
+    if tile_id > self._max_id:
+      self._widen_ids(tile_id)
+    return tile_id
+  def _widen_ids(self, tile_id):
+    for dtype in _ID_DTYPES:
+      if numpy.iinfo(dtype).max >= tile_id:
+        self._attach_ids(self.ids.astype(dtype))
+        return
+  def _get(self, coor):
+    # internal get assumes that coor is valid
+    return self.palette.contents[self._flat_ids[self._index(coor)]]
+  def _set(self, coor, content):
+    # internal set assumes that coor is valid
+    tile_id = self._id_of(content)
+    if self._owned is not None:
+      self._own_ids()
+    self._flat_ids[self._index(coor)] = tile_id
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return self.palette.contents[self._flat_ids[index]]
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    tile_id = self._id_of(content)
+    if self._owned is not None:
+      self._own_ids()
+    self._flat_ids[index] = tile_id
+  def _indices(self, coors):
+    # one _index call per coordinate is cheaper than numpy.asarray over a list of tuples
+    return numpy.fromiter(map(self._index, coors), dtype=numpy.intp, count=len(coors))
+  def _require_indices(self, coors):
+    self._require_coors(coors)
+    return self._indices(coors)
+  def get_many(self, coors):
+    """Gets the contents of the tiles at the given coordinates.
+    All coordinates are validated before any tile is read.
+
+    Args:
+      coors (iterable): the coordinates of the tiles
+
+    Returns:
+      list of tile contents, in the same order as coors
+
+    Raises:
+      IndexError when any of the given coordinates is outside the map
+    """
+    indices = self._require_indices(list(coors))
+    contents = self.palette.contents
+    return [contents[tile_id] for tile_id in self._flat_ids[indices].tolist()]
+  def _set_many(self, coors, contents):
+    # internal set_many assumes that all coors are valid
+    indices = self._indices(coors)
+    # contents repeat, so each distinct object is looked up in the palette once
+    distinct = {id(content): content for content in contents}
+    ids = {key: self._id_of(content) for key, content in distinct.items()}
+    new_ids = numpy.fromiter(map(ids.__getitem__, map(id, contents)), dtype=numpy.intp, count=len(contents))
+    self._own_ids()
+    flat_ids = self._flat_ids
+    # a tile given more than once is written in order: its later writes report the content the earlier ones left,
+    # and only its last write lands, so each group of equal indices is found by a stable sort
+    order = numpy.argsort(indices, kind='stable')
+    sorted_indices = indices[order]
+    sorted_ids = new_ids[order]
+    first = numpy.ones(len(indices), dtype=bool)
+    first[1:] = sorted_indices[1:] != sorted_indices[:-1]
+    last = numpy.ones(len(indices), dtype=bool)
+    last[:-1] = first[1:]
+    previous_ids = numpy.empty(len(indices), dtype=numpy.intp)
+    previous_ids[order] = numpy.where(first, flat_ids[sorted_indices], numpy.roll(sorted_ids, 1))
+    flat_ids[sorted_indices[last]] = sorted_ids[last]
+    return list(map(self.palette.contents.__getitem__, previous_ids.tolist()))
+  def _fill(self, region, content):
+    # internal fill assumes that region is valid
+    tile_id = self._id_of(content)
+    self._own_ids()
+    self.ids[self._region_slices(region)] = tile_id
+  def tiles(self, region=None, where=None, skip_empty=False):
+    """Traverses the map, getting all tiles within.
+    Filtering happens on the id array, so excluded tiles never become tuples.
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for fill
+      where (function): optional filter, takes tile content and says whether to include the tile
+      skip_empty (bool): whether to leave out empty tiles, where is then never given None
+
+    Returns:
+      generator of (coor, content) tuples for all included tiles
+    """
+    for coors, contents in self.tile_blocks(region, where, skip_empty, 1 << 16):
+      yield from zip(coors, contents)
+  def tile_blocks(self, region=None, where=None, skip_empty=False, size=4096):
+    """Traverses the map like tiles, but in blocks rather than one tuple per tile.
+    where is called once per palette entry rather than once per tile.
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for fill
+      where (function): optional filter, takes tile content and says whether to include the tile
+      skip_empty (bool): whether to leave out empty tiles
+      size (int): the most tiles in one block
+
+    Returns:
+      generator of (coors, contents) tuples of equally long lists
+    """
+    slices = self._region_bounds(region)
+    region_shape = tuple(bounds.stop - bounds.start for bounds in slices)
+    region_ids = self.ids[slices].reshape(-1)
+    contents = self.palette.contents
+    keep = None
+    if where is not None or skip_empty:
+      keep = numpy.array([not (skip_empty and content is None) and (where is None or bool(where(content)))
+                          for content in contents], dtype=bool)
+    shape = self._storage_shape()
+    for start in range(0, region_ids.size, size):
+      block = region_ids[start:start + size]
+      positions = numpy.arange(start, start + block.size)
+      if keep is not None:
+        selected = keep[block]
+        block = block[selected]
+        positions = positions[selected]
+        if not block.size:
+          continue
+      keys = numpy.unravel_index(positions, region_shape)
+      indices = numpy.ravel_multi_index([key + bounds.start for key, bounds in zip(keys, slices)], shape)
+      yield (self._coor_list(self._coor_array(indices)), [contents[tile_id] for tile_id in block.tolist()])
+  def _tile_flags(self, where):
+    # where is called once per palette entry rather than once per tile
+    keep = numpy.array([bool(where(content)) for content in self.palette.contents], dtype=numpy.uint8)
+    return keep[self._flat_ids].tobytes()
+  def _coor_list(self, coor_array):
+    if coor_array.shape[1] == 1:
+      return coor_array[:, 0].tolist()
+    return list(zip(*(coor_array[:, axis].tolist() for axis in range(coor_array.shape[1]))))
+
+class ChunkStorage:
+  """Mixin storing tiles in fixed-size square chunks kept in a dict by chunk coordinate.
+  It must come before a two-dimensional geometry class in the bases.
+  A chunk is allocated on its first non-empty write and freed when its last tile is emptied.
+  Without a width and height the map is unbounded, and every coordinate exists.
+  The mixin has no instance layout of its own, a concrete map class lists _storage_slots in its __slots__.
+  """
+  __slots__ = ()
+  _storage_slots = ('chunk_size', 'chunks', '_chunk_counts')
+  def __init__(self, width=None, height=None, chunk_size=64):
+    self.chunk_size = chunk_size
+    super().__init__(width, height)
+  def _create_storage(self):
+    self.chunks = {}
+    self._chunk_counts = {}
+    self._owned = None
+  def _share_storage(self, fork):
+    # chunks are shared until each map first writes to them
+    fork.chunks = dict(self.chunks)
+    fork._chunk_counts = dict(self._chunk_counts)
+    self._owned = set()
+    fork._owned = set()
+  def _bounded(self):
+    return self.width is not None
+  def _storage_shape(self):
+    if not self._bounded():
+      raise ValueError('Unbounded maps have no fixed size')
+    return super()._storage_shape()
+  def _tile_count(self):
+    if not self._bounded():
+      raise ValueError('Unbounded maps have no fixed size')
+    return super()._tile_count()
+  def exists(self, coor):
+    if self._bounded():
+      return super().exists(coor)
+    return True
+  def _exists_array(self, coors):
+    if self._bounded():
+      return super()._exists_array(coors)
+    return numpy.ones(len(coors), dtype=bool)
+  def _locate(self, coor):
+    a, b = coor
+    size = self.chunk_size
+    return (a // size, b // size), (a % size) * size + b % size
+  def _get(self, coor):
+    # internal get assumes that coor is valid
+    key, position = self._locate(coor)
+    chunk = self.chunks.get(key)
+    if chunk is None:
+      return None
+    return chunk[position]
+  def _set(self, coor, content):
+    # internal set assumes that coor is valid
+    key, position = self._locate(coor)
+    chunk = self.chunks.get(key)
+    if chunk is None:
+      if content is None:
+        return
+      chunk = [None] * (self.chunk_size * self.chunk_size)
+      self.chunks[key] = chunk
+      self._chunk_counts[key] = 0
+      if self._owned is not None:
+        self._owned.add(key)
+    elif self._owned is not None and key not in self._owned:
+      chunk = list(chunk)
+      self.chunks[key] = chunk
+      self._owned.add(key)
+    if chunk[position] is None:
+      if content is None:
+        return
+      self._chunk_counts[key] += 1
+    elif content is None:
+      self._chunk_counts[key] -= 1
+      if not self._chunk_counts[key]:
+        del self.chunks[key]
+        del self._chunk_counts[key]
+        return
+    chunk[position] = content
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return self._get(self._coor(index))
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    self._set(self._coor(index), content)
+  def _chunk_coors(self, key):
+    size = self.chunk_size
+    first_a = key[0] * size
+    first_b = key[1] * size
+    for a in range(first_a, first_a + size):
+      for b in range(first_b, first_b + size):
+        yield (a, b)
+  def _region_bounds(self, region):
+    if self._bounded():
+      return super()._region_bounds(region)
+    return self._region_slices(region)
+  def _tile_coors(self, region=None):
+    if region is not None or self._bounded():
+      yield from super()._tile_coors(region)
+      return
+    for key in list(self.chunks):
+      yield from self._chunk_coors(key)
+  def _side_coors(self):
+    if self._bounded():
+      yield from super()._side_coors()
+  def tiles(self, region=None, where=None, skip_empty=False):
+    """Traverses the map, getting all tiles within.
+    With skip_empty only the allocated chunks are visited.
+
+    Args:
+      region (tuple): optional (first_coor, last_coor) corners, as for fill
+      where (function): optional filter, takes tile content and says whether to include the tile
+      skip_empty (bool): whether to leave out empty tiles, where is then never given None
+
+    Returns:
+      generator of (coor, content) tuples for all included tiles,
+      chunk by chunk rather than in tile_coors order with skip_empty
+    """
+    if not skip_empty:
+      yield from super().tiles(region, where)
+      return
+    slices = None if region is None else self._region_bounds(region)
+    for key, chunk in list(self.chunks.items()):
+      for coor, content in zip(self._chunk_coors(key), chunk):
+        if content is None:
+          continue
+        if slices is not None and not self._in_region(coor, slices):
+          continue
+        if where is not None and not where(content):
+          continue
+        yield (coor, content)
+
+class ByteStorage:
+  """Mixin storing small integer contents, one byte per tile in a bytearray by flat index.
+  It must come before the geometry class in the bases, and needs no numpy.
+  Contents are integers from 0 to 255, not bools; like id 0 of an id array, 0 is the empty tile and reads as None.
+  The mixin has no instance layout of its own, a concrete map class lists _storage_slots in its __slots__.
+  """
+  __slots__ = ()
+  _storage_slots = ('values',)
+  def _create_storage(self):
+    self.values = bytearray(self._tile_count())
+    self._owned = None
+  def _share_storage(self, fork):
+    # the bytes are shared until either map writes
+    self._owned = set()
+    fork._owned = set()
+  def _own_values(self):
+    self.values = bytearray(self.values)
+    self._owned = None
+  def _byte_of(self, content):
+    if content is None:
+      return 0
+    if isinstance(content, bool) or not isinstance(content, int) or not 0 <= content <= 255:
+      raise ValueError('Byte storage holds integers from 0 to 255, not {}'.format(content))
+    return content
+  def _stored(self, content):
+    # 0 is stored as the empty tile
+    return self._byte_of(content) or None
+  def _get(self, coor):
+    # internal get assumes that coor is valid
+    return self.values[self._index(coor)] or None
+  def _set(self, coor, content):
+    # internal set assumes that coor is valid
+    self._set_index(self._index(coor), content)
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return self.values[index] or None
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    value = self._byte_of(content)
+    if self._owned is not None:
+      self._own_values()
+    self.values[index] = value
+  def _tile_flags(self, where):
+    # where is called once per possible byte rather than once per tile
+    return self.values.translate(bytes(bool(where(value or None)) for value in range(256)))
+  def _set_many(self, coors, contents):
+    # internal set_many assumes that all coors are valid, contents are checked before any tile is written
+    values = [self._byte_of(content) for content in contents]
+    if self._owned is not None:
+      self._own_values()
+    previous_contents = []
+    for coor, value in zip(coors, values):
+      index = self._index(coor)
+      previous_contents.append(self.values[index] or None)
+      self.values[index] = value
+    return previous_contents
+
+class BitStorage:
+  """Mixin storing one flag per tile, packed eight tiles to a byte in a bytearray by flat index.
+  It must come before the geometry class in the bases, and needs no numpy.
+  Any true content sets the flag and reads back as True; false contents clear it, and a clear flag reads as None.
+  The mixin has no instance layout of its own, a concrete map class lists _storage_slots in its __slots__.
+  """
+  __slots__ = ()
+  _storage_slots = ('bits',)
+  def _create_storage(self):
+    self.bits = bytearray((self._tile_count() + 7) // 8)
+    self._owned = None
+  def _share_storage(self, fork):
+    # the bits are shared until either map writes
+    self._owned = set()
+    fork._owned = set()
+  def _own_bits(self):
+    self.bits = bytearray(self.bits)
+    self._owned = None
+  def _stored(self, content):
+    return True if content else None
+  def _get(self, coor):
+    # internal get assumes that coor is valid
+    return self._get_index(self._index(coor))
+  def _set(self, coor, content):
+    # internal set assumes that coor is valid
+    self._set_index(self._index(coor), content)
+  def _get_index(self, index):
+    # internal get assumes that index is valid
+    return True if self.bits[index >> 3] >> (index & 7) & 1 else None
+  def _set_index(self, index, content):
+    # internal set assumes that index is valid
+    if self._owned is not None:
+      self._own_bits()
+    if content:
+      self.bits[index >> 3] |= 1 << (index & 7)
+    else:
+      self.bits[index >> 3] &= 255 ^ 1 << (index & 7)
+  def _tile_bits(self, where):
+    # the packed flags already are a bitboard, where only needs to see a set and a clear flag
+    bits = int.from_bytes(self.bits, 'little')
+    result = bits if where(True) else 0
+    if where(None):
+      result |= bits ^ (1 << self._tile_count()) - 1
+    return result
+  def count(self):
+    """Counts the tiles whose flag is set
+
+    Returns:
+      number of set flags
+    """
+    return bin(int.from_bytes(self.bits, 'little')).count('1')
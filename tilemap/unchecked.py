@@ -0,0 +1,38 @@
+_UNCHECKED = {}
+
+def _skip(self, *args):
+  pass
+
+def unchecked_class(cls):
+  """Gets the subclass of a map class that skips every bounds check.
+  Maps switch to it inside Map.unchecked, so checked maps never pay for the switch.
+
+  Args:
+    cls (type): a map class
+
+  Returns:
+    the unchecked subclass, created once per class
+  """
+  if cls in _UNCHECKED.values():
+    return cls
+  subclass = _UNCHECKED.get(cls)
+  if subclass is None:
+    namespace = {name: _skip for name in ('_require_coor', '_require_coors', '_require_index', '_require_region')}
+    # the public reads become the internal ones outright
+    namespace.update(get=cls._get, get_index=cls._get_index, index_of=cls._index, coor_of=cls._coor)
+    if hasattr(cls, '_require_indices'):
+      namespace['_require_indices'] = cls._indices
+    # no instance layout of its own, so maps can switch to the subclass and back
+    namespace['__slots__'] = ()
+    namespace['__module__'] = cls.__module__
+    namespace['__qualname__'] = cls.__qualname__
+    subclass = type(cls.__name__, (cls,), namespace)
+    _UNCHECKED[cls] = subclass
+  return subclass
+
+def checked_class(cls):
+  """Gets the map class an unchecked class wraps, or the class itself"""
+  for checked, subclass in _UNCHECKED.items():
+    if subclass is cls:
+      return checked
+  return cls
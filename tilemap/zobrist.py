@@ -0,0 +1,40 @@
+import random
+from tilemap.observer import MapObserver
+
+class ZobristTable:
+  """Random 64-bit values for each (coordinate, content key) pair, drawn on first use.
+  Maps that are to be compared must share one table.
+  """
+  def __init__(self, seed=None):
+    self._random = random.Random(seed)
+    self._values = {}
+  def value(self, coor, key_value):
+    entry = (coor, key_value)
+    value = self._values.get(entry)
+    if value is None:
+      value = self._random.getrandbits(64)
+      self._values[entry] = value
+    return value
+
+class ZobristHash(MapObserver):
+  """Incremental Zobrist hash of a map's tiles. Empty tiles contribute nothing,
+  and every tile write updates the hash in O(1).
+  """
+  def __init__(self, tile_map, key=None, table=None):
+    self.key = key
+    self.table = ZobristTable() if table is None else table
+    self.value = 0
+    for coor, content in tile_map.occupied_tiles():
+      self.value ^= self._tile_value(coor, content)
+  def _tile_value(self, coor, content):
+    if content is None:
+      return 0
+    return self.table.value(coor, content if self.key is None else self.key(content))
+  def tile_changed(self, coor, previous_content, content):
+    self.value ^= self._tile_value(coor, previous_content) ^ self._tile_value(coor, content)
+  def copy(self):
+    twin = ZobristHash.__new__(ZobristHash)
+    twin.key = self.key
+    twin.table = self.table
+    twin.value = self.value
+    return twin